@@ -0,0 +1,90 @@
+"""
+Time-aligned join of GA4 hits and utag_data snapshots.
+
+Each hit is paired with the data-layer snapshot that was in effect when it
+fired, not with the last snapshot of the run. Both sides are sorted by
+epoch-millisecond timestamp and joined with pd.merge_asof per page path
+(O(n log n)), so virtual pageviews and later pages never lend their data
+layer to an earlier hit:
+
+1. the latest snapshot of the same path taken at or before the hit;
+2. otherwise the first snapshot of that path taken after it - utag_data is
+   set before utag.js fires the page's hits, so that snapshot holds the
+   state the hit was built from.
+
+A hit's page is its own dl parameter, the URL the tag was built on. The
+page the capture path saw is only the fallback: a route reads page.url when
+its handler runs, which is already the next page for a hit fired while the
+page navigates (add_to_cart -> cart, place order -> success).
+
+Hits with no snapshot of their path at all are left unmatched and reported.
+"""
+
+import pandas as pd
+
+from log_sink import log
+
+def _path(urls):
+    """URL or pathname -> pathname, for a whole column at once."""
+    paths = urls.fillna("").astype(str)
+    paths = paths.str.replace(r"^[A-Za-z][A-Za-z0-9+.-]*://[^/]*", "", regex=True)
+    paths = paths.str.replace(r"[?#].*$", "", regex=True)
+    return paths.where(paths != "", "/")
+
+def _hit_pages(hits):
+    """Per hit: its dl parameter, else the page the capture path recorded."""
+    page = hits['page'] if 'page' in hits else pd.Series(None, index=hits.index, dtype=object)
+    if 'dl' not in hits:
+        return page
+    dl = hits['dl']
+    return dl.where(dl.notna() & (dl.astype(str) != ""), page)
+
+def snapshot_frame(snapshots):
+    """captured_data['utag_data'] as (snapshot_row, ts_ms, path) rows, without rebuilding any snapshot."""
+    timestamps, urls = snapshots.timeline()
+    return pd.DataFrame({
+        'snapshot_row': range(len(timestamps)),
+        'ts_ms': pd.Series(timestamps, dtype=float),
+        'path': _path(pd.Series(urls, dtype=object))
+    })
+
+def align_hits(hits, snapshots):
+    """Per hit (same index as `hits`): snapshot_row (Int64, <NA> if unmatched) and how it matched."""
+    result = pd.DataFrame({'snapshot_row': pd.array([pd.NA] * len(hits), dtype='Int64'),
+                           'alignment': None}, index=hits.index)
+    if hits.empty or not snapshots:
+        return result
+
+    left = pd.DataFrame({
+        'hit_row': hits.index,
+        'ts_ms': pd.to_numeric(hits['ts_ms'], errors='coerce').astype(float) if 'ts_ms' in hits else float('nan'),
+        'path': _path(_hit_pages(hits))
+    }).dropna(subset=['ts_ms']).sort_values('ts_ms', kind='stable')
+    right = snapshot_frame(snapshots).dropna(subset=['ts_ms']).sort_values('ts_ms', kind='stable')
+    if left.empty or right.empty:
+        return result
+
+    before = pd.merge_asof(left, right, on='ts_ms', by='path', direction='backward')
+    after = pd.merge_asof(left, right, on='ts_ms', by='path', direction='forward')
+
+    hit_rows = before['hit_row'].to_numpy()
+    snapshot_row = before['snapshot_row'].fillna(after['snapshot_row'])
+    alignment = before['snapshot_row'].notna().map({True: 'before_hit', False: 'after_hit'})
+    alignment = alignment.where(snapshot_row.notna(), None)
+
+    result.loc[hit_rows, 'snapshot_row'] = pd.array(snapshot_row, dtype='Int64')
+    result.loc[hit_rows, 'alignment'] = alignment.to_numpy()
+    return result
+
+def print_alignment(alignment, hits):
+    counts = alignment['alignment'].value_counts()
+    matched = int(alignment['snapshot_row'].notna().sum())
+    log.info(f"\n🔗 Aligned {matched}/{len(alignment)} hit(s) to the utag_data snapshot in effect "
+             f"({counts.get('before_hit', 0)} by the snapshot before the hit, "
+             f"{counts.get('after_hit', 0)} by their page's first snapshot after it)")
+    unmatched = hits.loc[alignment['snapshot_row'].isna()]
+    for row in unmatched.head(10).itertuples():
+        page = getattr(row, 'dl', None) or getattr(row, 'page', None)
+        log.warning(f"   ⚠️ Unmatched hit row {row.Index}: en={getattr(row, 'en', None)} page={page}")
+    if len(unmatched) > 10:
+        log.info(f"   ... {len(unmatched) - 10} more unmatched hit(s)")
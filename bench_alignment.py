@@ -0,0 +1,139 @@
+"""
+Check and time the as-of alignment of GA4 hits to utag_data snapshots.
+
+Builds a synthetic journey of --snapshots utag_data snapshots (stored
+through UtagSnapshots, as the data-layer observer stores them) spread over
+a set of page paths, and --hits hits on those pages, given as full URLs,
+pathnames, or URLs with a query or fragment. Most hits carry their own dl;
+for some of them the capture path recorded the next page instead, as a
+route does for a hit fired while the page navigates, and their dl has to
+win. Some timestamps collide with a
+snapshot's, some hits land on a page that never had a snapshot and some
+have no timestamp. align_hits() is checked hit by hit against a reference
+that looks the snapshot up in each page's own sorted list: the latest
+snapshot at or before the hit, else the page's first one after it, else
+unmatched. Then the join is timed.
+
+    python bench_alignment.py
+    python bench_alignment.py --hits 1000000 --snapshots 200000
+"""
+
+import argparse
+import bisect
+import random
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from alignment import align_hits
+from utag_store import UtagSnapshots
+
+ORIGIN = "https://ecommerce.tealiumdemo.com"
+
+def synthetic_snapshots(n_snapshots, paths, rng):
+    snapshots = UtagSnapshots()
+    ts = 1_700_000_000_000
+    for seq in range(n_snapshots):
+        ts += rng.randrange(0, 40)                  # 0: same millisecond as the previous one
+        path = rng.choice(paths)
+        snapshots.append_delta({'seq': seq, 'base': seq - 1, 'full': seq == 0, 'removed': [],
+                                'set': {'page_name': path, 'step': seq}, 'url': ORIGIN + path,
+                                'timestamp': ts})
+    return snapshots
+
+def hit_page(path, rng):
+    roll = rng.random()
+    if roll < 0.4:
+        return ORIGIN + path
+    if roll < 0.6:
+        return path
+    if roll < 0.8:
+        return f"{ORIGIN}{path}?utm_source=bench#top"
+    return f"{ORIGIN}{path}#reviews"
+
+def synthetic_hits(n_hits, paths, snapshots, rng):
+    timestamps, _ = snapshots.timeline()
+    first, last = timestamps[0], timestamps[-1]
+    ts_ms, dls, pages = [], [], []
+    for _ in range(n_hits):
+        roll = rng.random()
+        if roll < 0.2:
+            ts = rng.choice(timestamps)             # same millisecond as a snapshot
+        elif roll < 0.21:
+            ts = None
+        else:
+            ts = rng.randrange(first - 1000, last + 1000)
+        path = "/never-snapshotted.html" if rng.random() < 0.01 else rng.choice(paths)
+        ts_ms.append(ts)
+        roll = rng.random()
+        if roll < 0.2:
+            dls.append(None)                        # no dl: the recorded page is all there is
+            pages.append(hit_page(path, rng))
+        else:
+            dls.append(f"{ORIGIN}{path}")
+            # A third of these were recorded on the page the browser had moved on to
+            pages.append(hit_page(rng.choice(paths) if roll < 0.45 else path, rng))
+    hits = pd.DataFrame({'ts_ms': ts_ms, 'dl': dls, 'page': pages})
+    # Hit rows keep their capture order, not their timestamp order
+    return hits.sample(frac=1, random_state=rng.randrange(2**32)).reset_index(drop=True)
+
+def reference_alignment(hits, snapshots, rows):
+    """Per-page bisect lookup for the given hit rows: {row: (snapshot_row, alignment)}."""
+    timestamps, urls = snapshots.timeline()
+    by_path = defaultdict(list)
+    for row in sorted(range(len(timestamps)), key=timestamps.__getitem__):
+        by_path[urls[row][len(ORIGIN):]].append(row)
+    by_path_ts = {path: [timestamps[row] for row in rows_] for path, rows_ in by_path.items()}
+
+    hit_ts, hit_dls, hit_pages = hits['ts_ms'].tolist(), hits['dl'].tolist(), hits['page'].tolist()
+    expected = {}
+    for row in rows:
+        ts, page = hit_ts[row], hit_dls[row] if isinstance(hit_dls[row], str) else hit_pages[row]
+        path = page.removeprefix(ORIGIN).split('?')[0].split('#')[0]
+        if pd.isna(ts) or path not in by_path:
+            expected[row] = (None, None)
+            continue
+        ts_list, candidates = by_path_ts[path], by_path[path]
+        at_or_before = bisect.bisect_right(ts_list, ts)
+        if at_or_before:
+            expected[row] = (candidates[at_or_before - 1], 'before_hit')
+        else:
+            expected[row] = (candidates[0], 'after_hit')
+    return expected
+
+def run(n_hits, n_snapshots, n_pages, check_rows, seed):
+    rng = random.Random(seed)
+    paths = [f"/catalog/page-{i}.html" for i in range(n_pages)]
+    snapshots = synthetic_snapshots(n_snapshots, paths, rng)
+    hits = synthetic_hits(n_hits, paths, snapshots, rng)
+
+    started = time.perf_counter()
+    alignment = align_hits(hits, snapshots)
+    elapsed = time.perf_counter() - started
+
+    rows = range(len(hits)) if check_rows <= 0 else rng.sample(range(len(hits)), min(check_rows, len(hits)))
+    expected = reference_alignment(hits, snapshots, rows)
+    got_rows, got_how = alignment['snapshot_row'].tolist(), alignment['alignment'].tolist()
+    mismatches = [row for row, (snapshot_row, how) in expected.items()
+                  if (None if pd.isna(got_rows[row]) else int(got_rows[row]),
+                      None if pd.isna(got_how[row]) else got_how[row]) != (snapshot_row, how)]
+
+    counts = alignment['alignment'].value_counts()
+    print(f"🔗 {n_hits:,} hits against {n_snapshots:,} snapshots on {n_pages} pages")
+    print(f"   {'✅' if not mismatches else '❌'} {len(expected):,} hit(s) match the per-page lookup"
+          f"{'' if not mismatches else f' ({len(mismatches)} differ, e.g. row {mismatches[0]})'}")
+    print(f"   {counts.get('before_hit', 0):,} before_hit, {counts.get('after_hit', 0):,} after_hit, "
+          f"{int(alignment['snapshot_row'].isna().sum()):,} unmatched")
+    print(f"   align_hits: {elapsed:.2f}s ({n_hits / elapsed / 1e6:.2f}M hits/s)")
+    return not mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the as-of alignment of hits to utag_data snapshots")
+    parser.add_argument("--hits", type=int, default=200000, help="GA4 hits aligned")
+    parser.add_argument("--snapshots", type=int, default=50000, help="utag_data snapshots in the journey")
+    parser.add_argument("--pages", type=int, default=500, help="Distinct page paths")
+    parser.add_argument("--check-rows", type=int, default=0, help="Hits checked against the reference (0: all)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.hits, args.snapshots, args.pages, args.check_rows, args.seed) else 1)
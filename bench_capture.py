@@ -0,0 +1,113 @@
+"""
+Benchmark: Python callbacks per page, request listener vs capture routes.
+
+Loads the same pages twice in fresh browser contexts - once with the old
+catch-all page.on("request") listener, once with the URL-pattern routes from
+capture.py - and counts how often Python is called back per page load and
+how many GA4 hits each approach captured.
+
+    python bench_capture.py                    # live site
+    python bench_capture.py --local-site       # local stand-in site
+    python bench_capture.py --loads 10 --path / --path /linen-blazer-570.html
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urljoin
+
+from playwright.async_api import async_playwright
+
+from capture import install_analytics_capture
+from ga4_decoder import decode_request
+from core import DEFAULT_URL
+from engine import new_captured_data
+from local_site import start_local_site
+
+DEFAULT_PATHS = ["/", "/linen-blazer-570.html", "/checkout/cart/"]
+
+async def install_listener(page, captured_data):
+    """The old capture: one Python callback for every request the page makes."""
+    stats = {'callbacks': 0}
+    captured_data['capture'] = stats
+
+    def handle_request(request):
+        stats['callbacks'] += 1
+        url = request.url
+        if '/g/collect' in url:
+            for params in decode_request(url, request.post_data):
+                captured_data['ga4_calls'].append(params, url=url, method=request.method, source='listener')
+
+    page.on("request", handle_request)
+    return stats
+
+async def measure(browser, mode, urls, loads):
+    context = await browser.new_context()
+    page = await context.new_page()
+    # The same in-memory capture buffer a flow gets from the engine
+    captured_data = new_captured_data()
+    if mode == 'listener':
+        stats = await install_listener(page, captured_data)
+    else:
+        stats = await install_analytics_capture(page, captured_data)
+
+    requests = {'count': 0}
+    page.on("requestfinished", lambda r: requests.__setitem__('count', requests['count'] + 1))
+
+    start = time.perf_counter()
+    for _ in range(loads):
+        for url in urls:
+            await page.goto(url, wait_until="load")
+            await page.wait_for_timeout(500)  # let late beacons fire before leaving the page
+    elapsed = time.perf_counter() - start
+    await context.close()
+
+    pages = loads * len(urls)
+    return {
+        'mode': mode,
+        'pages': pages,
+        'requests': requests['count'],
+        'callbacks': stats['callbacks'],
+        'callbacks_per_page': stats['callbacks'] / pages,
+        'ga4_hits': len(captured_data['ga4_calls']),
+        'seconds': elapsed
+    }
+
+async def run(url, paths, loads):
+    urls = [urljoin(url, path) for path in paths]
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        results = [await measure(browser, mode, urls, loads) for mode in ('listener', 'routes')]
+        await browser.close()
+
+    print(f"\n📏 Capture callbacks over {results[0]['pages']} page loads of {url}")
+    print(f"   {'mode':<10}{'requests':>10}{'callbacks':>11}{'per page':>10}{'GA4 hits':>10}{'seconds':>9}")
+    for r in results:
+        print(f"   {r['mode']:<10}{r['requests']:>10}{r['callbacks']:>11}{r['callbacks_per_page']:>10.1f}"
+              f"{r['ga4_hits']:>10}{r['seconds']:>9.1f}")
+
+    listener, routes = results
+    if listener['callbacks']:
+        drop = 100 * (1 - routes['callbacks'] / listener['callbacks'])
+        print(f"   Python callbacks per page down {drop:.0f}% "
+              f"({listener['callbacks_per_page']:.1f} -> {routes['callbacks_per_page']:.1f})")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare capture callbacks: request listener vs URL-pattern routes")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Site to load")
+    parser.add_argument("--path", action="append", dest="paths", help="Page path to load (repeatable)")
+    parser.add_argument("--loads", type=int, default=3, help="Times each page is loaded per mode")
+    parser.add_argument("--local-site", action="store_true", help="Benchmark against the local stand-in site")
+    args = parser.parse_args()
+
+    url = args.url
+    server = None
+    if args.local_site:
+        server, url, _ = start_local_site()
+
+    try:
+        asyncio.run(run(url, args.paths or DEFAULT_PATHS, args.loads))
+    finally:
+        if server:
+            server.shutdown()
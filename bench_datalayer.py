@@ -0,0 +1,133 @@
+"""
+Check the push-based data-layer observers in a real browser.
+
+Serves a few pages on two origins from routes on the browser context,
+installs the event buffer and the data-layer observers exactly as the flows
+do, and checks what reaches Python:
+
+- the first utag_data of the context arrives as one full snapshot;
+- an in-place key change arrives as a delta holding only that key, and a
+  loop setting fifty keys costs one report;
+- a deleted key arrives as removed;
+- digitalData pushes (entries already in the array included) and b2t
+  key sets / deletes arrive as data-layer events;
+- the next page of the origin sends a delta against the sessionStorage base;
+- a second origin starts with a full snapshot, and going back to the first
+  origin, whose stored sequence number matches the one the second origin
+  counted up to, has its delta refused and answers with a full snapshot;
+- so does a page whose base Python does not hold, as after a lost report;
+- the snapshots UtagSnapshots rebuilds equal the pages' utag_data.
+
+    python bench_datalayer.py
+"""
+
+import asyncio
+import json
+
+from playwright.async_api import async_playwright
+
+from bench_pages import ORIGIN, SECOND_ORIGIN, check, serve, settle
+from datalayer import install_datalayer_observers
+from engine import new_captured_data
+from event_buffer import install_event_buffer
+
+PAGE = """<!DOCTYPE html><html><head><title>%(name)s</title>
+<script>window.utag_data = %(utag)s; window.utag = { data: window.utag_data };</script>
+</head><body><h1>%(name)s</h1></body></html>"""
+
+PAGES = {
+    "/": {'page_name': 'home', 'page_type': 'home', 'site_region': 'us', 'product_id': []},
+    "/product.html": {'page_name': 'product', 'page_type': 'product', 'site_region': 'us', 'product_id': ['SKU1']},
+    "/cart.html": {'page_name': 'cart', 'page_type': 'cart', 'site_region': 'us', 'product_id': ['SKU1'],
+                   'cart_total_items': '1'}
+}
+
+async def run():
+    ok = True
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        pages = {path: PAGE % {'name': data['page_name'], 'utag': json.dumps(data)} for path, data in PAGES.items()}
+        await serve(context, pages)
+        await serve(context, pages, SECOND_ORIGIN)
+        captured_data = new_captured_data()
+        buffer = await install_event_buffer(context, captured_data)
+        await install_datalayer_observers(context, buffer, captured_data)
+        snapshots, events = captured_data['utag_data'], captured_data['data_layer_events']
+        page = await context.new_page()
+
+        print("🔎 Data-layer observer checks")
+        await page.goto(ORIGIN + "/", wait_until="load")
+        await settle(page, buffer)
+        ok &= check("the first utag_data arrives as one full snapshot",
+                    len(snapshots) == 1 and snapshots.deltas[0]['full'] and snapshots[0]['data'] == PAGES["/"])
+
+        await page.evaluate("() => { utag.data.order_total = '12.50'; }")
+        await settle(page, buffer)
+        ok &= check("an in-place key change sends only that key",
+                    len(snapshots) == 2 and snapshots.deltas[1]['set'] == {'order_total': '12.50'})
+
+        await page.evaluate("() => { for (let i = 0; i < 50; i++) utag_data['k' + i] = i; }")
+        await settle(page, buffer)
+        ok &= check("a loop setting fifty keys costs one report",
+                    len(snapshots) == 3 and len(snapshots.deltas[2]['set']) == 50)
+
+        await page.evaluate("() => { delete utag_data.k0; }")
+        await settle(page, buffer)
+        ok &= check("a deleted key arrives as removed",
+                    len(snapshots) == 4 and snapshots.deltas[3]['removed'] == ['k0'])
+
+        await page.evaluate("""() => {
+            window.digitalData = [{ event: 'a' }];
+            digitalData.push({ event: 'b' }, { event: 'c' });
+            window.b2t = { a: 1 };
+            b2t.b = 2;
+            delete b2t.a;
+        }""")
+        await settle(page, buffer)
+        layer_events = [(e['layer'], e['op'], e['key']) for e in events]
+        ok &= check("digitalData pushes and b2t key changes arrive as data-layer events",
+                    layer_events == [('digitalData', 'push', 0), ('digitalData', 'push', 1), ('digitalData', 'push', 2),
+                                     ('b2t', 'replace', None), ('b2t', 'set', 'b'), ('b2t', 'delete', 'a')])
+
+        await page.goto(ORIGIN + "/product.html", wait_until="load")
+        await settle(page, buffer)
+        ok &= check("the next page of the origin sends a delta against the sessionStorage base",
+                    len(snapshots) == 5 and not snapshots.deltas[4]['full']
+                    and snapshots[4]['data'] == PAGES["/product.html"])
+
+        # The first origin stopped at seq 4; the second one counts up to 4 as well, then the journey goes back
+        await page.goto(SECOND_ORIGIN + "/", wait_until="load")
+        await settle(page, buffer)
+        for step in range(4):
+            await page.evaluate("step => { utag.data.step = step; }", step)
+            await settle(page, buffer)
+        second = len(snapshots) == 10 and snapshots.deltas[5]['full'] and snapshots.seq == 4
+        await page.goto(ORIGIN + "/cart.html", wait_until="load")
+        await settle(page, buffer)
+        ok &= check("a second origin starts in full, and going back to the first one is refused and resent in full",
+                    second and len(snapshots) == 11 and snapshots.deltas[10]['full']
+                    and snapshots[10]['data'] == PAGES["/cart.html"])
+
+        # A base Python never stored, as after a lost report
+        await page.evaluate("() => sessionStorage.setItem('__avp_utag_prev', "
+                            "JSON.stringify({ seq: 999, lineage: 'stale', values: {} }))")
+        await page.goto(ORIGIN + "/product.html", wait_until="load")
+        await settle(page, buffer)
+        ok &= check("a delta on a base Python does not hold is refused and resent in full",
+                    len(snapshots) == 12 and snapshots.deltas[11]['full']
+                    and snapshots[11]['data'] == PAGES["/product.html"])
+
+        live = await page.evaluate("() => JSON.parse(JSON.stringify(utag.data))")
+        ok &= check("the last rebuilt snapshot equals the page's utag.data", snapshots[-1]['data'] == live)
+        stats = captured_data['event_buffer']
+        print(f"   {len(snapshots)} utag_data report(s) and {len(events)} data-layer event(s) in "
+              f"{stats['flushes']} flush(es); {snapshots.delta_bytes} bytes sent as deltas "
+              f"vs {snapshots.full_bytes} as full clones")
+        print(f"   {'All checks passed' if ok else 'Some checks FAILED'}")
+        await context.close()
+        await browser.close()
+    return ok
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(run()) else 1)
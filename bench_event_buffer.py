@@ -0,0 +1,101 @@
+"""
+Check and time the in-page event buffer in a real browser.
+
+Serves two pages from a route on the browser context and installs the event
+buffer as the flows do, then:
+
+- records --events history changes in one loop and checks that all of them
+  reach Python, in order, in one round trip per FLUSH_EVENTS events;
+- records an event from a pagehide handler while the page navigates away
+  and checks that it still arrives;
+- times --events events delivered through the buffer against the same
+  events sent through a binding call each, the way the injected scripts
+  reported before the buffer.
+
+    python bench_event_buffer.py
+    python bench_event_buffer.py --events 5000
+"""
+
+import argparse
+import asyncio
+import math
+import time
+
+from playwright.async_api import async_playwright
+
+from bench_pages import ORIGIN, check, serve
+from engine import new_captured_data
+from event_buffer import FLUSH_EVENTS, FLUSH_MS, install_event_buffer
+
+PAGE = """<!DOCTYPE html><html><head><title>%(name)s</title>
+<script>
+  addEventListener('pagehide', () => window.__avpRecord('history', { op: 'left', from: location.href }));
+</script>
+</head><body><h1>%(name)s</h1></body></html>"""
+
+RECORD_JS = """async n => {
+  for (let i = 0; i < n; i++) history.pushState({ i }, '', '/step/' + i);
+  await window.__avpFlushNow();
+}"""
+
+PER_EVENT_JS = """async n => {
+  const calls = [];
+  for (let i = 0; i < n; i++) {
+    calls.push(window.__avpOne({ type: 'history', op: 'pushState', to: '/step/' + i, timestamp: Date.now() }));
+  }
+  await Promise.all(calls);
+}"""
+
+async def run(n_events):
+    ok = True
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        await serve(context, {"/": PAGE % {'name': 'home'}, "/next.html": PAGE % {'name': 'next'}})
+        captured_data = new_captured_data()
+        buffer = await install_event_buffer(context, captured_data)
+        per_event = {'calls': 0}
+        await context.expose_binding("__avpOne", lambda source, event: per_event.__setitem__(
+            'calls', per_event['calls'] + 1))
+        stats, page_events = buffer.stats, captured_data['page_events']
+        page = await context.new_page()
+        await page.goto(ORIGIN + "/", wait_until="load")
+        await buffer.flush(page)
+
+        print("🔎 Event buffer checks")
+        flushes = stats['flushes']
+        started = time.perf_counter()
+        await page.evaluate(RECORD_JS, n_events)
+        buffered_time = time.perf_counter() - started
+        recorded = [event['to'] for event in page_events if event.get('op') == 'pushState']
+        round_trips = stats['flushes'] - flushes
+        ok &= check(f"{n_events} history changes arrive in order",
+                    recorded == [f"{ORIGIN}/step/{i}" for i in range(n_events)])
+        ok &= check(f"one round trip per {FLUSH_EVENTS} events ({round_trips} for {n_events})",
+                    round_trips == math.ceil(n_events / FLUSH_EVENTS))
+
+        await page.goto(ORIGIN + "/next.html", wait_until="load")
+        await page.wait_for_timeout(FLUSH_MS + 100)
+        ok &= check("an event recorded in a pagehide handler still arrives",
+                    any(event.get('op') == 'left' for event in page_events)
+                    and stats['by_reason']['pagehide'] > 0)
+        ok &= check("nothing was dropped", stats['dropped'] == 0)
+
+        started = time.perf_counter()
+        await page.evaluate(PER_EVENT_JS, n_events)
+        per_event_time = time.perf_counter() - started
+        print(f"\n⏱️ {n_events} events to Python")
+        print(f"   buffered:  {buffered_time * 1000:8.1f} ms in {round_trips} round trip(s)")
+        print(f"   per event: {per_event_time * 1000:8.1f} ms in {per_event['calls']} round trip(s) "
+              f"({per_event_time / buffered_time:.1f}x)")
+        print("   flushes by reason: " + ", ".join(f"{reason}={n}" for reason, n in stats['by_reason'].most_common()))
+        print(f"   {'All checks passed' if ok else 'Some checks FAILED'}")
+        await context.close()
+        await browser.close()
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the in-page event buffer")
+    parser.add_argument("--events", type=int, default=1000, help="Events recorded in one loop")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(run(args.events)) else 1)
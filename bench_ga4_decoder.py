@@ -0,0 +1,131 @@
+"""
+Benchmark and check the GA4 batch decoder on large synthetic batches.
+
+Builds batched /g/collect POSTs (shared params in the URL, one event per body
+line, escaped values and item strings included), checks every decoded event
+against a reference decode built on parse_qs, then times decode_request()
+on its own and with the hits appended to typed GA4Columns. Finally times
+item-level validation of purchase hits carrying hundreds of prN items.
+
+    python bench_ga4_decoder.py
+    python bench_ga4_decoder.py --requests 20000 --events 25
+"""
+
+import argparse
+import random
+import time
+from urllib.parse import urlencode, parse_qs
+
+from ga4_decoder import decode_request, GA4Columns, items_frame
+from item_validation import utag_items_frame, validate_items
+
+EVENT_NAMES = ['page_view', 'view_item', 'add_to_cart', 'begin_checkout', 'add_shipping_info', 'purchase']
+
+def synthetic_request(rng, n_events):
+    shared = {
+        'v': '2',
+        'tid': 'G-SYNTHETIC1',
+        'cid': f"{rng.randrange(10**9)}.{rng.randrange(10**9)}",
+        'sid': str(rng.randrange(10**9)),
+        'dl': 'https://ecommerce.tealiumdemo.com/checkout/onepage/?step=2&ref=a b',
+        'dt': 'Checkout | Luma & Co.',
+        'ul': 'en-us'
+    }
+    lines = []
+    for seq in range(1, n_events + 1):
+        event = {
+            'en': rng.choice(EVENT_NAMES),
+            '_s': str(seq),
+            'ep.transaction_id': str(100000000 + rng.randrange(10**6)),
+            'epn.value': f"{rng.uniform(1, 999):.2f}",
+            'ep.item_name': 'Linen Blazer, "Oatmeal" 50% off',
+            'cu': 'USD',
+            'pr1': f"idlnb-{seq}~nmLinen Blazer~pr455.00~qt{rng.randrange(1, 4)}"
+        }
+        if seq % 5 == 0:
+            # Per-event override of a shared parameter
+            event['dl'] = f"https://ecommerce.tealiumdemo.com/checkout/cart/?n={seq}"
+        lines.append(urlencode(event))
+    url = "https://region1.google-analytics.com/g/collect?" + urlencode(shared)
+    return url, "\n".join(lines)
+
+def reference_decode(url, post_data):
+    shared = {k: v[0] for k, v in parse_qs(url.split('?', 1)[1]).items()}
+    events = []
+    for line in post_data.split('\n'):
+        event = dict(shared)
+        event.update({k: v[0] for k, v in parse_qs(line).items()})
+        events.append(event)
+    return events
+
+def run(n_requests, n_events, seed):
+    rng = random.Random(seed)
+    batches = [synthetic_request(rng, n_events) for _ in range(n_requests)]
+    total_bytes = sum(len(url) + len(body) for url, body in batches)
+
+    for url, body in batches:
+        decoded = decode_request(url, body)
+        expected = reference_decode(url, body)
+        assert decoded == expected, f"decode mismatch for {url[:60]}..."
+        assert len(decoded) == n_events
+    print(f"✅ {n_requests} batches x {n_events} events decode identically to the parse_qs reference")
+
+    def decode_into_columns(url, body):
+        for params in decode_request(url, body):
+            columns.append(params, url=url, method='POST')
+
+    columns = GA4Columns()
+    results = {}
+    for name, decode in (('decode_request', decode_request), ('decode + typed columns', decode_into_columns),
+                         ('parse_qs reference', reference_decode)):
+        start = time.perf_counter()
+        for url, body in batches:
+            decode(url, body)
+        results[name] = time.perf_counter() - start
+
+    events = n_requests * n_events
+    print(f"\n📏 Decoding {events:,} events ({total_bytes / 1024 / 1024:.1f} MB of hits)")
+    for name, elapsed in results.items():
+        print(f"   {name:<24}: {elapsed:6.2f}s  {events / elapsed:>12,.0f} events/s  "
+              f"{elapsed / n_requests * 1e6:8.1f} µs/request")
+    print(f"   Speed-up: {results['parse_qs reference'] / results['decode_request']:.1f}x")
+    print(f"   Typed columns: {len(columns.columns)} columns x {len(columns):,} rows, {columns.type_errors} type errors")
+    return results
+
+def run_items(n_hits, n_items, seed):
+    """Item-level validation of n_hits purchase hits carrying n_items prN items each."""
+    rng = random.Random(seed)
+    skus = [f"sku-{i}" for i in range(n_items)]
+    prices = [f"{rng.uniform(1, 500):.2f}" for _ in skus]
+    utag = {'product_sku': skus, 'product_price': prices, 'product_quantity': ['1'] * n_items}
+
+    columns = GA4Columns()
+    bad_hits = set(rng.sample(range(n_hits), max(1, n_hits // 100)))
+    for hit in range(n_hits):
+        params = {'en': 'purchase'}
+        for i, (sku, price) in enumerate(zip(skus, prices)):
+            params[f"pr{i + 1}"] = f"id{sku}~pr{price}~qt{2 if hit in bad_hits and i == 0 else 1}"
+        columns.append(params)
+
+    start = time.perf_counter()
+    items = items_frame(columns)
+    decoded = time.perf_counter()
+    results = validate_items(items, utag_items_frame(utag), range(n_hits))
+    validated = time.perf_counter()
+
+    assert len(results) == n_hits * n_items
+    assert int((~results['match']).sum()) == len(bad_hits)
+    print(f"\n🧾 Item validation of {n_hits:,} purchase hits x {n_items} items ({len(items):,} item lines)")
+    print(f"   decode prN   : {decoded - start:6.2f}s")
+    print(f"   join + check : {validated - decoded:6.2f}s  ({len(bad_hits)} mismatching lines found, as planted)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the GA4 batch decoder on synthetic batches")
+    parser.add_argument("--requests", type=int, default=5000, help="Number of batched requests")
+    parser.add_argument("--events", type=int, default=20, help="Events per batch")
+    parser.add_argument("--items", type=int, default=300, help="prN items per purchase hit for the item benchmark")
+    parser.add_argument("--item-hits", type=int, default=2000, help="Purchase hits for the item benchmark")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.requests, args.events, args.seed)
+    run_items(args.item_hits, args.items, args.seed)
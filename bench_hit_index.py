@@ -0,0 +1,147 @@
+"""
+Check and time the GA4 hit identity index.
+
+Feeds hand-built requests through capture.store_ga4_request, the path every
+capture source stores through, and checks what is stored:
+
+- a batched POST whose body carries the same en twice (two view_promotion
+  events sharing the URL's _s and _p) stores both events;
+- the same request seen by sendBeacon and by resource timing only adds
+  those sources to the stored hits;
+- the same path reporting the request again stores new hits, as does a
+  reload with a new _p page-load id;
+- hits without _s are keyed on their parameters and batch position;
+- on a long journey only the window's labels stay in memory, the older
+  ones are spilled, and sources() still covers every row.
+
+Then times identity + lookup + insert over synthetic journeys of growing
+length, which should stay flat as the window starts evicting.
+
+    python bench_hit_index.py
+    python bench_hit_index.py --hits 2000000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from capture import store_ga4_request
+from ga4_decoder import GA4Columns, decode_request
+from hit_index import HitIndex, hit_identity
+from segments import SegmentLog
+
+PAGE = "https://ecommerce.tealiumdemo.com/women/tops.html"
+
+def collect_url(**params):
+    shared = {'v': '2', 'tid': 'G-SYNTHETIC1', 'cid': '111.222', 'sid': '333', 'dl': PAGE, **params}
+    return "https://region1.google-analytics.com/g/collect?" + urlencode(shared)
+
+def new_store():
+    return {'ga4_calls': GA4Columns(), 'hit_index': HitIndex()}
+
+def check(name, condition):
+    print(f"   {'✅' if condition else '❌'} {name}")
+    return condition
+
+def run_checks():
+    print("🔎 Hit identity checks")
+    ok = True
+    captured_data = new_store()
+    hits, index = captured_data['ga4_calls'], captured_data['hit_index']
+    url = collect_url(_p='123', _s='4')
+    body = "en=view_promotion&ep.promotion_id=A\nen=view_promotion&ep.promotion_id=B"
+
+    rows = store_ga4_request(captured_data, url, body, 'POST', 'route', PAGE)
+    ok &= check("batched POST with a repeated en stores every event",
+                len(rows) == 2 and hits.column('ep.promotion_id') == ['A', 'B'] and index.duplicates == 0)
+
+    rows = store_ga4_request(captured_data, url, body, 'POST', 'sendBeacon', PAGE)
+    ok &= check("the same batch seen by sendBeacon is not stored again",
+                not rows and len(hits) == 2 and index.duplicates == 2
+                and list(index.sources()) == ['route+sendBeacon', 'route+sendBeacon'])
+
+    rows = store_ga4_request(captured_data, url, body, 'POST', 'route', PAGE)
+    ok &= check("the same path reporting the request again stores new hits",
+                len(rows) == 2 and len(hits) == 4 and index.duplicates == 2)
+
+    reload_url = collect_url(_p='456', _s='4')
+    rows = store_ga4_request(captured_data, reload_url, body, 'POST', 'route', PAGE)
+    ok &= check("a reload (new _p) with the same _s and en stores new hits", len(rows) == 2)
+
+    get_url = collect_url(_p='456', _s='5', en='scroll', **{'epn.percent_scrolled': '90'})
+    store_ga4_request(captured_data, get_url, None, 'POST', 'route', PAGE + "#top")
+    rows = store_ga4_request(captured_data, get_url, None, 'GET', 'performance', PAGE)
+    ok &= check("a hit carried in the URL and seen by resource timing is merged",
+                not rows and list(index.sources())[-1] == 'performance+route')
+
+    no_seq = collect_url(_p='789')
+    rows = store_ga4_request(captured_data, no_seq, "en=click\nen=click", 'POST', 'route', PAGE)
+    rows += store_ga4_request(captured_data, no_seq, "en=click\nen=click", 'POST', 'fetch', PAGE)
+    ok &= check("hits without _s: both events of the batch stored once each", len(rows) == 2)
+
+    ok &= check("source counts add up to the stored hits",
+                sum(index.source_counts().values()) == len(hits) == len(index))
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        index = HitIndex(window=100, spill=SegmentLog(spill_dir, 'hit_sources'), spill_rows=30)
+        for row in range(1000):
+            index.add(('hit', row), row, 'route')
+            if row % 2:
+                index.seen(('hit', row), 'sendBeacon')
+        sources = list(index.sources())
+        ok &= check("a long journey keeps only the window in memory and spills the older labels",
+                    len(index.recent) == 100 and len(index.settled.tail) < 30 and len(sources) == 1000
+                    and sources[:2] == ['route', 'route+sendBeacon']
+                    and index.source_counts() == {'route': 500, 'route+sendBeacon': 500})
+    print(f"   {'All checks passed' if ok else 'Some checks FAILED'}")
+    return ok
+
+def synthetic_hits(n_hits, seed):
+    """Decoded hits of a long journey: batched requests of 1-5 events, every request seen twice."""
+    rng = random.Random(seed)
+    hits = []
+    seq = 0
+    p = 0
+    while len(hits) < n_hits:
+        if seq % 20 == 0:
+            p += 1
+        seq += 1
+        url = collect_url(_p=str(p), _s=str(seq))
+        body = "\n".join(urlencode({'en': rng.choice(['view_item', 'scroll', 'view_promotion'])})
+                         for _ in range(rng.randrange(1, 6)))
+        for source in ('route', 'sendBeacon'):
+            for batch_index, params in enumerate(decode_request(url, body)):
+                hits.append((params, batch_index, source))
+    return hits[:n_hits]
+
+def time_index(n_hits, seed):
+    hits = synthetic_hits(n_hits, seed)
+    index = HitIndex()
+    row = 0
+    started = time.perf_counter()
+    for params, batch_index, source in hits:
+        identity = hit_identity(params, PAGE, batch_index)
+        if not index.seen(identity, source):
+            index.add(identity, row, source)
+            row += 1
+    elapsed = time.perf_counter() - started
+    return elapsed, row, index.duplicates
+
+def run(n_hits, seed):
+    ok = run_checks()
+    print("\n⏱️ Identity + lookup + insert (every hit seen by two paths)")
+    sizes = sorted({max(1, n_hits // 10), n_hits})
+    for size in sizes:
+        elapsed, stored, duplicates = time_index(size, seed)
+        print(f"   {size:>10,} sightings: {elapsed:6.2f}s  {size / elapsed / 1e6:5.2f}M/s  "
+              f"({stored:,} stored, {duplicates:,} duplicates)")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the GA4 hit identity index")
+    parser.add_argument("--hits", type=int, default=1000000, help="Sightings in the longest timed journey")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.hits, args.seed) else 1)
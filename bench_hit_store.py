@@ -0,0 +1,169 @@
+"""
+Measure the memory the hit and resource stores hold after a long journey.
+
+Replays a synthetic overnight monitoring run - many sessions, each loading a
+handful of pages and sending batched GA4 hits, plus the resource-timing
+entries of every page - through the same decode path as capture, with every
+event arriving as freshly decoded JSON as it does from the page binding.
+tracemalloc reports what each store shape still holds afterwards:
+
+- GA4 hits as the old list of {'url', 'params', 'timestamp', ...} dicts;
+- GA4Columns without interning and with the per-hit ISO timestamp string;
+- GA4Columns as capture fills it (interned text, ts_ms only);
+- resource entries as dicts and as interned ResourceEntry records;
+- both stores spilling to segment files every --spill-rows records, as a
+  run does, whose held memory stays flat however long the journey.
+
+    python bench_hit_store.py
+    python bench_hit_store.py --sessions 1000 --pages 12 --spill-rows 5000
+"""
+
+import argparse
+import gc
+import json
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlencode
+
+from ga4_decoder import decode_request, GA4Columns
+from resource_timing import ResourceEntry, _intern
+from segments import SegmentLog, SpillList, SPILL_ROWS
+from tag_classifier import TagClassifier
+
+PAGES = ['/', '/women/tops.html', '/men/pants.html', '/catalog/product/view/id/{n}',
+         '/checkout/cart/', '/checkout/onepage/', '/checkout/onepage/success/']
+EVENT_NAMES = ['page_view', 'scroll', 'view_item', 'add_to_cart', 'begin_checkout', 'purchase']
+RESOURCES = ['https://ecommerce.tealiumdemo.com/media/catalog/product/{n}.jpg',
+             'https://ecommerce.tealiumdemo.com/skin/frontend/rwd/default/css/styles.css',
+             'https://tags.tiqcdn.com/utag/acct/main/prod/utag.js',
+             'https://www.googletagmanager.com/gtag/js?id=G-SYNTHETIC1',
+             'https://fonts.gstatic.com/s/raleway/v{n}.woff2']
+INITIATORS = ['img', 'link', 'script', 'css', 'fetch']
+
+def journey(n_sessions, n_pages, hits_per_page, resources_per_page, seed):
+    """Yield ('hit', url, body, page, ts_ms) and ('resource', event) as capture receives them."""
+    rng = random.Random(seed)
+    ts_ms = 1760000000000
+    for _ in range(n_sessions):
+        cid = f"{rng.randrange(10**9)}.{rng.randrange(10**9)}"
+        sid = str(rng.randrange(10**9))
+        for _ in range(n_pages):
+            path = rng.choice(PAGES).format(n=rng.randrange(50))
+            shared = {'v': '2', 'tid': 'G-SYNTHETIC1', 'gtm': '45je5a', '_p': str(rng.randrange(10**9)),
+                      'cid': cid, 'ul': 'en-us', 'sid': sid, 'sct': '1', 'seg': '1',
+                      'dl': 'https://ecommerce.tealiumdemo.com' + path, 'dt': 'Luma Store'}
+            url = "https://region1.google-analytics.com/g/collect?" + urlencode(shared)
+            for start in range(0, hits_per_page, 5):
+                lines = [urlencode({'en': rng.choice(EVENT_NAMES), '_s': str(start + i + 1),
+                                    'ep.transaction_id': str(rng.randrange(10**6)), 'cu': 'USD',
+                                    'epn.value': f"{rng.uniform(1, 999):.2f}"})
+                         for i in range(min(5, hits_per_page - start))]
+                ts_ms += rng.randrange(50, 2000)
+                # The binding hands Python a freshly parsed JSON payload
+                url_copy, body, page = json.loads(json.dumps([url, "\n".join(lines), path]))
+                yield ('hit', url_copy, body, page, ts_ms)
+            events = [{'name': rng.choice(RESOURCES).format(n=rng.randrange(500)),
+                       'initiator': rng.choice(INITIATORS), 'duration': rng.uniform(1, 400),
+                       'size': rng.randrange(100, 90000), 'start_ms': ts_ms + i,
+                       'page': 'https://ecommerce.tealiumdemo.com' + path}
+                      for i in range(resources_per_page)]
+            for event in json.loads(json.dumps(events)):
+                yield ('resource', event)
+
+def hit_dicts(events):
+    hits = []
+    for event in events:
+        if event[0] == 'hit':
+            _, url, body, page, ts_ms = event
+            for params in decode_request(url, body):
+                hits.append({'url': url, 'params': params, 'method': 'POST', 'page': page, 'source': 'route',
+                             'ts_ms': ts_ms, 'timestamp': datetime.fromtimestamp(ts_ms / 1000).isoformat()})
+    return hits
+
+def hit_columns(intern, spill_dir=None, spill_rows=SPILL_ROWS):
+    def build(events):
+        spill = SegmentLog(spill_dir, 'ga4_calls') if spill_dir else None
+        columns = GA4Columns(intern=intern, spill=spill, spill_rows=spill_rows)
+        for event in events:
+            if event[0] == 'hit':
+                _, url, body, page, ts_ms = event
+                meta = {'url': url, 'method': 'POST', 'ts_ms': ts_ms, 'page': page, 'source': 'route'}
+                if not intern:
+                    meta['timestamp'] = datetime.fromtimestamp(ts_ms / 1000).isoformat()
+                batch = decode_request(url, body)
+                for index, params in enumerate(batch):
+                    columns.append(params, batch_index=index, batch_size=len(batch), **meta)
+        return columns
+    return build
+
+def resource_store(as_records, spill_dir=None, spill_rows=SPILL_ROWS):
+    classify = TagClassifier().classify
+
+    def build(events):
+        entries = []
+        if spill_dir:
+            entries = SpillList(SegmentLog(spill_dir, 'network_calls'), spill_rows,
+                                ResourceEntry.to_dict, ResourceEntry.from_dict)
+        for event in events:
+            if event[0] != 'resource':
+                continue
+            event = event[1]
+            url = event['name']
+            values = (url, event['initiator'], round(event['duration'], 2), event['size'],
+                      classify(url), None, event['start_ms'], event['page'])
+            if as_records:
+                entries.append(ResourceEntry(_intern(url), _intern(values[1]), *values[2:7], _intern(values[7])))
+            else:
+                entries.append(dict(zip(ResourceEntry.__slots__, values), params={}))
+        return entries
+    return build
+
+def measure(build, make_events):
+    gc.collect()
+    tracemalloc.start()
+    store = build(make_events())
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(store), held, peak
+
+def run(n_sessions, n_pages, hits_per_page, resources_per_page, seed, spill_rows, spill_dir):
+    make_events = lambda: journey(n_sessions, n_pages, hits_per_page, resources_per_page, seed)
+    shapes = [
+        ('GA4 hits', 'list of dicts', hit_dicts),
+        ('GA4 hits', 'columns, not interned', hit_columns(False)),
+        ('GA4 hits', 'columns, interned', hit_columns(True)),
+        ('GA4 hits', 'columns, spilled', hit_columns(True, spill_dir, spill_rows)),
+        ('Resources', 'dicts', resource_store(False)),
+        ('Resources', 'ResourceEntry', resource_store(True)),
+        ('Resources', 'ResourceEntry, spilled', resource_store(True, spill_dir, spill_rows))
+    ]
+    print(f"🌙 {n_sessions} sessions x {n_pages} pages: {hits_per_page} hits and "
+          f"{resources_per_page} resource entries per page")
+    results = {}
+    for store, shape, build in shapes:
+        count, held, peak = measure(build, make_events)
+        results[(store, shape)] = held
+        print(f"   {store:<10} {shape:<22}: {count:>9,} rows  {held / 2**20:8.1f} MiB held "
+              f"({held / count:6.0f} B/row, peak {peak / 2**20:.1f} MiB)")
+    print(f"📉 GA4 hits: {results[('GA4 hits', 'list of dicts')] / results[('GA4 hits', 'columns, interned')]:.1f}x "
+          f"less than dicts, {results[('GA4 hits', 'columns, not interned')] / results[('GA4 hits', 'columns, interned')]:.1f}x "
+          f"less than uninterned columns; resources: "
+          f"{results[('Resources', 'dicts')] / results[('Resources', 'ResourceEntry')]:.1f}x less")
+    print(f"💾 Spilling every {spill_rows:,} rows: {results[('GA4 hits', 'columns, spilled')] / 2**20:.1f} MiB "
+          f"(hits) and {results[('Resources', 'ResourceEntry, spilled')] / 2**20:.1f} MiB (resources) held")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory held by the hit and resource stores")
+    parser.add_argument("--sessions", type=int, default=500, help="Journeys replayed")
+    parser.add_argument("--pages", type=int, default=8, help="Pages loaded per journey")
+    parser.add_argument("--hits", type=int, default=15, help="GA4 hits per page")
+    parser.add_argument("--resources", type=int, default=60, help="Resource-timing entries per page")
+    parser.add_argument("--spill-rows", type=int, default=SPILL_ROWS, help="Rows kept in memory before spilling")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as spill_dir:
+        run(args.sessions, args.pages, args.hits, args.resources, args.seed, args.spill_rows, spill_dir)
@@ -0,0 +1,103 @@
+r"""
+Check the fetch/XHR/sendBeacon hit interceptor in a real browser.
+
+Serves a page (with an iframe) from a route on the browser context whose
+scripts send GA4 hits while the page loads, installs the event buffer, the
+interceptor and the capture routes as the flows do, and checks that every
+hit is stored once and seen by both paths:
+
+- sendBeacon with the event in the query, with a batched body holding the
+  same en twice, and with a Blob body;
+- fetch POST with a URLSearchParams body, and XHR GET;
+- fetch from an iframe;
+- sendBeacon from a pagehide handler while the page navigates away.
+
+It also sends an Adobe beacon and checks that every beacon, GA4 or not, is
+still recorded as a 'beacon' page event by the event buffer.
+
+    python bench_interceptor.py
+"""
+
+import asyncio
+from collections import Counter
+
+from playwright.async_api import async_playwright
+
+from bench_pages import ORIGIN, check, serve
+from capture import install_analytics_capture, install_hit_interceptor
+from engine import new_captured_data
+from event_buffer import FLUSH_MS, install_event_buffer
+
+COLLECT_JS = r"""
+  const hit = (s) => '/g/collect?v=2&tid=G-BENCH&cid=1.2&_p=77&_s=' + s + '&dl=' + encodeURIComponent(location.href);
+"""
+
+PAGE = r"""<!DOCTYPE html><html><head><title>hits</title>
+<script>""" + COLLECT_JS + r"""
+  navigator.sendBeacon(hit(1) + '&en=page_view');
+  navigator.sendBeacon('/b/ss/benchrsid/1/JS-2.22.0?pageName=home');
+  navigator.sendBeacon(hit(2), 'en=view_promotion&ep.promotion_id=A\nen=view_promotion&ep.promotion_id=B');
+  navigator.sendBeacon(hit(3), new Blob(['en=scroll&epn.percent_scrolled=90'], { type: 'text/plain' }));
+  fetch(hit(4), { method: 'POST', body: new URLSearchParams({ en: 'add_to_cart', 'ep.item_id': 'SKU1' }) });
+  const xhr = new XMLHttpRequest();
+  xhr.open('GET', hit(5) + '&en=view_item');
+  xhr.send();
+  addEventListener('pagehide', () => navigator.sendBeacon(hit(6) + '&en=user_engagement'));
+</script>
+</head><body><iframe src="/frame.html"></iframe></body></html>"""
+
+FRAME = r"""<!DOCTYPE html><html><head><script>""" + COLLECT_JS + r"""
+  fetch(hit(1) + '&en=frame_hit');
+</script></head><body></body></html>"""
+
+# en -> (hits, transport of the interceptor)
+EXPECTED = {
+    'page_view': (1, 'sendBeacon'),
+    'view_promotion': (2, 'sendBeacon'),
+    'scroll': (1, 'sendBeacon'),
+    'add_to_cart': (1, 'fetch'),
+    'view_item': (1, 'xhr'),
+    'frame_hit': (1, 'fetch'),
+    'user_engagement': (1, 'sendBeacon')
+}
+
+async def run():
+    ok = True
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        await serve(context, {"/": PAGE, "/frame.html": FRAME, "/next.html": "<!DOCTYPE html><title>next</title>"})
+        captured_data = new_captured_data()
+        buffer = await install_event_buffer(context, captured_data)
+        await install_hit_interceptor(context, buffer, captured_data)
+        page = await context.new_page()
+        await install_analytics_capture(page, captured_data)
+
+        await page.goto(ORIGIN + "/", wait_until="networkidle")
+        await buffer.flush(page)
+        await page.goto(ORIGIN + "/next.html", wait_until="networkidle")
+        await page.wait_for_timeout(FLUSH_MS + 100)
+
+        hits, index = captured_data['ga4_calls'], captured_data['hit_index']
+        stored = list(zip(hits.column('en'), index.sources()))
+        print("🔎 Hit interceptor checks")
+        ok &= check("every hit is stored once",
+                    Counter(en for en, _ in stored) == {en: n for en, (n, _) in EXPECTED.items()})
+        for en, (_, transport) in EXPECTED.items():
+            labels = {label for hit_en, label in stored if hit_en == en}
+            ok &= check(f"{en}: seen by {transport} and route ({', '.join(sorted(labels)) or 'not stored'})",
+                        bool(labels) and all(set(label.split('+')) == {transport, 'route'} for label in labels))
+        ok &= check("the second sighting of every hit only added its source",
+                    index.duplicates == len(stored) and index.source_counts() == Counter(
+                        label for _, label in stored))
+        beacons = [event['target'] for event in captured_data['page_events'] if event.get('type') == 'beacon']
+        ga4_beacons = sum(n for n, transport in EXPECTED.values() if transport == 'sendBeacon') - 1
+        ok &= check(f"every beacon is recorded as a page event ({len(beacons)}, the Adobe one included)",
+                    len(beacons) == ga4_beacons + 1 and sum('/b/ss/' in target for target in beacons) == 1)
+        print(f"   {'All checks passed' if ok else 'Some checks FAILED'}")
+        await context.close()
+        await browser.close()
+    return ok
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,30 @@
+"""
+Helpers shared by the browser checks (bench_datalayer.py, bench_event_buffer.py,
+bench_interceptor.py): pages served from routes on the browser context, and
+the printed check lines.
+"""
+
+from event_buffer import FLUSH_MS
+
+ORIGIN = "https://avp.bench"
+SECOND_ORIGIN = "https://avp-second.bench"
+
+async def serve(context, pages, origin=ORIGIN):
+    """Answer every request to `origin` from `pages` ({path: html}); anything else gets a 204."""
+    async def handle(route):
+        path = route.request.url[len(origin):].split('?', 1)[0] or "/"
+        if path in pages:
+            await route.fulfill(status=200, content_type="text/html", body=pages[path])
+        else:
+            await route.fulfill(status=204, body="")
+    await context.route(f"{origin}/**", handle)
+
+async def settle(page, buffer):
+    """Flush what the page recorded, then once more for what it sent back in answer to a reply."""
+    await buffer.flush(page)
+    await page.wait_for_timeout(FLUSH_MS + 100)
+    await buffer.flush(page)
+
+def check(name, condition):
+    print(f"   {'✅' if condition else '❌'} {name}")
+    return condition
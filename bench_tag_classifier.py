@@ -0,0 +1,151 @@
+"""
+Benchmark and check the tag classifier on a large synthetic request stream.
+
+Builds a stream of analytics hits for every default vendor mixed with
+first-party pages, assets and CDN requests, checks that the compiled
+classifier agrees with the old if/else chain of url.includes() checks on
+every URL, then times both and reports URLs per minute.
+
+The chain's cost grows with every vendor added to it, the classifier's
+hardly at all, so the timing is repeated with --extra-vendors generated
+vendor rules (as an airline rule file would add) on top of the defaults,
+against the chain extended with the same checks. An optional rule file
+(--rules) is loaded on top of the defaults for the timing runs.
+
+    python bench_tag_classifier.py
+    python bench_tag_classifier.py --urls 2000000 --extra-vendors 500 --rules my_vendors.json
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from tag_classifier import TagClassifier, load_rules
+
+VENDOR_URLS = [
+    "https://region1.google-analytics.com/g/collect?v=2&tid=G-ABC&en=page_view&_s={n}",
+    "https://ad.doubleclick.net/activity;src=123;type=sales;cat=buy;ord={n}",
+    "https://adservice.google.com/ddm/fls/z/src=1;ord={n}",
+    "https://smetrics.omtrdc.net/b/ss/rsid/1/JS-2.22/s{n}",
+    "https://collect.tealiumiq.com/event?tealium_event=view&n={n}",
+    "https://tags.tiqcdn.com/utag/acct/main/prod/utag.js?n={n}",
+    "https://www.googletagmanager.com/gtag/js?id=G-ABC&n={n}",
+    "https://cdn.example-shop.com/gtm.js?id=GTM-1&n={n}",
+    "https://www.facebook.com/tr?id=1&ev=PageView&n={n}",
+    "https://bat.bing.com/action/0?ti=1&evt=pageLoad&n={n}",
+    "https://ct.pinterest.com/v3/?tid=1&event=init&n={n}",
+    "https://tr.snapchat.com/p?n={n}",
+    "https://analytics.tiktok.com/i/pixel/events?n={n}"
+]
+
+FIRST_PARTY_URLS = [
+    "https://ecommerce.tealiumdemo.com/media/catalog/product/{n}.jpg",
+    "https://ecommerce.tealiumdemo.com/skin/frontend/rwd/default/css/styles.css?v={n}",
+    "https://ecommerce.tealiumdemo.com/checkout/cart/?item={n}",
+    "https://fonts.gstatic.com/s/raleway/v{n}.woff2",
+    "https://cdn.jsdelivr.net/npm/lib@{n}/dist/lib.min.js",
+    "https://www.flyairline.example/api/fares?from=MAA&to=DXB&n={n}"
+]
+
+def reference_category(url):
+    """The old in-page categorization, one url.includes() check after another."""
+    if "/g/collect" in url:
+        return "GA4"
+    if "doubleclick.net" in url:
+        return "Floodlight"
+    if "adservice.google.com" in url:
+        return "Google Ads"
+    if "omtrdc.net" in url or "2o7.net" in url:
+        return "Adobe Analytics"
+    if "tealiumiq.com" in url or "tealium.com" in url:
+        return "Tealium"
+    if "gtm.js" in url or "googletagmanager.com" in url:
+        return "GTM"
+    if "facebook.com/tr" in url:
+        return "Facebook Pixel"
+    if "bat.bing.com" in url:
+        return "Bing Ads"
+    if "pinterest.com/v3/" in url:
+        return "Pinterest"
+    if "snapchat.com/p" in url:
+        return "Snapchat"
+    if "tiktok.com/i/" in url:
+        return "TikTok"
+    return "Other"
+
+def extra_vendor_rules(n_vendors):
+    """Host rules for n generated vendors, as a rule file would add them."""
+    return [{'category': f"Vendor {i}", 'host': f"tags.vendor{i}.example", 'path': '/collect'}
+            for i in range(n_vendors)]
+
+def extended_reference(rules):
+    """The if/else chain with one more url.includes() check per extra rule."""
+    checks = [(f"{rule['host']}{rule['path']}", rule['category']) for rule in rules]
+
+    def category(url):
+        for text, name in checks:
+            if text in url:
+                return name
+        return reference_category(url)
+    return category
+
+def synthetic_urls(n_urls, seed, n_vendors=0, vendor_share=0.3):
+    rng = random.Random(seed)
+    urls = []
+    for n in range(n_urls):
+        if rng.random() < vendor_share:
+            if n_vendors and rng.random() < 0.5:
+                urls.append(f"https://tags.vendor{rng.randrange(n_vendors)}.example/collect?e=view&n={n}")
+                continue
+            templates = VENDOR_URLS
+        else:
+            templates = FIRST_PARTY_URLS
+        urls.append(rng.choice(templates).format(n=rng.randrange(10**6)))
+    return urls
+
+def time_both(name, urls, classifier, reference):
+    results = {}
+    for label, classify in (('compiled classifier', classifier.classify_many),
+                            ('if/else chain', lambda urls: [reference(url) for url in urls])):
+        start = time.perf_counter()
+        classify(urls)
+        results[label] = time.perf_counter() - start
+
+    print(f"\n📏 {name}: {len(urls):,} URLs against {len(classifier.rules)} rules")
+    for label, elapsed in results.items():
+        print(f"   {label:<20}: {elapsed:6.2f}s  {len(urls) / elapsed * 60 / 1e6:8.1f} M URLs/min")
+    print(f"   Speed-up: {results['if/else chain'] / results['compiled classifier']:.1f}x")
+    return results
+
+def run(n_urls, seed, n_vendors, rule_paths):
+    base_rules = load_rules(rule_paths)
+    urls = synthetic_urls(n_urls, seed)
+    default = TagClassifier()
+    mismatches = [url for url in urls[:200000] if default.classify(url) != reference_category(url)]
+    assert not mismatches, f"{len(mismatches)} mismatches, e.g. {mismatches[0]}"
+    print(f"✅ {min(n_urls, 200000):,} URLs classified identically to the old if/else chain")
+    results = {'default': time_both("Default rules", urls, TagClassifier(base_rules), reference_category)}
+
+    if n_vendors:
+        extra = extra_vendor_rules(n_vendors)
+        classifier = TagClassifier(extra + base_rules)
+        reference = extended_reference(extra)
+        urls = synthetic_urls(n_urls, seed, n_vendors)
+        mismatches = [url for url in urls[:200000] if classifier.classify(url) != reference(url)]
+        assert not mismatches, f"{len(mismatches)} mismatches, e.g. {mismatches[0]}"
+        results['extended'] = time_both(f"With {n_vendors} extra vendors", urls, classifier, reference)
+        print("📊 Categories (first 100k URLs, top 5):")
+        for category, count in Counter(classifier.classify_many(urls[:100000])).most_common(5):
+            print(f"   {category:<20}: {count}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the compiled tag classifier")
+    parser.add_argument("--urls", type=int, default=1000000, help="Number of synthetic request URLs")
+    parser.add_argument("--extra-vendors", type=int, default=200,
+                        help="Generated vendor rules added for the scaling run (0 to skip)")
+    parser.add_argument("--rules", action="append", default=[], help="Extra rule file (repeatable)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.urls, args.seed, args.extra_vendors, args.rules)
@@ -0,0 +1,127 @@
+"""
+Benchmark: per-action cost and disk use of the trace policies.
+
+Walks the same scripted journey (page loads, scrolls and waits, with a step
+boundary after every page) in fresh browser contexts once per tracing mode:
+
+- none: no tracing, the baseline;
+- single: the old always-on trace, one zip written when the context ends;
+- always, last:N, failures: per-step chunks through StepTracer.
+
+Every mode reports the time per browser action over the baseline and the
+bytes left on disk (and written, for last:N, which spools every chunk).
+--fail-step makes one step count as failed, as a timed-out wait would.
+
+    python bench_tracing.py --local-site
+    python bench_tracing.py --local-site --steps 30 --fail-step 20 --last 3
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+from playwright.async_api import async_playwright
+
+from bench_capture import DEFAULT_PATHS
+from core import DEFAULT_URL
+from local_site import start_local_site
+from step_tracing import StepTracer
+
+ACTIONS_PER_STEP = 3
+
+def disk_bytes(directory):
+    return sum(path.stat().st_size for path in Path(directory).rglob("*") if path.is_file())
+
+async def journey(page, urls, steps, on_step):
+    for i in range(steps):
+        await page.goto(urls[i % len(urls)], wait_until="load")
+        await page.mouse.wheel(0, 600)
+        await page.wait_for_selector("body", state="attached")
+        await on_step(f"step_{i + 1}")
+
+async def measure(browser, mode, urls, steps, fail_step, directory):
+    context = await browser.new_context()
+    page = await context.new_page()
+    tracer = None
+    if mode == 'single':
+        await context.tracing.start(screenshots=True, snapshots=True, sources=True)
+    elif mode != 'none':
+        tracer = StepTracer(context, directory, 'bench', mode)
+        await tracer.start()
+
+    async def on_step(step):
+        if tracer:
+            await tracer.step_done(step, failed=step == f"step_{fail_step}")
+
+    start = time.perf_counter()
+    await journey(page, urls, steps, on_step)
+    if mode == 'single':
+        await context.tracing.stop(path=str(Path(directory) / "playwright_trace.zip"))
+    elif tracer:
+        await tracer.finish()
+    elapsed = time.perf_counter() - start
+    await context.close()
+
+    on_disk = disk_bytes(directory)
+    return {
+        'mode': mode,
+        'actions': steps * ACTIONS_PER_STEP,
+        'seconds': elapsed,
+        'files': sum(1 for _ in Path(directory).rglob("*.zip")),
+        'disk': on_disk,
+        'written': tracer.stats['bytes_written'] if tracer else on_disk
+    }
+
+async def run(url, paths, steps, fail_step, last):
+    urls = [urljoin(url, path) for path in paths]
+    modes = ['none', 'single', 'always', f'last:{last}', 'failures']
+    results = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        # One untimed pass so the first mode does not pay for a cold cache
+        with tempfile.TemporaryDirectory() as directory:
+            await measure(browser, 'none', urls, min(steps, len(urls)), 0, directory)
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                results.append(await measure(browser, mode, urls, steps, fail_step, directory))
+        await browser.close()
+
+    base = results[0]
+    print(f"\n🎞️ Trace policies over {steps} steps ({base['actions']} actions) of {url}, step {fail_step} failing")
+    print(f"   {'mode':<10}{'seconds':>9}{'ms/action':>11}{'overhead':>10}{'zips':>6}{'on disk':>10}{'written':>10}")
+    for r in results:
+        per_action = 1000 * r['seconds'] / r['actions']
+        overhead = per_action - 1000 * base['seconds'] / base['actions']
+        print(f"   {r['mode']:<10}{r['seconds']:>9.1f}{per_action:>11.1f}{overhead:>+10.1f}{r['files']:>6}"
+              f"{r['disk'] / 2**20:>8.1f}Mi{r['written'] / 2**20:>8.1f}Mi")
+
+    single = next(r for r in results if r['mode'] == 'single')
+    for r in results[2:]:
+        if single['disk']:
+            print(f"   {r['mode']:<10} keeps {100 * r['disk'] / single['disk']:.0f}% of the always-on trace on disk "
+                  f"({(single['disk'] - r['disk']) / 2**20:.1f} MiB saved)")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-action cost and disk use of the trace policies")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Site to load")
+    parser.add_argument("--path", action="append", dest="paths", help="Page path to load (repeatable)")
+    parser.add_argument("--steps", type=int, default=20, help="Steps of the journey (one page load each)")
+    parser.add_argument("--fail-step", type=int, default=15, help="Step counted as failed (0: none)")
+    parser.add_argument("--last", type=int, default=3, help="N of the last:N policy")
+    parser.add_argument("--local-site", action="store_true", help="Benchmark against the local stand-in site")
+    args = parser.parse_args()
+
+    url = args.url
+    server = None
+    if args.local_site:
+        server, url, _ = start_local_site()
+
+    try:
+        asyncio.run(run(url, args.paths or DEFAULT_PATHS, args.steps, args.fail_step, args.last))
+    finally:
+        if server:
+            server.shutdown()
@@ -0,0 +1,183 @@
+"""
+Check the delta-encoded utag_data store and measure what the deltas save.
+
+Replays a synthetic checkout sequence of --snapshots utag.data states
+(home, category, product, cart, checkout steps and order success, with
+in-page changes such as cart adds between page loads) through the same
+delta logic the data-layer observer runs in the page: per-key JSON compared
+with the last reported state, kept with its lineage token in the
+sessionStorage of each origin, and a full snapshot (with a new lineage) on
+an origin's first report and whenever a delta is refused. The payment step
+runs on a second origin, so every journey leaves the shop origin and comes
+back to it, and its first delta there has to be refused. A lost report is
+simulated every --lose-every deltas, so the next delta is out of sequence
+and has to be answered with a full snapshot too. A separate check replays
+the case where both origins have counted up to the same sequence number.
+
+Every snapshot rebuilt by UtagSnapshots (by index and by iteration, in
+memory and spilled to segment files) is checked against the original, and
+the bytes sent as deltas are compared with full clones of every snapshot.
+
+    python bench_utag_store.py
+    python bench_utag_store.py --snapshots 20000 --spill-rows 500
+"""
+
+import argparse
+import json
+import random
+import tempfile
+
+from segments import SegmentLog
+from utag_store import UtagSnapshots
+
+ORIGIN = "https://ecommerce.tealiumdemo.com"
+PAYMENT_ORIGIN = "https://pay.tealiumdemo.com"
+PAGES = ['home', 'category', 'product', 'product', 'cart', 'checkout_shipping', 'checkout_payment',
+         'checkout_review', 'order_success']
+
+class PageObserver:
+    """The page side of datalayer.py for one origin: last reported state as per-key JSON, deltas against it."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.seq = -1
+        self.lineage = None
+        self.values = {}
+        self.need_full = True
+
+    def report(self, data):
+        if self.need_full:
+            self.lineage = f"{self.rng.getrandbits(48):012x}"
+        base = {} if self.need_full else self.values
+        values, changed, full_bytes = {}, {}, 0
+        for key, value in data.items():
+            text = json.dumps(value, separators=(',', ':'))
+            values[key] = text
+            full_bytes += len(key) + len(text)
+            if base.get(key) != text:
+                changed[key] = json.loads(text)
+        removed = [key for key in base if key not in values]
+        delta = {'lineage': self.lineage, 'seq': self.seq + 1, 'base': self.seq, 'full': self.need_full, 'set': changed,
+                 'removed': removed, 'fullBytes': full_bytes}
+        self.seq += 1
+        self.values = values
+        self.need_full = False
+        return delta
+
+def checkout_states(n_snapshots, rng):
+    """utag.data states of repeated checkout journeys, with page loads and in-page changes."""
+    customer = {'site_region': 'us', 'site_currency': 'USD', 'language_code': 'en',
+                'customer_id': '', 'customer_email': '', 'customer_type': 'guest',
+                'tealium_visitor_id': f"{rng.getrandbits(64):016x}", 'ab_test_group': rng.choice('AB')}
+    cart = []
+    states = []
+    order = 100000
+    while len(states) < n_snapshots:
+        for page in PAGES:
+            data = dict(customer, page_name=page, page_type=page.split('_')[0], tealium_event='view',
+                        page_url=f"{ORIGIN}/{page}.html", search_keyword='', referrer=f"{ORIGIN}/")
+            if page == 'category':
+                data['category_name'] = rng.choice(['women/tops', 'men/shirts', 'accessories'])
+                data['product_impression_id'] = [f"SKU{rng.randrange(1000)}" for _ in range(24)]
+            if page == 'product':
+                sku = f"SKU{rng.randrange(1000)}"
+                data.update(product_id=[sku], product_name=[f"Product {sku}"],
+                            product_price=[f"{rng.uniform(5, 200):.2f}"], product_category=['tops'])
+            if cart or page.startswith(('cart', 'checkout', 'order')):
+                data.update(cart_product_id=[item[0] for item in cart],
+                            cart_product_price=[item[1] for item in cart],
+                            cart_product_quantity=[item[2] for item in cart],
+                            cart_total_items=str(sum(item[2] for item in cart)),
+                            cart_total_value=f"{sum(float(item[1]) * item[2] for item in cart):.2f}")
+            if page == 'checkout_payment':
+                customer.update(customer_id=str(rng.randrange(10**6)), customer_email="bench@example.com",
+                                customer_type='registered')
+                data.update(customer)
+            if page == 'order_success':
+                order += 1
+                data.update(order_id=str(order), order_total=data.get('cart_total_value', '0.00'),
+                            order_currency='USD', order_payment_type='credit card')
+                cart = []
+            states.append((page, dict(data)))
+
+            # In-page changes reported by the Proxy: one delta per microtask
+            if page == 'product':
+                cart.append((data['product_id'][0], data['product_price'][0], rng.randrange(1, 3)))
+                states.append((page, dict(data, tealium_event='cart_add', cart_product_id=[i[0] for i in cart],
+                                          cart_total_items=str(sum(i[2] for i in cart)))))
+            if page == 'category':
+                states.append((page, dict(data, tealium_event='filter', category_filter='size:M')))
+    return states[:n_snapshots]
+
+def page_url(page):
+    return f"{PAYMENT_ORIGIN if page == 'checkout_payment' else ORIGIN}/{page}.html"
+
+def check_origin_return(rng):
+    """A -> B -> back to A, with B counted up to the sequence number A left behind."""
+    store = UtagSnapshots(spill_rows=0)
+    shop, payment = PageObserver(rng), PageObserver(rng)
+    for observer, page in ((shop, 'cart'), (payment, 'checkout_payment')):
+        for step in range(4):
+            delta = observer.report({'page_name': page, 'step': step})
+            store.append_delta(dict(delta, url=page_url(page), timestamp=step))
+    delta = shop.report({'page_name': 'checkout_review', 'step': 4})
+    refused = delta['base'] == store.seq and not store.accepts(delta)
+    print(f"   {'✅' if refused else '❌'} back on the first origin with a matching sequence number, "
+          f"its delta is refused (base {delta['base']}, stored seq {store.seq})")
+    return refused
+
+def run(n_snapshots, lose_every, spill_rows, seed):
+    rng = random.Random(seed)
+    states = checkout_states(n_snapshots, rng)
+    observers = {}
+    ok = True
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        stores = {'in memory': UtagSnapshots(spill_rows=0),
+                  f"spilled every {spill_rows} rows": UtagSnapshots(SegmentLog(spill_dir, 'utag_data'), spill_rows)}
+        refused = 0
+        for n, (page, data) in enumerate(states):
+            url = page_url(page)
+            observer = observers.setdefault(url.split('/')[2], PageObserver(rng))
+            delta = observer.report(data)
+            delta.update(url=url, timestamp=1_700_000_000_000 + n * 250)
+            if lose_every and n % lose_every == lose_every - 1:
+                continue                            # lost on the way: the next delta has the wrong base
+            if not all(store.accepts(delta) for store in stores.values()):
+                refused += 1
+                observer.need_full = True
+                delta = observer.report(data)
+                delta.update(url=url, timestamp=1_700_000_000_000 + n * 250)
+            for store in stores.values():
+                store.append_delta(delta)
+        kept = [(page_url(page), data) for n, (page, data) in enumerate(states)
+                if not (lose_every and n % lose_every == lose_every - 1)]
+
+        print(f"📦 {len(states):,} utag.data states of a synthetic checkout sequence over two origins, "
+              f"{len(states) - len(kept)} lost, {refused} delta(s) refused and resent in full")
+        for name, store in stores.items():
+            by_index = all(store[i]['data'] == data and store[i]['url'] == url
+                           for i, (url, data) in enumerate(kept))
+            by_iteration = [snapshot['data'] for snapshot in store] == [data for _, data in kept]
+            sample = rng.sample(range(len(kept)), min(200, len(kept)))
+            random_access = all(store.data(i) == kept[i][1] for i in sample)
+            passed = len(store) == len(kept) and by_index and by_iteration and random_access
+            ok &= passed
+            print(f"   {'✅' if passed else '❌'} {name}: every rebuilt snapshot matches the original "
+                  f"({len(store):,} stored)")
+
+        ok &= check_origin_return(rng)
+        store = stores['in memory']
+        keyframes = sum(1 for delta in store.deltas if 'keyframe' in delta)
+        print(f"   {store.delta_bytes / 1024:.1f} KB sent as deltas vs {store.full_bytes / 1024:.1f} KB as full "
+              f"clones ({store.full_bytes / store.delta_bytes:.1f}x less), {keyframes} keyframe(s) kept")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the delta-encoded utag_data store and measure the saving")
+    parser.add_argument("--snapshots", type=int, default=1000, help="utag.data states in the sequence")
+    parser.add_argument("--lose-every", type=int, default=250, help="Lose one report every N (0: never)")
+    parser.add_argument("--spill-rows", type=int, default=100, help="Spill threshold of the spilled store")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.snapshots, args.lose_every, args.spill_rows, args.seed) else 1)
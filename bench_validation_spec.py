@@ -0,0 +1,148 @@
+"""
+Check and time the compiled mapping-spec comparator.
+
+Builds a synthetic spec of --pairs field pairs (numbers with a tolerance,
+strings, optional pairs with a default, indexed utag arrays) and --hits GA4
+hits paired with a set of utag_data snapshots, with some values off, some
+missing and some that do not parse. The hits x pairs matrix from
+CompiledEvent.evaluate() is checked against a reference that applies the
+spec rules one hit and one pair at a time, then both are timed. The
+flows' own spec files are loaded and compiled too.
+
+    python bench_validation_spec.py
+    python bench_validation_spec.py --pairs 200 --hits 50000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from validation_spec import CompiledEvent, SPEC_DIR, compiled_spec
+
+def synthetic_spec(n_pairs, rng):
+    pairs = []
+    for j in range(n_pairs):
+        pair = {'parameter': f"p{j}", 'ga4': f"ep.p{j}", 'required': rng.random() < 0.7}
+        if j % 2:
+            pair.update(type='number', tolerance=rng.choice([0, 0.01, 0.5]))
+        else:
+            pair['type'] = 'string'
+        pair['utag'] = f"list{j}[{rng.randrange(3)}]" if j % 7 == 0 else f"key{j}"
+        if not pair['required'] and rng.random() < 0.5:
+            pair['default'] = 0 if pair['type'] == 'number' else "none"
+        pairs.append(pair)
+    return pairs
+
+def synthetic_snapshot(pairs, rng):
+    data = {}
+    for pair in pairs:
+        value = round(rng.uniform(0, 500), 2) if pair['type'] == 'number' else f"v{rng.randrange(50)}"
+        if '[' in pair['utag']:
+            key, index = pair['utag'][:-1].split('[')
+            values = [value] * 3
+            data[key] = values[:int(index) + 1] if rng.random() < 0.9 else []
+        elif rng.random() < 0.95:
+            data[pair['utag']] = value
+    return data
+
+def utag_value(snapshot, path):
+    if '[' in path:
+        key, index = path[:-1].split('[')
+        values = snapshot.get(key)
+        value = values[int(index)] if isinstance(values, list) and int(index) < len(values) else None
+    else:
+        value = snapshot.get(path)
+    return None if value == "" or isinstance(value, (list, dict)) else value
+
+def synthetic_hits(pairs, snapshots, n_hits, rng):
+    rows, snapshot_rows = [], []
+    for _ in range(n_hits):
+        s = rng.randrange(len(snapshots))
+        row = {}
+        for pair in pairs:
+            value = utag_value(snapshots[s], pair['utag'])
+            roll = rng.random()
+            if roll < 0.05:
+                continue                        # not sent
+            if roll < 0.08:
+                value = "n/a"                   # does not parse as a number
+            elif roll < 0.15 and value is not None:
+                value = value + 0.005 if pair['type'] == 'number' else f"{value}x"
+            elif value is None:
+                value = "0"
+            row[pair['ga4']] = str(value)
+        rows.append(row)
+        snapshot_rows.append(s)
+    return pd.DataFrame(rows), np.array(snapshot_rows)
+
+def typed(value, pair):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        value = pair.get('default')
+    if value is None:
+        return None
+    if pair['type'] == 'number':
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value)
+
+def reference_matrix(pairs, hits, snapshots, snapshot_rows):
+    """The spec rules applied one hit and one pair at a time."""
+    records = hits.to_dict('records')
+    matrix = np.zeros((len(records), len(pairs)), dtype=bool)
+    for i, (hit, s) in enumerate(zip(records, snapshot_rows)):
+        for j, pair in enumerate(pairs):
+            expected = typed(utag_value(snapshots[s], pair['utag']), pair)
+            actual = typed(hit.get(pair['ga4']), pair)
+            if actual is None:
+                matrix[i, j] = not pair['required']
+            elif expected is None:
+                matrix[i, j] = False
+            elif pair['type'] == 'number':
+                matrix[i, j] = abs(expected - actual) <= pair.get('tolerance', 0)
+            else:
+                matrix[i, j] = expected == actual
+    return matrix
+
+def run(n_pairs, n_hits, n_snapshots, seed):
+    rng = random.Random(seed)
+    pairs = synthetic_spec(n_pairs, rng)
+    snapshots = [synthetic_snapshot(pairs, rng) for _ in range(n_snapshots)]
+    hits, snapshot_rows = synthetic_hits(pairs, snapshots, n_hits, rng)
+
+    started = time.perf_counter()
+    compiled = CompiledEvent('purchase', pairs)
+    compile_time = time.perf_counter() - started
+    started = time.perf_counter()
+    matrix, _, _ = compiled.evaluate(hits, snapshots.__getitem__, snapshot_rows)
+    evaluate_time = time.perf_counter() - started
+    started = time.perf_counter()
+    reference = reference_matrix(pairs, hits, snapshots, snapshot_rows)
+    reference_time = time.perf_counter() - started
+
+    mismatches = int((matrix.to_numpy() != reference).sum())
+    print(f"🧮 {n_pairs} pairs x {n_hits:,} hits against {n_snapshots} snapshots "
+          f"({matrix.to_numpy().mean() * 100:.1f}% of cells pass)")
+    print(f"   {'✅' if not mismatches else '❌'} matrix matches the per-hit reference"
+          f"{'' if not mismatches else f' ({mismatches} cell(s) differ)'}")
+    print(f"   compile {compile_time * 1000:.1f} ms, evaluate {evaluate_time:.2f}s, "
+          f"per-hit loop {reference_time:.2f}s ({reference_time / evaluate_time:.1f}x)")
+
+    for path in sorted(SPEC_DIR.glob("*.json")):
+        events = compiled_spec(str(path))
+        print(f"   ✅ {path} compiles: " + ", ".join(f"{event} ({len(c.parameters)} pairs)"
+                                                    for event, c in events.items()))
+    return mismatches == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the compiled mapping-spec comparator")
+    parser.add_argument("--pairs", type=int, default=50, help="Field pairs in the synthetic spec")
+    parser.add_argument("--hits", type=int, default=10000, help="GA4 hits evaluated")
+    parser.add_argument("--snapshots", type=int, default=100, help="Distinct utag_data snapshots")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.pairs, args.hits, args.snapshots, args.seed) else 1)
@@ -0,0 +1,187 @@
+"""
+Analytics hit capture via URL-pattern routes.
+
+Instead of a page.on("request") listener - which calls back into Python for
+every image, stylesheet and font the page loads - each analytics endpoint is
+registered as its own page.route() pattern, so Python only sees matching
+traffic. Every matched request is passed on with route.fallback(), unmodified,
+to any context route behind it (resource blocking, HAR replay) and then to
+the network.
+
+GA4 requests are decoded (ga4_decoder.py) into one row per event, batched
+POSTs included, of the typed captured_data['ga4_calls'] columns; hits for
+the other vendors are counted per vendor in captured_data['capture'].
+
+GA4 hits are also caught at source: a context init script wraps fetch,
+XMLHttpRequest and navigator.sendBeacon in every document and iframe before
+page scripts run, and records each GA4 request into the in-page event
+buffer (event_buffer.py). Every decoded hit is looked up by its canonical
+identity (hit_index.py) before it is stored, so a hit several paths see is
+stored once and the others are only recorded as its sources.
+"""
+
+import time
+from collections import Counter
+
+from ga4_decoder import decode_request
+from hit_index import HitIndex, hit_identity
+from log_sink import log
+
+GA4_PATTERNS = ["**/g/collect*"]
+
+# Other vendor endpoints, logged and counted but not parsed
+VENDOR_PATTERNS = {
+    'Universal Analytics': ["**/j/collect*"],
+    'Adobe Analytics': ["**/b/ss/**"],
+    'Facebook Pixel': ["**/tr?*"],
+    'Tealium Collect': ["**/i.gif*"],
+    'gtag': ["**/gtag/js*"]
+}
+
+# Init script: GA4 requests made by page scripts, recorded as 'hit' events. Its
+# sendBeacon wrapper sits on top of the event buffer's, which still records
+# every beacon, GA4 or not, as a 'beacon' page event
+HIT_INTERCEPTOR_JS = r"""
+(() => {
+  if (window.__avpInterceptor || !window.__avpRecord) return;
+  window.__avpInterceptor = true;
+  const GA4 = /\/g\/collect/;
+
+  function record(transport, method, url, body) {
+    let target;
+    try { target = new URL(String(url), location.href).href; } catch (e) { return; }
+    if (!GA4.test(target)) return;
+    const timestamp = Date.now();
+    const send = (text) => window.__avpRecord('hit', { transport, method, target, body: text, page: location.href, timestamp });
+    if (body === undefined || body === null) send(null);
+    else if (typeof body === 'string') send(body);
+    else if (body instanceof URLSearchParams) send(body.toString());
+    else if (body instanceof Blob) body.text().then(send, () => {});
+    else if (body instanceof ArrayBuffer || ArrayBuffer.isView(body)) send(new TextDecoder().decode(body));
+    // FormData and streams are left to the capture routes
+  }
+
+  const fetch = window.fetch;
+  if (fetch) {
+    window.fetch = function (input, init) {
+      try {
+        const isRequest = typeof Request !== 'undefined' && input instanceof Request;
+        const method = (init && init.method) || (isRequest ? input.method : 'GET');
+        record('fetch', method.toUpperCase(), isRequest ? input.url : input, init ? init.body : null);
+      } catch (e) {}
+      return fetch.apply(this, arguments);
+    };
+  }
+
+  const open = XMLHttpRequest.prototype.open, send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.open = function (method, url) {
+    this.__avpRequest = { method: String(method).toUpperCase(), url };
+    return open.apply(this, arguments);
+  };
+  XMLHttpRequest.prototype.send = function (body) {
+    try {
+      if (this.__avpRequest) record('xhr', this.__avpRequest.method, this.__avpRequest.url, body);
+    } catch (e) {}
+    return send.apply(this, arguments);
+  };
+
+  if (navigator.sendBeacon) {
+    const sendBeacon = navigator.sendBeacon;
+    navigator.sendBeacon = function (url, data) {
+      try { record('sendBeacon', 'POST', url, data); } catch (e) {}
+      return sendBeacon.apply(this, arguments);
+    };
+  }
+})();
+"""
+
+def _capture_stats(captured_data):
+    return captured_data.setdefault('capture', {'callbacks': 0, 'by_vendor': Counter()})
+
+def store_ga4_request(captured_data, url, post_data, method, source, page_url, ts_ms=None, on_ga4_hit=None):
+    """
+    Decode one GA4 request into captured_data['ga4_calls'] rows, skipping the
+    hits another capture path already stored (captured_data['hit_index']
+    records `source` for those); returns the new rows.
+    """
+    hit_index = captured_data.setdefault('hit_index', HitIndex())
+    ts_ms = ts_ms or time.time() * 1000
+    rows = []
+    # A batched POST carries one event per body line
+    events = decode_request(url, post_data)
+    for index, ga4_params in enumerate(events):
+        identity = hit_identity(ga4_params, page_url, index)
+        if hit_index.seen(identity, source):
+            continue
+        row = captured_data['ga4_calls'].append(
+            ga4_params,
+            url=url,
+            method=method,
+            batch_index=index,
+            batch_size=len(events),
+            ts_ms=ts_ms,
+            page=page_url,
+            source=source
+        )
+        hit_index.add(identity, row, source)
+        rows.append(row)
+        if on_ga4_hit:
+            on_ga4_hit({'row': row, 'params': ga4_params})
+
+        log.debug(f"📊 GA4 Parameters captured ({source}): {len(ga4_params)} parameters ({ga4_params.get('en', 'no event')})",
+                  source='capture')
+
+        if ga4_params.get('en') == 'purchase':
+            log.info(f"💰 PURCHASE EVENT DETECTED! Transaction ID: {ga4_params.get('ep.transaction_id', 'N/A')}, "
+                     f"Value: {ga4_params.get('ep.value', 'N/A')} {ga4_params.get('cu', 'N/A')}, "
+                     f"Item ID: {ga4_params.get('ep.item_id', 'N/A')}", source='capture')
+    return rows
+
+async def install_hit_interceptor(context, buffer, captured_data, on_ga4_hit=None):
+    """Catch GA4 requests at source in every document of `context` (install_event_buffer() first)."""
+    _capture_stats(captured_data)
+
+    def handle_hit(event, source):
+        try:
+            store_ga4_request(captured_data, event['target'], event.get('body'), event.get('method', 'GET'),
+                              event['transport'], event.get('page'), event.get('timestamp'), on_ga4_hit)
+        except Exception as e:
+            log.error(f"⚠️ Error decoding intercepted GA4 request: {str(e)}", source='capture')
+
+    buffer.on('hit', handle_hit)
+    await context.add_init_script(HIT_INTERCEPTOR_JS)
+
+async def install_analytics_capture(page, captured_data, on_ga4_hit=None):
+    """Route the analytics endpoints on `page`; on_ga4_hit(hit) is called for each GA4 hit."""
+    stats = _capture_stats(captured_data)
+
+    async def handle_ga4(route):
+        request = route.request
+        stats['callbacks'] += 1
+        stats['by_vendor']['GA4'] += 1
+        try:
+            log.debug(f"🎯 GA4 Request intercepted: {request.method} {request.url[:100]}...", source='capture')
+            store_ga4_request(captured_data, request.url, request.post_data, request.method,
+                              'route', page.url, on_ga4_hit=on_ga4_hit)
+        except Exception as e:
+            log.error(f"⚠️ Error decoding GA4 request: {str(e)}", source='capture')
+        finally:
+            await route.fallback()
+
+    def vendor_handler(vendor):
+        async def handle_vendor(route):
+            stats['callbacks'] += 1
+            stats['by_vendor'][vendor] += 1
+            log.debug(f"🌐 Analytics Request ({vendor}): {route.request.method} {route.request.url[:80]}...",
+                      source='capture')
+            await route.fallback()
+        return handle_vendor
+
+    for pattern in GA4_PATTERNS:
+        await page.route(pattern, handle_ga4)
+    for vendor, patterns in VENDOR_PATTERNS.items():
+        handler = vendor_handler(vendor)
+        for pattern in patterns:
+            await page.route(pattern, handler)
+
+    return stats
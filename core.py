@@ -1,1046 +1,897 @@
-from playwright.sync_api import sync_playwright, TimeoutError
-import os
+from playwright.async_api import TimeoutError
 import json
+import argparse
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import pathlib
 from collections import Counter
+from urllib.parse import urljoin, urlsplit
 import sys
 import subprocess
 from pathlib import Path
 
-def automate_tealium_add_to_cart_from_home(url):
-    # Enable Playwright Inspector for live debugging
-    os.environ["PWDEBUG"] = "1"
+import time
+from functools import partial
+
+from engine import make_job, run_flows_sync
+from segments import SPILL_ROWS
+from step_sync import StepSync
+from step_tracing import parse_trace_policy
+from capture import install_analytics_capture, install_hit_interceptor
+from resource_timing import install_resource_observer, resource_frame
+from tag_classifier import load_classifier
+from event_buffer import install_event_buffer
+from datalayer import install_datalayer_observers
+from ga4_decoder import items_frame
+from item_validation import utag_items_frame, validate_items, print_item_summary
+from alignment import align_hits, print_alignment
+from validation_spec import spec_path, compiled_spec, comparison_rows, print_matrix
+from state_cache import load_snapshot, save_snapshot, invalidate_snapshot
+from resource_blocking import load_policy, install_resource_blocking, print_blocking_summary
+from har_mode import HAR_MODES, har_job_options
+from local_site import start_local_site, print_collector_stats
+from profiles import (PROFILES, DEFAULT_PROFILE as DEFAULT_RUN_PROFILE, get_profile,
+                      apply_profile, context_options_for, record_profile_timing)
+from log_sink import log, console_recorder, DEBUG
+
+DEFAULT_URL = "https://ecommerce.tealiumdemo.com/"
+DEFAULT_ACCOUNT = "edu-tiq-exam-2024"
+DEFAULT_PROFILE = "exam253"
+DEFAULT_CONSENT = "optin"
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1366, 'height': 768},
+    'record_video_dir': "videos/",
+    'record_video_size': {"width": 1366, "height": 768},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+async def open_training_profile(page, sync, url, account, profile):
+    """Configure the Tealium training account/profile, then open the site."""
+    # Navigate to training URL first
+    training_url = urljoin(url, "/training")
+    log.info("🎓 Loading Tealium training configuration...")
+    await page.goto(training_url, wait_until="domcontentloaded")
     
-    with sync_playwright() as p:
-        # Launch browser with Playwright UI Inspector
-        browser = p.chromium.launch(
-            headless=False, 
-            slow_mo=1000  # Slower for better visibility in inspector
-        )
-        context = browser.new_context(
-            viewport={'width': 1366, 'height': 768},
-            record_video_dir="videos/",
-            record_video_size={"width": 1366, "height": 768},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        
-        # Start tracing for Playwright UI
-        context.tracing.start(screenshots=True, snapshots=True, sources=True)
-        
-        page = context.new_page()
-        
-        # Storage for captured data
-        captured_data = {
-            'utag_data': [],
-            'ga4_calls': [],
-            'network_calls': []
-        }
+    # Handle Tealium Education Configuration modal
+    try:
+        # Wait for the modal to appear
+        await sync.wait_for_selector(".modal-content", step="training_modal", replaced_ms=3000,
+                                     deadline_ms=10000, required=True)
+        log.info("✅ Tealium Education Configuration modal found")
         
-        # Enable console logging
-        def handle_console_msg(msg):
-            print(f"🖥️ Console [{msg.type}]: {msg.text}")
+        # Fill in the account information
+        await page.fill("#tu-form-account", account)
+        log.info(f"✅ Account filled: {account}")
         
-        page.on("console", handle_console_msg)
+        await page.fill("#tu-form-profile", profile)
+        log.info(f"✅ Profile filled: {profile}")
         
-        # Network interception using Playwright API - Enhanced
-        def handle_request(request):
-            url = request.url
-            # Capture all GA4 requests (including GET requests with parameters in URL)
-            if 'google-analytics.com/g/collect' in url:
-                print(f"🎯 GA4 Request intercepted: {request.method} {url[:100]}...")
-                
-                # Parse GA4 parameters from URL immediately
-                try:
-                    from urllib.parse import urlparse, parse_qs, unquote
-                    parsed_url = urlparse(url)
-                    params = parse_qs(parsed_url.query)
-                    
-                    # Convert to single values and decode
-                    ga4_params = {}
-                    for k, v in params.items():
-                        if v:
-                            ga4_params[k] = unquote(v[0])
-                    
-                    captured_data['ga4_calls'].append({
-                        'url': url,
-                        'params': ga4_params,
-                        'method': request.method,
-                        'timestamp': datetime.now().isoformat(),
-                        'page': page.url
-                    })
-                    
-                    print(f"📊 GA4 Parameters captured: {len(ga4_params)} parameters")
-                    
-                    # Check for purchase event
-                    if ga4_params.get('en') == 'purchase':
-                        print("💰 PURCHASE EVENT DETECTED!")
-                        print(f"💳 Transaction ID: {ga4_params.get('ep.transaction_id', 'N/A')}")
-                        print(f"💵 Value: {ga4_params.get('ep.value', 'N/A')}")
-                        print(f"💰 Currency: {ga4_params.get('cu', 'N/A')}")
-                        print(f"🏷️ Item ID: {ga4_params.get('ep.item_id', 'N/A')}")
-                        
-                except Exception as e:
-                    print(f"⚠️ Error parsing GA4 URL: {str(e)}")
-            
-            elif 'google-analytics.com' in url or 'gtag' in url:
-                print(f"🌐 Analytics Request: {request.method} {url[:80]}...")
+        # Server and Environment should already be selected (Tealium iQ and prod)
+        # Click Save changes
+        await page.click("#add_cookies")
+        log.info("✅ Save changes clicked")
+        await sync.wait_for_load_state("load", step="training_saved", replaced_ms=3000)
         
-        def handle_response(response):
-            # We'll primarily use the request handler since GA4 data is in the URL
-            pass
+        # Now navigate to the main ecommerce site
+        log.info("🌐 Navigating to main ecommerce site...")
+        await page.goto(url, wait_until="domcontentloaded")
+        await sync.wait_for_utag(step="home_loaded", replaced_ms=3000)
         
-        # Enable network monitoring
-        page.on("request", handle_request)
-        page.on("response", handle_response)
+    except TimeoutError:
+        log.warning("⚠️ Tealium Education Configuration modal not found, proceeding directly to site")
+        await page.goto(url, wait_until="domcontentloaded")
+        await sync.wait_for_utag(step="home_loaded", replaced_ms=3000)
+
+async def accept_consent(page, context, sync, consent):
+    """Answer the Tealium consent banner (falls back to a consent cookie)."""
+    log.info("🍪 Checking for consent banner...")
+    try:
+        # Wait for consent banner and handle it
+        consent_radio = await page.wait_for_selector(f"input[type='radio'][value='{consent}']", timeout=5000)
+        if consent_radio:
+            await page.check(f"input[type='radio'][value='{consent}']")
+            log.info(f"✅ Consent '{consent}' selected")
+            await page.click("#consent_prompt_submit")
+            log.info("✅ Consent Submit clicked")
+            
+            # Check cookies as soon as the consent manager has written them
+            await sync.wait_for_function("() => /CONSENTMGR|consent/i.test(document.cookie)",
+                                         "consent cookie written", step="consent_saved",
+                                         replaced_ms=4000, deadline_ms=5000)
+            cookies = await context.cookies()
+            log.info(f"📋 Total cookies found: {len(cookies)}")
+            
+            consent_cookie = None
+            for cookie in cookies:
+                if 'CONSENTMGR' in cookie['name'] or 'consent' in cookie['name'].lower():
+                    consent_cookie = cookie
+                    log.info(f"✅ Consent cookie found: {cookie['name']} = {cookie['value']}")
+                    break
+            
+            if not consent_cookie:
+                log.warning("⚠️ No consent cookie found after banner interaction")
         
-        # Navigate to training URL first
-        training_url = "https://ecommerce.tealiumdemo.com/training"
-        print("🎓 Loading Tealium training configuration...")
-        page.goto(training_url, wait_until="networkidle")
-        page.wait_for_timeout(3000)
+    except TimeoutError:
+        log.warning("⚠️ Consent banner not found or timed out")
+        log.info("🔄 Checking if site is already loaded without banner...")
         
-        # Handle Tealium Education Configuration modal
+        # Check if we can proceed without consent banner
         try:
-            # Wait for the modal to appear
-            page.wait_for_selector(".modal-content", timeout=10000)
-            print("✅ Tealium Education Configuration modal found")
-            
-            # Fill in the account information
-            page.fill("#tu-form-account", "edu-tiq-exam-2024")
-            print("✅ Account filled: edu-tiq-exam-2024")
-            
-            page.fill("#tu-form-profile", "exam253")
-            print("✅ Profile filled: exam253")
-            
-            # Server and Environment should already be selected (Tealium iQ and prod)
-            # Click Save changes
-            page.click("#add_cookies")
-            print("✅ Save changes clicked")
-            page.wait_for_timeout(3000)
-            
-            # Now navigate to the main ecommerce site
-            print("🌐 Navigating to main ecommerce site...")
-            page.goto(url, wait_until="networkidle")
-            page.wait_for_timeout(3000)
-            
-        except TimeoutError:
-            print("⚠️ Tealium Education Configuration modal not found, proceeding directly to site")
-            page.goto(url, wait_until="networkidle")
-            page.wait_for_timeout(3000)
-        
-        # Fix viewport positioning and zoom
-        page.evaluate("""
-            // Reset any CSS transforms or positioning issues
-            document.body.style.transform = 'none';
-            document.body.style.margin = '0';
-            document.body.style.padding = '0';
-            document.documentElement.style.margin = '0';
-            document.documentElement.style.padding = '0';
-            
-            // Scroll to top-left
-            window.scrollTo(0, 0);
-            
-            console.log('🔧 Fixed viewport positioning');
-        """)
-        
-        # Function to capture utag_data
-        def capture_utag_data():
-            try:
-                utag_data = page.evaluate("""
-                (() => {
-                    const dataObj = typeof utag_data !== 'undefined' 
-                        ? utag_data 
-                        : (window.utag && window.utag.data ? window.utag.data : null);
-                    if (dataObj) {
-                        console.log('📊 utag_data found on:', window.location.pathname);
-                        return {
-                            url: window.location.pathname,
-                            timestamp: Date.now(),
-                            data: JSON.parse(JSON.stringify(dataObj))
-                        };
-                    }
-                    return null;
-                })();
-                """)
-                
-                if utag_data:
-                    captured_data['utag_data'].append(utag_data)
-                    print(f"📊 utag_data captured on: {utag_data['url']}")
-                    
-                    # Print key purchase data if available
-                    data = utag_data['data']
-                    if 'order_total' in data:
-                        print(f"💰 Purchase data found: Total={data.get('order_total')}, ID={data.get('order_id')}")
-                        
-            except Exception as e:
-                print(f"⚠️ Error capturing utag_data: {str(e)}")
-        
-        # Initialize your exact working GA4 capture logic
-        page.evaluate("""
-            // Your exact working logic
-            window.ga4Captured = [];
-            
-            // Intercept fetch calls
-            const originalFetch = window.fetch;
-            window.fetch = function(...args) {
-                const url = args[0];
-                if (url && url.includes('google-analytics.com/g/collect')) {
-                    try {
-                        const urlObj = new URL(url);
-                        const params = Object.fromEntries(urlObj.searchParams);
-                        window.ga4Captured.push({
-                            url: url,
-                            params: params,
-                            timestamp: Date.now()
-                        });
-                        console.log('🎯 GA4 call captured');
-                    } catch (e) {
-                        console.log('Error parsing GA4 URL:', e);
-                    }
-                }
-                return originalFetch.apply(this, args);
-            };
-            
-            // Your exact comparison function
-            window.runComparison = function() {
-                console.log("🔍 Generating GA4 vs utag_data comparison table...");
-
-                if (!window.ga4Captured || ga4Captured.length === 0) {
-                    console.warn("⚠️ No GA4 calls captured. Run GA4 capture snippet first.");
-                    return;
-                }
-                if (!window.utag || !window.utag.data) {
-                    console.warn("⚠️ utag.data not found.");
-                    return;
-                }
-
-                // Flatten utag_data for comparison
-                const utagPurchase = {
-                    order_currency: utag.data.order_currency,
-                    order_total: Number(utag.data.order_total),
-                    order_id: utag.data.order_id,
-                    product_quantity: Number(Array.isArray(utag.data.product_quantity) ? utag.data.product_quantity[0] : utag.data.product_quantity),
-                    order_tax: Number(utag.data.order_tax),
-                    product_sku: Array.isArray(utag.data.product_sku) ? utag.data.product_sku[0] : utag.data.product_sku,
-                };
-
-                const ga4PurchaseCalls = ga4Captured.filter(call => call.params.en === "purchase");
-
-                if (ga4PurchaseCalls.length === 0) {
-                    console.warn("⚠️ No GA4 purchase events found.");
-                    return;
-                }
-
-                ga4PurchaseCalls.forEach((call, i) => {
-                    const ga4Params = {
-                        item_id: call.params["ep.item_id"],
-                        quantity: Number(call.params["ep.item_name"]),
-                        shipping: Number(call.params["ep.shipping"]),
-                        tax: Number(call.params["ep.tax"]),
-                        transaction_id: call.params["ep.transaction_id"],
-                        value: Number(call.params["ep.value"]),
-                        currency: call.params.currency || call.params.cu
-                    };
-
-                    // Build a comparison table
-                    const comparison = [
-                        { parameter: "order_id / transaction_id", utag_value: utagPurchase.order_id, ga4_value: ga4Params.transaction_id, match: utagPurchase.order_id === ga4Params.transaction_id },
-                        { parameter: "order_total / value", utag_value: utagPurchase.order_total, ga4_value: ga4Params.value, match: utagPurchase.order_total === ga4Params.value },
-                        { parameter: "order_tax / tax", utag_value: utagPurchase.order_tax, ga4_value: ga4Params.tax, match: utagPurchase.order_tax === ga4Params.tax },
-                        { parameter: "product_sku / item_id", utag_value: utagPurchase.product_sku, ga4_value: ga4Params.item_id, match: utagPurchase.product_sku === ga4Params.item_id },
-                        { parameter: "product_quantity / quantity", utag_value: utagPurchase.product_quantity, ga4_value: ga4Params.quantity, match: utagPurchase.product_quantity === ga4Params.quantity },
-                        { parameter: "order_currency / currency", utag_value: utagPurchase.order_currency, ga4_value: ga4Params.currency, match: utagPurchase.order_currency === ga4Params.currency },
-                        { parameter: "shipping / ep.shipping", utag_value: utag.data.shipping || "N/A", ga4_value: ga4Params.shipping, match: (utag.data.shipping ? Number(utag.data.shipping) : 0) === ga4Params.shipping }
-                    ];
+            await page.wait_for_selector("a[href*='/linen-blazer-']", timeout=3000)
+            log.info("✅ Site appears to be loaded and ready")
+        except:
+            log.warning("⚠️ Site not fully loaded, setting fallback cookie")
+            await context.add_cookies([{
+                'name': 'CONSENTMGR',
+                'value': 'consent:true',
+                'domain': urlsplit(page.url).hostname,
+                'path': '/',
+                'httpOnly': False,
+                'secure': False,
+                'sameSite': 'Lax'
+            }])
+            log.info("✅ Fallback cookie set")
+            await page.reload(wait_until="domcontentloaded")
+            await sync.wait_for_utag(step="home_reloaded", replaced_ms=3000)
+
+async def tealium_setup_flow(page, context, captured_data, url=DEFAULT_URL,
+                             account=DEFAULT_ACCOUNT, profile=DEFAULT_PROFILE, consent=DEFAULT_CONSENT):
+    """Training modal + consent only; saves the storage state for later contexts."""
+    sync = StepSync(page, captured_data)
+    await open_training_profile(page, sync, url, account, profile)
+    await accept_consent(page, context, sync, consent)
+    await save_snapshot(context, urlsplit(url).netloc, account, profile, consent)
+    sync.print_summary()
+
+async def tealium_checkout_flow(page, context, captured_data, url=DEFAULT_URL,
+                                account=DEFAULT_ACCOUNT, profile=DEFAULT_PROFILE, consent=DEFAULT_CONSENT,
+                                from_snapshot=False, pause=False, spec_file=None, tag_rules=()):
+    """
+    Home page -> Linen Blazer -> cart -> guest checkout -> order success,
+    then validate GA4 hits against utag_data with the flow's mapping spec
+    (specs/tealium_checkout.json unless spec_file is given). Requests are
+    categorized with the default tag rules plus the rule files in tag_rules.
+    Returns the comparison rows and dashboard rows for this flow.
+    """
+    validation = {
+        'comparisons': [],
+        'dashboard_rows': []
+    }
+    
+    # Every step waits for its own condition instead of a fixed sleep
+    sync = StepSync(page, captured_data)
 
-                    console.log(`\\n📊 GA4 vs utag_data Comparison (Hit ${i + 1}):`);
-                    console.table(comparison.map(row => ({
-                        Parameter: row.parameter,
-                        utag_data: row.utag_value,
-                        GA4: row.ga4_value,
-                        Match: row.match ? "✅" : "❌"
-                    })));
-                });
-            };
-            
-            console.log('✅ GA4 capture initialized');
-        """)
-        
-        print("✅ Website loaded completely and positioned correctly")
+    # Browser console messages are recorded with timestamps (shown with --debug)
+    page.on("console", console_recorder(captured_data, page))
+    
+    # GA4 and other analytics endpoints are captured by URL-pattern routes,
+    # so Python only handles matching requests
+    await install_analytics_capture(page, captured_data, on_ga4_hit=sync.notify_hit)
+    
+    # One in-page buffer per document carries page events to Python in batches;
+    # utag.data, digitalData and b2t record their own changes into it from document start
+    event_buffer = await install_event_buffer(context, captured_data)
+    await install_datalayer_observers(context, event_buffer, captured_data, on_utag_change=sync.notify_utag)
+    # GA4 requests made through fetch, XHR or sendBeacon are also caught at source,
+    # in every document and iframe, before page scripts run
+    await install_hit_interceptor(context, event_buffer, captured_data, on_ga4_hit=sync.notify_hit)
+    # Resource-timing entries are streamed once each, from document start
+    await install_resource_observer(context, event_buffer, captured_data, on_ga4_hit=sync.notify_hit,
+                                    classifier=load_classifier(tuple(tag_rules)))
+    
+    if from_snapshot:
+        # Training profile and consent come from the saved storage state
+        log.info("♻️ Starting from saved storage state - skipping training modal and consent banner")
+        await page.goto(url, wait_until="domcontentloaded")
+        await sync.wait_for_utag(step="home_loaded", replaced_ms=3000)
+    else:
+        await open_training_profile(page, sync, url, account, profile)
+    
+    # Fix viewport positioning and zoom
+    await page.evaluate("""
+        // Reset any CSS transforms or positioning issues
+        document.body.style.transform = 'none';
+        document.body.style.margin = '0';
+        document.body.style.padding = '0';
+        document.documentElement.style.margin = '0';
+        document.documentElement.style.padding = '0';
         
-        # Capture initial utag_data
-        capture_utag_data()
+        // Scroll to top-left
+        window.scrollTo(0, 0);
         
-        # Pause for Playwright Inspector integration
-        page.pause()
-
-        # ----- 1️⃣ Handle Tealium Consent -----
-        print("🍪 Checking for consent banner...")
-        try:
-            # Wait for consent banner and handle it
-            consent_radio = page.wait_for_selector("input[type='radio'][value='optin']", timeout=5000)
-            if consent_radio:
-                page.check("input[type='radio'][value='optin']")
-                print("✅ Opt-In selected")
-                page.click("#consent_prompt_submit")
-                print("✅ Consent Submit clicked")
-                page.wait_for_timeout(3000)
-                
-                # Check cookies immediately after consent
-                page.wait_for_timeout(1000)
-                cookies = context.cookies()
-                print(f"📋 Total cookies found: {len(cookies)}")
-                
-                consent_cookie = None
-                for cookie in cookies:
-                    if 'CONSENTMGR' in cookie['name'] or 'consent' in cookie['name'].lower():
-                        consent_cookie = cookie
-                        print(f"✅ Consent cookie found: {cookie['name']} = {cookie['value']}")
-                        break
-                
-                if not consent_cookie:
-                    print("⚠️ No consent cookie found after banner interaction")
-            
-        except TimeoutError:
-            print("⚠️ Consent banner not found or timed out")
-            print("🔄 Checking if site is already loaded without banner...")
-            
-            # Check if we can proceed without consent banner
-            try:
-                page.wait_for_selector("a[href*='/linen-blazer-']", timeout=3000)
-                print("✅ Site appears to be loaded and ready")
-            except:
-                print("⚠️ Site not fully loaded, setting fallback cookie")
-                context.add_cookies([{
-                    'name': 'CONSENTMGR',
-                    'value': 'consent:true',
-                    'domain': 'ecommerce.tealiumdemo.com',
-                    'path': '/',
-                    'httpOnly': False,
-                    'secure': False,
-                    'sameSite': 'Lax'
-                }])
-                print("✅ Fallback cookie set")
-                page.reload(wait_until="networkidle")
-                page.wait_for_timeout(3000)
-
-        # ----- 2️⃣ Click on Product Link from Home Page -----
-        try:
-            # Adjust selector to match the Linen Blazer link on home page
-            page.wait_for_selector("a[href*='/linen-blazer-']", timeout=5000)
-            page.click("a[href*='/linen-blazer-']")
-            print("✅ Navigated to Linen Blazer product page")
-            page.wait_for_timeout(2000)
-        except TimeoutError:
-            print("⚠️ Linen Blazer link not found on home page")
-            return
-
-        # ----- 3️⃣ Select Product Options & Add to Cart -----
-        try:
-            # Color "White"
-            page.wait_for_selector("#swatch22", timeout=5000)
-            page.click("#swatch22")
-            print("✅ Color 'White' selected")
-
-            # Size "XS"
-            page.wait_for_selector("#swatch81", timeout=5000)
-            page.click("#swatch81")
-            print("✅ Size 'XS' selected")
-
-            # Add to Cart
-            page.wait_for_selector(".add-to-cart-buttons .btn-cart", timeout=5000)
-            page.click(".add-to-cart-buttons .btn-cart")
-            print("✅ Add to Cart clicked")
-            page.wait_for_timeout(3000)
-            print("✅ Product added to cart successfully")
-            
-            # Capture utag_data after adding to cart
-            capture_utag_data()
+        console.log('🔧 Fixed viewport positioning');
+    """)
+    
+    log.info("✅ Website loaded completely and positioned correctly")
+    
+    # Pause for Playwright Inspector integration (debug profile only)
+    if pause:
+        await page.pause()
 
-            # Navigate to cart page first for shipping estimation
-            page.goto("https://ecommerce.tealiumdemo.com/checkout/cart/")
-            page.wait_for_timeout(2000)
-            print("✅ Navigated to cart page")
-            
-            # Capture utag_data on cart page
-            capture_utag_data()
+    # ----- 1️⃣ Handle Tealium Consent -----
+    if not from_snapshot:
+        await accept_consent(page, context, sync, consent)
 
-            # Step 1: Select India
-            page.evaluate("""
-                console.log('🇮🇳 Setting country to India...');
-                document.getElementById('country').value = 'IN';
-                document.getElementById('country').dispatchEvent(new Event('change', { bubbles: true }));
-                console.log('✅ Country set to India');
-            """)
+    # ----- 2️⃣ Click on Product Link from Home Page -----
+    try:
+        # Adjust selector to match the Linen Blazer link on home page
+        await page.wait_for_selector("a[href*='/linen-blazer-']", timeout=5000)
+        await page.click("a[href*='/linen-blazer-']")
+        log.info("✅ Navigated to Linen Blazer product page")
+    except TimeoutError:
+        log.warning("⚠️ Linen Blazer link not found on home page")
+        return validation
+
+    # ----- 3️⃣ Select Product Options & Add to Cart -----
+    try:
+        # Color "White"
+        await sync.wait_for_selector("#swatch22", step="product_page", replaced_ms=2000,
+                                     deadline_ms=5000, required=True)
+        await page.click("#swatch22")
+        log.info("✅ Color 'White' selected")
+
+        # Size "XS"
+        await page.wait_for_selector("#swatch81", timeout=5000)
+        await page.click("#swatch81")
+        log.info("✅ Size 'XS' selected")
+
+        # Add to Cart
+        await page.wait_for_selector(".add-to-cart-buttons .btn-cart", timeout=5000)
+        add_to_cart_mark = sync.mark()
+        await page.click(".add-to-cart-buttons .btn-cart")
+        log.info("✅ Add to Cart clicked")
+        await sync.wait_for_ga4_event("add_to_cart", since=add_to_cart_mark, step="add_to_cart",
+                                      replaced_ms=3000, deadline_ms=5000)
+        log.info("✅ Product added to cart successfully")
+
+        # Navigate to cart page first for shipping estimation
+        await page.goto(urljoin(url, "/checkout/cart/"), wait_until="domcontentloaded")
+        await sync.wait_for_selector("#country", state="attached", step="cart_page", replaced_ms=2000)
+        log.info("✅ Navigated to cart page")
+
+        # Step 1: Select India
+        await page.evaluate("""
+            console.log('🇮🇳 Setting country to India...');
+            document.getElementById('country').value = 'IN';
+            document.getElementById('country').dispatchEvent(new Event('change', { bubbles: true }));
+            console.log('✅ Country set to India');
+        """)
 
-            # Step 2: Set Tamil Nadu (wait for country to load first)
-            page.wait_for_timeout(1000)
-            page.evaluate("""
-                console.log('🏛️ Setting region to Tamil Nadu...');
-                document.getElementById('region').value = 'Tamil Nadu';
-                document.getElementById('region').style.display = 'block';
-                console.log('✅ Region set to Tamil Nadu');
-            """)
+        # Step 2: Set Tamil Nadu (wait for country to load first)
+        await sync.wait_for_selector("#region", state="attached", step="cart_region", replaced_ms=1000)
+        await page.evaluate("""
+            console.log('🏛️ Setting region to Tamil Nadu...');
+            document.getElementById('region').value = 'Tamil Nadu';
+            document.getElementById('region').style.display = 'block';
+            console.log('✅ Region set to Tamil Nadu');
+        """)
 
-            # Step 3: Set zip code
-            page.evaluate("""
-                console.log('📮 Setting zip code...');
-                document.getElementById('postcode').value = '641035';
-                console.log('✅ Zip code set to 641035');
-            """)
+        # Step 3: Set zip code
+        await page.evaluate("""
+            console.log('📮 Setting zip code...');
+            document.getElementById('postcode').value = '641035';
+            console.log('✅ Zip code set to 641035');
+        """)
 
-            # Step 4: Click Estimate
-            page.evaluate("""
+        # Step 4: Click Estimate
+        async with sync.navigation("estimate_shipping", replaced_ms=2000):
+            await page.evaluate("""
                 console.log('💰 Clicking estimate button...');
                 document.querySelector('button[onclick="coShippingMethodForm.submit()"]').click();
                 console.log('✅ Estimate button clicked');
             """)
-            page.wait_for_timeout(2000)
-
-            # Select the Free Shipping radio button
-            page.evaluate("""
-                console.log('🚚 Selecting free shipping...');
-                document.getElementById('s_method_freeshipping_freeshipping').checked = true;
-                console.log('✅ Free shipping selected');
-            """)
+        await sync.wait_for_selector("#s_method_freeshipping_freeshipping", state="attached",
+                                     step="shipping_rates")
+
+        # Select the Free Shipping radio button
+        await page.evaluate("""
+            console.log('🚚 Selecting free shipping...');
+            document.getElementById('s_method_freeshipping_freeshipping').checked = true;
+            console.log('✅ Free shipping selected');
+        """)
 
-            # Click the Update Total button
-            page.evaluate("""
+        # Click the Update Total button
+        async with sync.navigation("update_total", replaced_ms=2000):
+            await page.evaluate("""
                 console.log('🔄 Updating total...');
                 document.querySelector('button[name="do"][value="Update Total"]').click();
                 console.log('✅ Total updated');
             """)
-            page.wait_for_timeout(2000)
-
-            # Step 7: Proceed to Checkout
-            page.evaluate("""
-                console.log('🛒 Proceeding to checkout...');
-                document.querySelector('.btn-proceed-checkout').click();
-                console.log('✅ Proceeding to checkout');
-            """)
-            print("✅ Shipping estimation completed and proceeding to checkout")
-            page.wait_for_timeout(3000)
-
-            # Now continue with checkout process
-            page.wait_for_timeout(2000)
-            print("✅ Navigated to checkout page")
-
-            # Step 1: Select Guest Checkout
-            page.evaluate("""
-                console.log('👤 Selecting guest checkout...');
-                document.getElementById('login:guest').checked = true;
-                document.getElementById('onepage-guest-register-button').click();
-                console.log('✅ Guest checkout selected');
-            """)
-            print("✅ Guest checkout selected")
-            page.wait_for_timeout(2000)
-
-            # Step 2: Fill Billing Information
-            page.evaluate("""
-                console.log('📝 Filling billing information...');
-                document.getElementById('billing:firstname').value = 'John';
-                document.getElementById('billing:lastname').value = 'Doe';
-                document.getElementById('billing:email').value = 'john.doe@example.com';
-                document.getElementById('billing:street1').value = '123 Main Street';
-                document.getElementById('billing:city').value = 'Chennai';
-                document.getElementById('billing:postcode').value = '641035';
-                document.getElementById('billing:telephone').value = '9876543210';
-                console.log('✅ Basic billing info filled');
-            """)
-            
-            # Set country to India
-            page.evaluate("""
-                console.log('🇮🇳 Setting billing country to India...');
-                document.getElementById('billing:country_id').value = 'IN';
-                document.getElementById('billing:country_id').dispatchEvent(new Event('change'));
-                console.log('✅ Billing country set to India');
-            """)
-            print("✅ Billing information filled")
-            page.wait_for_timeout(2000)
-
-            # Set region to Tamil Nadu and continue billing
-            page.evaluate("""
-                console.log('🏛️ Setting billing region and continuing...');
-                document.getElementById('billing:region').value = 'Tamil Nadu';
-                document.querySelector('#billing-buttons-container .button').click();
-                console.log('✅ Billing completed and continued');
-            """)
-            print("✅ Billing continue clicked")
-            page.wait_for_timeout(3000)
-
-            # Step 3: Use same billing address for shipping
-            page.evaluate("""
-                console.log('🏠 Using same address for shipping...');
-                document.getElementById('shipping:same_as_billing').checked = true;
-                document.getElementById('shipping:same_as_billing').dispatchEvent(new Event('change'));
-                document.querySelector('#shipping-buttons-container .button').click();
-                console.log('✅ Shipping address set and continued');
-            """)
-            print("✅ Shipping continue clicked")
-            page.wait_for_timeout(3000)
-
-            # Step 4: Select Free Shipping
-            page.evaluate("""
-                console.log('🚚 Selecting shipping method...');
-                document.querySelector('input[value*="freeshipping"]').checked = true;
-                document.querySelector('input[value*="freeshipping"]').dispatchEvent(new Event('change'));
-                document.querySelector('#shipping-method-buttons-container .button').click();
-                console.log('✅ Free shipping method selected and continued');
-            """)
-            print("✅ Free shipping selected and continued")
-            page.wait_for_timeout(3000)
-
-            # Step 5: Continue with Payment (default payment method)
-            page.evaluate("""
-                console.log('💳 Proceeding with payment...');
-                document.querySelector('#payment-buttons-container .button').click();
-                console.log('✅ Payment method confirmed');
-            """)
-            print("✅ Payment continue clicked")
-            page.wait_for_timeout(3000)
-
-            # Step 6: Place Order
-            page.evaluate("""
-                console.log('🎯 Placing final order...');
-                document.querySelector('button[onclick="review.save();"]').click();
-                console.log('🎉 ORDER PLACED SUCCESSFULLY!');
-            """)
-            print("✅ Order placed successfully!")
-            page.wait_for_timeout(3000)
-            
-            # Wait for success page to be ready and utag to load
-            print("🎉 Waiting for success page to be ready...")
-            
-            # Check if we're on success page
-            try:
-                page.wait_for_url("**/success/**", timeout=10000)
-                print("✅ Success page URL confirmed")
-            except:
-                print("⚠️ Success page URL not detected, continuing...")
-            
-            # Wait for page to be fully loaded (no active requests)
-            page.wait_for_load_state("networkidle", timeout=15000)
-            print("✅ Network idle - page fully loaded")
-            
-            # 🎯 CHECK LOADED GA4 CALLS (Your main request)
-            print("🔍 Checking GA4 calls already loaded in browser...")
-            
-            ga4_calls = page.evaluate("""
-            (() => {
-              const entries = performance.getEntriesByType("resource")
-                .filter(e => e.name.includes("google-analytics.com/g/collect"))
-                .map(e => {
-                  const query = e.name.split("?")[1] || "";
-                  const params = Object.fromEntries(new URLSearchParams(query));
-                  return { url: e.name, params };
-                });
-
-              console.log(`✅ Found ${entries.length} GA4 call(s) from Performance API`);
-              entries.forEach((c, i) => {
-                console.log(`--- GA4 Hit ${i + 1} ---`);
-                console.table(c.params);
-              });
-              return entries;
-            })();
-            """)
-
-            if not ga4_calls:
-                print("⚠️ No GA4 calls found in loaded resources.")
-            else:
-                print(f"✅ {len(ga4_calls)} GA4 call(s) captured from Performance API.")
-                for i, call in enumerate(ga4_calls):
-                    event_name = call['params'].get('en', 'N/A')
-                    transaction_id = call['params'].get('ep.transaction_id', 'N/A')
-                    value = call['params'].get('ep.value', 'N/A')
-                    print(f"Hit {i+1}: event={event_name}  transaction_id={transaction_id}  value={value}")
-                    
-                    # Store in captured_data for later analysis
-                    captured_data['ga4_calls'].append({
-                        'url': call['url'],
-                        'params': call['params'],
-                        'method': 'GET',
-                        'timestamp': datetime.now().isoformat(),
-                        'page': page.url,
-                        'source': 'Performance API - Main Check'
-                    })
-            
-            # 🔍 CAPTURE ALL COMPLETED NETWORK REQUESTS using Performance API
-            print("🔍 Extracting all completed network requests from Performance API...")
-            
-            all_requests = page.evaluate("""
-            (() => {
-              const entries = performance.getEntriesByType("resource");
-              if (!entries || entries.length === 0) {
-                console.warn("⚠️ No resource entries found in Performance API");
-                return [];
-              }
-
-              return entries.map(e => {
-                const url = e.name;
-                const paramsObj = {};
-                try {
-                  const query = url.split("?")[1];
-                  if (query) {
-                    for (const [k, v] of new URLSearchParams(query)) {
-                      paramsObj[k] = v;
-                    }
-                  }
-                } catch (err) {
-                  console.warn("Error parsing params for", url, err);
-                }
-
-                // Identify request type for easy filtering later
-                let category = "Other";
-                if (url.includes("google-analytics.com/g/collect")) category = "GA4";
-                else if (url.includes("doubleclick.net")) category = "Floodlight";
-                else if (url.includes("adservice.google.com")) category = "Google Ads";
-                else if (url.includes("omtrdc.net") || url.includes("2o7.net")) category = "Adobe Analytics";
-                else if (url.includes("tealiumiq.com") || url.includes("tealium.com")) category = "Tealium";
-                else if (url.includes("gtm.js") || url.includes("googletagmanager.com")) category = "GTM";
-                else if (url.includes("facebook.com/tr")) category = "Facebook Pixel";
-                else if (url.includes("bat.bing.com")) category = "Bing Ads";
-                else if (url.includes("pinterest.com/v3/")) category = "Pinterest";
-                else if (url.includes("snapchat.com/p")) category = "Snapchat";
-                else if (url.includes("tiktok.com/i/")) category = "TikTok";
-
-                return {
-                  name: e.name,
-                  type: e.initiatorType,
-                  duration: e.duration ? e.duration.toFixed(2) : "0",
-                  size: e.transferSize || 0,
-                  category,
-                  params: paramsObj
-                };
-              });
-            })();
-            """)
-            
-            if not all_requests:
-                print("⚠️ No network requests found in Performance API.")
-            else:
-                print(f"✅ Found {len(all_requests)} network requests via Performance API")
 
-                # Filter and display categorized counts
-                categories = [r['category'] for r in all_requests]
-                summary = Counter(categories)
-                print("📊 Request Categories Summary:")
-                for k, v in summary.items():
-                    print(f"   {k:<20}: {v}")
-
-                # Save all requests to Excel for debugging
-                now = datetime.now()
-                folder = pathlib.Path(f"validation_results/{now.strftime('%Y-%m-%d')}")
-                folder.mkdir(parents=True, exist_ok=True)
-                file_path = folder / f"All_Network_Requests_{now.strftime('%H-%M-%S')}.xlsx"
-
-                df = pd.DataFrame(all_requests)
-                df.to_excel(file_path, index=False)
-                print(f"📁 Exported all network requests to: {file_path}")
-                
-                # Store in captured_data for later analysis
-                captured_data['network_calls'] = all_requests
-                
-                # Show detailed breakdown of tracking requests
-                tracking_requests = [r for r in all_requests if r['category'] != 'Other']
-                if tracking_requests:
-                    print(f"\n🎯 Found {len(tracking_requests)} tracking/analytics requests:")
-                    for req in tracking_requests:
-                        print(f"   📡 {req['category']}: {req['name'][:80]}...")
-                        if req['category'] == 'GA4' and req['params']:
-                            event_name = req['params'].get('en', 'N/A')
-                            transaction_id = req['params'].get('ep.transaction_id', 'N/A')
-                            print(f"      └─ Event: {event_name}, Transaction: {transaction_id}")
-                
-                # Capture GA4 hits using Performance API (handles both GET and POST)
-                ga4_results = page.evaluate("""
-                (() => {
-                  const entries = performance.getEntriesByType("resource");
-                  const ga4Calls = entries
-                    .filter(e => e.name.includes("google-analytics.com/g/collect"))
-                    .map(e => {
-                      let params = {};
-                      try {
-                        // For GET requests, params are in URL
-                        const queryString = e.name.split("?")[1];
-                        if (queryString) {
-                          params = Object.fromEntries(new URLSearchParams(queryString));
-                        }
-                        // For POST requests, we can't get body params from Performance API
-                        // but we can still identify the request
-                        return { 
-                          url: e.name, 
-                          params: params,
-                          method: e.name.includes("?") ? "GET" : "POST",
-                          duration: e.duration,
-                          size: e.transferSize
-                        };
-                      } catch (err) {
-                        console.warn("Error parsing GA4 request:", err);
-                        return { url: e.name, params: {}, method: "UNKNOWN" };
-                      }
-                    });
-                  
-                  console.log(`✅ Found ${ga4Calls.length} GA4 call(s) via Performance API`);
-                  ga4Calls.forEach((call, i) => {
-                    console.log(`--- GA4 Hit ${i + 1} (${call.method}) ---`);
-                    console.log("URL:", call.url.substring(0, 100) + "...");
-                    if (Object.keys(call.params).length > 0) {
-                      console.table(call.params);
-                    } else {
-                      console.log("(POST request - parameters in body, captured by request interceptor)");
-                    }
-                  });
-                  return ga4Calls;
-                })();
-                """)
-
-                if ga4_results:
-                    print(f"✅ Found {len(ga4_results)} GA4 call(s) via Performance API")
-                    for i, call in enumerate(ga4_results):
-                        event_name = call['params'].get('en', 'N/A')
-                        transaction_id = call['params'].get('ep.transaction_id', 'N/A')
-                        print(f"GA4 Hit {i+1}: en={event_name} transaction_id={transaction_id}")
-                    
-                    # Combine with existing GA4 captures to avoid duplicates
-                    existing_urls = {call['url'] for call in captured_data['ga4_calls']}
-                    for ga4_call in ga4_results:
-                        if ga4_call['url'] not in existing_urls:
-                            captured_data['ga4_calls'].append({
-                                'url': ga4_call['url'],
-                                'params': ga4_call['params'],
-                                'method': 'GET',
-                                'timestamp': datetime.now().isoformat(),
-                                'page': page.url,
-                                'source': 'Performance API'
-                            })
-                else:
-                    print("⚠️ No GA4 calls found using Performance API.")
-            
-            # Check if utag is loaded and ready
-            utag_ready = False
-            for attempt in range(10):  # Try for 10 seconds
-                try:
-                    utag_status = page.evaluate("""
-                    (() => {
-                        // Check if utag is loaded
-                        if (typeof utag !== 'undefined' && utag.data) {
-                            return {
-                                loaded: true,
-                                hasData: Object.keys(utag.data).length > 0,
-                                dataKeys: Object.keys(utag.data).length
-                            };
-                        }
-                        return { loaded: false, hasData: false, dataKeys: 0 };
-                    })();
-                    """)
-                    
-                    if utag_status['loaded'] and utag_status['hasData']:
-                        print(f"✅ utag loaded with {utag_status['dataKeys']} data fields")
-                        utag_ready = True
-                        break
-                    else:
-                        print(f"⏳ Waiting for utag... (attempt {attempt + 1}/10)")
-                        page.wait_for_timeout(1000)
-                        
-                except Exception as e:
-                    print(f"⏳ Checking utag status... (attempt {attempt + 1}/10)")
-                    page.wait_for_timeout(1000)
-            
-            if not utag_ready:
-                print("⚠️ utag not fully loaded, but continuing...")
-            
-            # Additional wait to ensure all tracking calls are sent
-            print("⏳ Waiting for tracking calls to complete...")
-            page.wait_for_timeout(3000)
-            
-            # Skip the browser-side validation since we have better Python-side validation
-            print("🔍 Using Python-side validation with captured data...")
-            
-            # Check if we have GA4 calls captured
-            if not captured_data['ga4_calls']:
-                print("❌ No GA4 calls found in captured_data")
-                print("🔍 Let's check what we captured:")
-                print(f"   - Total network requests: {len(captured_data.get('network_calls', []))}")
-                print(f"   - GA4 calls: {len(captured_data['ga4_calls'])}")
-                print(f"   - utag_data captures: {len(captured_data['utag_data'])}")
+        # Step 7: Proceed to Checkout
+        await page.evaluate("""
+            console.log('🛒 Proceeding to checkout...');
+            document.querySelector('.btn-proceed-checkout').click();
+            console.log('✅ Proceeding to checkout');
+        """)
+        log.info("✅ Shipping estimation completed and proceeding to checkout")
+        await sync.wait_for_url("**/checkout/onepage/**", step="checkout_page", replaced_ms=5000)
+
+        # Now continue with checkout process
+        await sync.wait_for_selector("[id='login:guest']", state="attached", step="checkout_method")
+        log.info("✅ Navigated to checkout page")
+
+        # Step 1: Select Guest Checkout
+        await page.evaluate("""
+            console.log('👤 Selecting guest checkout...');
+            document.getElementById('login:guest').checked = true;
+            document.getElementById('onepage-guest-register-button').click();
+            console.log('✅ Guest checkout selected');
+        """)
+        log.info("✅ Guest checkout selected")
+        await sync.wait_for_selector("[id='billing:firstname']", step="billing_form", replaced_ms=2000)
+
+        # Step 2: Fill Billing Information
+        await page.evaluate("""
+            console.log('📝 Filling billing information...');
+            document.getElementById('billing:firstname').value = 'John';
+            document.getElementById('billing:lastname').value = 'Doe';
+            document.getElementById('billing:email').value = 'john.doe@example.com';
+            document.getElementById('billing:street1').value = '123 Main Street';
+            document.getElementById('billing:city').value = 'Chennai';
+            document.getElementById('billing:postcode').value = '641035';
+            document.getElementById('billing:telephone').value = '9876543210';
+            console.log('✅ Basic billing info filled');
+        """)
+        
+        # Set country to India
+        await page.evaluate("""
+            console.log('🇮🇳 Setting billing country to India...');
+            document.getElementById('billing:country_id').value = 'IN';
+            document.getElementById('billing:country_id').dispatchEvent(new Event('change'));
+            console.log('✅ Billing country set to India');
+        """)
+        log.info("✅ Billing information filled")
+        await sync.wait_for_selector("[id='billing:region']", state="attached", step="billing_region",
+                                     replaced_ms=2000)
+
+        # Set region to Tamil Nadu and continue billing
+        await page.evaluate("""
+            console.log('🏛️ Setting billing region and continuing...');
+            document.getElementById('billing:region').value = 'Tamil Nadu';
+            document.querySelector('#billing-buttons-container .button').click();
+            console.log('✅ Billing completed and continued');
+        """)
+        log.info("✅ Billing continue clicked")
+        await sync.wait_for_selector("#shipping-buttons-container .button", step="shipping_step",
+                                     replaced_ms=3000)
+
+        # Step 3: Use same billing address for shipping
+        await page.evaluate("""
+            console.log('🏠 Using same address for shipping...');
+            document.getElementById('shipping:same_as_billing').checked = true;
+            document.getElementById('shipping:same_as_billing').dispatchEvent(new Event('change'));
+            document.querySelector('#shipping-buttons-container .button').click();
+            console.log('✅ Shipping address set and continued');
+        """)
+        log.info("✅ Shipping continue clicked")
+        await sync.wait_for_selector("input[value*='freeshipping']", step="shipping_method_step",
+                                     replaced_ms=3000)
+
+        # Step 4: Select Free Shipping
+        await page.evaluate("""
+            console.log('🚚 Selecting shipping method...');
+            document.querySelector('input[value*="freeshipping"]').checked = true;
+            document.querySelector('input[value*="freeshipping"]').dispatchEvent(new Event('change'));
+            document.querySelector('#shipping-method-buttons-container .button').click();
+            console.log('✅ Free shipping method selected and continued');
+        """)
+        log.info("✅ Free shipping selected and continued")
+        await sync.wait_for_selector("#payment-buttons-container .button", step="payment_step",
+                                     replaced_ms=3000)
+
+        # Step 5: Continue with Payment (default payment method)
+        await page.evaluate("""
+            console.log('💳 Proceeding with payment...');
+            document.querySelector('#payment-buttons-container .button').click();
+            console.log('✅ Payment method confirmed');
+        """)
+        log.info("✅ Payment continue clicked")
+        await sync.wait_for_selector("button[onclick='review.save();']", step="review_step",
+                                     replaced_ms=3000)
+
+        # Step 6: Place Order
+        await page.evaluate("""
+            console.log('🎯 Placing final order...');
+            document.querySelector('button[onclick="review.save();"]').click();
+            console.log('🎉 ORDER PLACED SUCCESSFULLY!');
+        """)
+        log.info("✅ Order placed successfully!")
+        
+        # Wait for success page to be ready and utag to load
+        log.info("🎉 Waiting for success page to be ready...")
+        
+        # Check if we're on success page
+        if await sync.wait_for_url("**/success/**", step="success_page", replaced_ms=3000):
+            log.info("✅ Success page URL confirmed")
+        else:
+            log.warning("⚠️ Success page URL not detected, continuing...")
+        
+        # Wait for page to be fully loaded (no active requests)
+        await sync.wait_for_load_state("networkidle", step="success_network_idle", deadline_ms=15000)
+        log.info("✅ Network idle - page fully loaded")
+        
+        # 🔍 Every resource-timing entry of the journey was streamed in as it completed
+        await event_buffer.flush(page)
+        all_requests = captured_data['network_calls']
+        
+        if not all_requests:
+            log.warning("⚠️ No network requests observed.")
+        else:
+            log.info(f"✅ Found {len(all_requests)} network requests via PerformanceObserver")
+
+            # Filter and display categorized counts
+            categories = [r.category for r in all_requests]
+            summary = Counter(categories)
+            log.info("📊 Request Categories Summary:")
+            for k, v in summary.items():
+                log.info(f"   {k:<20}: {v}")
+
+            # Save all requests to Excel for debugging
+            now = datetime.now()
+            folder = pathlib.Path(f"validation_results/{now.strftime('%Y-%m-%d')}")
+            folder.mkdir(parents=True, exist_ok=True)
+            file_path = folder / f"All_Network_Requests_{now.strftime('%H-%M-%S')}.xlsx"
+
+            df = resource_frame(all_requests)
+            df.to_excel(file_path, index=False)
+            log.info(f"📁 Exported all network requests to: {file_path}")
+            
+            # Show detailed breakdown of tracking requests
+            tracking_requests = [r for r in all_requests if r.category != 'Other']
+            if tracking_requests:
+                log.info(f"\n🎯 Found {len(tracking_requests)} tracking/analytics requests:")
+                for req in tracking_requests:
+                    log.debug(f"   📡 {req.category}: {req.name[:80]}...")
+                    if req.category == 'GA4' and req.params:
+                        event_name = req.params.get('en', 'N/A')
+                        transaction_id = req.params.get('ep.transaction_id', 'N/A')
+                        log.debug(f"      └─ Event: {event_name}, Transaction: {transaction_id}")
+        
+        # Check if utag is loaded and ready (returns as soon as utag.data has order_id)
+        if await sync.wait_for_utag_key("order_id", step="success_utag_order_id"):
+            log.info("✅ utag loaded with order_id")
+        else:
+            log.warning("⚠️ utag not fully loaded, but continuing...")
+        
+        # Wait until the purchase hit has been sent
+        log.info("⏳ Waiting for tracking calls to complete...")
+        await sync.wait_for_ga4_event("purchase", step="purchase_hit", replaced_ms=3000, deadline_ms=5000)
+        
+        # Skip the browser-side validation since we have better Python-side validation
+        log.info("🔍 Using Python-side validation with captured data...")
+        
+        # Check if we have GA4 calls captured
+        if not captured_data['ga4_calls']:
+            log.warning("❌ No GA4 calls found in captured_data")
+            log.info("🔍 Let's check what we captured:")
+            log.info(f"   - Total network requests: {len(captured_data.get('network_calls', []))}")
+            log.info(f"   - GA4 calls: {len(captured_data['ga4_calls'])}")
+            log.info(f"   - utag_data captures: {len(captured_data['utag_data'])}")
+        else:
+            log.info(f"✅ Found {len(captured_data['ga4_calls'])} GA4 calls in captured data")
+            
+            # Show details of captured GA4 calls
+            ga4_calls = captured_data['ga4_calls']
+            for i, (event_name, transaction_id) in enumerate(zip(ga4_calls.column('en'), ga4_calls.column('ep.transaction_id'))):
+                log.debug(f"   GA4 Call {i+1}: Event={event_name or 'N/A'}, Transaction={transaction_id or 'N/A'}")
+        
+        # Final utag_data on success page, as pushed by the observers
+        snapshots = captured_data['utag_data']
+        if snapshots:
+            log.info("✅ utag_data observed on page")
+            utag_data = snapshots.latest
+            
+            # Show utag_data details
+            if utag_data.get('order_total'):
+                log.info(f"   Order Total: {utag_data.get('order_total')}")
+                log.info(f"   Order ID: {utag_data.get('order_id')}")
+                log.info(f"   Product SKU: {utag_data.get('product_sku')}")
             else:
-                print(f"✅ Found {len(captured_data['ga4_calls'])} GA4 calls in captured data")
+                log.warning("⚠️ No purchase data found in utag_data")
+        else:
+            log.warning("❌ utag_data not found")
+        
+        # Perform validation using captured data (after process completion)
+        try:
+            log.info("\n" + "="*50)
+            log.info("📊 GA4 vs utag_data COMPARISON TABLE")
+            log.info("="*50)
+            
+            if not snapshots:
+                log.warning("❌ No utag_data snapshots captured")
+                return validation
+            
+            ga4_calls = captured_data['ga4_calls']
+            hits = ga4_calls.to_frame()
+            event_names = hits['en'] if 'en' in hits else pd.Series(None, index=hits.index, dtype=object)
+            ga4_purchase_calls = hits[event_names == 'purchase']
+            
+            if ga4_purchase_calls.empty:
+                log.warning("⚠️ No GA4 purchase events found.")
+                return validation
+            
+            # Pair every hit with the utag_data snapshot in effect when it fired
+            spec = compiled_spec(str(spec_file or spec_path('tealium_checkout')))
+            spec_hits = hits[event_names.isin(list(spec))]
+            alignment = align_hits(spec_hits, snapshots)
+            print_alignment(alignment, spec_hits)
+            matched = alignment['snapshot_row'].notna()
+            unmatched_hits = spec_hits[~matched]
+            if not unmatched_hits.empty:
+                unmatched_hits = unmatched_hits.reindex(columns=['en', 'timestamp', 'dl', 'page', 'url']).astype(object)
+                validation['unmatched_hits'] = unmatched_hits.where(unmatched_hits.notna(), None).to_dict('records')
+            snapshot_data = snapshots.data
+            
+            # Every hit of each spec'd event is checked against every mapped pair at once
+            test_timestamp = datetime.now()
+            matrices = []
+            for event, comparator in spec.items():
+                event_hits = spec_hits[spec_hits['en'] == event]
+                if event_hits.empty:
+                    log.warning(f"⚠️ No GA4 {event} events found.")
+                    continue
+                # Hits keep their number among all hits of the event, matched or not
+                hit_numbers = pd.Series(np.arange(1, len(event_hits) + 1), index=event_hits.index)
+                event_hits = event_hits[matched.loc[event_hits.index]]
+                if event_hits.empty:
+                    log.warning(f"⚠️ No GA4 {event} hit could be paired with a utag_data snapshot.")
+                    continue
                 
-                # Show details of captured GA4 calls
-                for i, call in enumerate(captured_data['ga4_calls']):
-                    event_name = call['params'].get('en', 'N/A')
-                    transaction_id = call['params'].get('ep.transaction_id', 'N/A')
-                    print(f"   GA4 Call {i+1}: Event={event_name}, Transaction={transaction_id}")
-            
-            # Get utag_data from the page for validation
-            utag_data_result = page.evaluate("""
-                // Get utag_data from the page
-                (function() {
-                    if (typeof utag_data !== 'undefined') {
-                        return { success: true, data: utag_data };
-                    } else if (typeof utag !== 'undefined' && utag.data) {
-                        return { success: true, data: utag.data };
-                    } else {
-                        return { success: false, error: "utag_data not found" };
-                    }
-                })();
-            """)
-            
-            if utag_data_result and utag_data_result.get('success'):
-                print("✅ utag_data found on page")
-                utag_data = utag_data_result['data']
+                matrix, expected, actual = comparator.evaluate(
+                    event_hits, snapshot_data, alignment.loc[event_hits.index, 'snapshot_row'].to_numpy(dtype=int))
+                print_matrix(event, matrix)
+                event_matrix = matrix.reset_index(drop=True)
+                event_matrix.insert(0, 'hit_number', hit_numbers.loc[event_hits.index].to_numpy())
+                event_matrix.insert(0, 'event', event)
+                matrices.append(event_matrix)
                 
-                # Show utag_data details
-                if utag_data.get('order_total'):
-                    print(f"   Order Total: {utag_data.get('order_total')}")
-                    print(f"   Order ID: {utag_data.get('order_id')}")
-                    print(f"   Product SKU: {utag_data.get('product_sku')}")
-                else:
-                    print("⚠️ No purchase data found in utag_data")
+                # Collect rows for the dashboard and the comparison export
+                rows = comparison_rows(matrix, expected, actual, hit_numbers.loc[event_hits.index])
+                validation['comparisons'].extend(rows.to_dict('records'))
+                validation['dashboard_rows'].extend(pd.DataFrame({
+                    'Date': test_timestamp.strftime("%Y-%m-%d"),
+                    'Time': test_timestamp.strftime("%H:%M"),
+                    'Timestamp': test_timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                    'Hit': rows['hit_number'],
+                    'Test Case': rows['parameter'],
+                    'Result': np.where(rows['match'], 'Pass', 'Fail'),
+                    'Expected': rows['utag_value'],
+                    'Actual': rows['ga4_value'],
+                    'parameter': rows['parameter'],
+                    'utag_value': rows['utag_value'],
+                    'ga4_value': rows['ga4_value'],
+                    'match': rows['match'],
+                    'hit_number': rows['hit_number']
+                }).to_dict('records'))
+            
+            if matrices:
+                validation['matrix'] = pd.concat(matrices, ignore_index=True).to_dict('records')
+            log.info(f"⏰ Test executed at: {test_timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+            
+            # Every prN item of every purchase hit against the product_* arrays of its own snapshot
+            purchase_alignment = align_hits(ga4_purchase_calls, snapshots).dropna(subset=['snapshot_row'])
+            ga4_items = items_frame(ga4_calls, rows=purchase_alignment.index)
+            if ga4_items.empty:
+                log.info("ℹ️ Purchase hits carry no pr1..prN items - item-level validation skipped")
             else:
-                print(f"❌ utag_data not found: {utag_data_result.get('error', 'Unknown error')}")
+                item_results = pd.concat([
+                    validate_items(ga4_items, utag_items_frame(snapshot_data(snapshot_row)), hit_rows)
+                    for snapshot_row, hit_rows in purchase_alignment.groupby('snapshot_row').groups.items()
+                ], ignore_index=True)
+                hit_numbers = {hit_row: i + 1 for i, hit_row in enumerate(ga4_purchase_calls.index)}
+                item_results.insert(0, 'hit_number', item_results['hit_row'].map(hit_numbers))
+                print_item_summary(item_results)
+                validation['items'] = item_results.to_dict('records')
+            
+            log.info("\n" + "="*50)
+            log.info("📋 Capture Summary:")
+            log.info(f"   - utag_data captures: {len(captured_data['utag_data'])}")
+            log.info(f"   - digitalData/b2t events: {len(captured_data['data_layer_events'])}")
+            log.info(f"   - GA4 calls: {len(captured_data['ga4_calls'])}")
+            hit_index = captured_data['hit_index']
+            if len(hit_index):
+                sources = hit_index.source_counts()
+                log.info(f"   - GA4 hits seen by: {', '.join(f'{k}={v}' for k, v in sources.most_common())} "
+                         f"({hit_index.duplicates} duplicate sighting(s) not stored)")
+            log.info(f"   - GA4 purchase events: {len(ga4_purchase_calls)}")
+            log.info(f"   - Total network requests: {len(captured_data.get('network_calls', []))}")
+            log.info("="*50)
+            snapshots.print_summary()
+            event_buffer.print_summary()
             
-            # Capture final utag_data on success page
-            capture_utag_data()
-            
-            # Perform validation using captured data (after process completion)
-            try:
-                print("\n" + "="*50)
-                print("📊 GA4 vs utag_data COMPARISON TABLE")
-                print("="*50)
-                
-                # Find latest utag_data with purchase info
-                utag_purchase = None
-                print("🔍 Looking for utag_data with purchase info...")
-                for utag in reversed(captured_data['utag_data']):
-                    if 'order_total' in utag['data'] and utag['data'].get('order_total'):
-                        utag_purchase = utag['data']
-                        print(f"✅ Found purchase utag_data on: {utag['url']}")
-                        break
-                
-                if not utag_purchase:
-                    print("❌ No utag_data with purchase info found")
-                    browser.close()
-                    return
-                
-                # Flatten utag_data for comparison
-                utag_flattened = {
-                    'order_currency': utag_purchase.get('order_currency'),
-                    'order_total': float(utag_purchase.get('order_total', 0)) if utag_purchase.get('order_total') else 0,
-                    'order_id': utag_purchase.get('order_id'),
-                    'product_quantity': float(utag_purchase.get('product_quantity', [0])[0] if isinstance(utag_purchase.get('product_quantity'), list) else utag_purchase.get('product_quantity', 0)) if utag_purchase.get('product_quantity') else 0,
-                    'order_tax': float(utag_purchase.get('order_tax', 0)) if utag_purchase.get('order_tax') else 0,
-                    'product_sku': utag_purchase.get('product_sku', [None])[0] if isinstance(utag_purchase.get('product_sku'), list) else utag_purchase.get('product_sku'),
-                    'shipping': float(utag_purchase.get('shipping', 0)) if utag_purchase.get('shipping') else 0
-                }
-                
-                # Find GA4 purchase calls
-                ga4_purchase_calls = [call for call in captured_data['ga4_calls'] if call['params'].get('en') == 'purchase']
-                
-                if not ga4_purchase_calls:
-                    print("⚠️ No GA4 purchase events found.")
-                    browser.close()
-                    return
-                
-                # Build comparison for each GA4 purchase call
-                for call_idx, call in enumerate(ga4_purchase_calls):
-                    ga4_params = {
-                        'item_id': call['params'].get('ep.item_id'),
-                        'quantity': float(call['params'].get('ep.item_name', 0)) if call['params'].get('ep.item_name') else 0,
-                        'shipping': float(call['params'].get('ep.shipping', 0)) if call['params'].get('ep.shipping') else 0,
-                        'tax': float(call['params'].get('ep.tax', 0)) if call['params'].get('ep.tax') else 0,
-                        'transaction_id': call['params'].get('ep.transaction_id'),
-                        'value': float(call['params'].get('ep.value', 0)) if call['params'].get('ep.value') else 0,
-                        'currency': call['params'].get('currency') or call['params'].get('cu')
-                    }
-                    
-                    # Build comparison table
-                    comparison = [
-                        {
-                            'parameter': 'order_id / transaction_id',
-                            'utag_value': str(utag_flattened['order_id']),
-                            'ga4_value': str(ga4_params['transaction_id']),
-                            'match': str(utag_flattened['order_id']) == str(ga4_params['transaction_id'])
-                        },
-                        {
-                            'parameter': 'order_total / value',
-                            'utag_value': str(utag_flattened['order_total']),
-                            'ga4_value': str(ga4_params['value']),
-                            'match': utag_flattened['order_total'] == ga4_params['value']
-                        },
-                        {
-                            'parameter': 'order_tax / tax',
-                            'utag_value': str(utag_flattened['order_tax']),
-                            'ga4_value': str(ga4_params['tax']),
-                            'match': utag_flattened['order_tax'] == ga4_params['tax']
-                        },
-                        {
-                            'parameter': 'product_sku / item_id',
-                            'utag_value': str(utag_flattened['product_sku']),
-                            'ga4_value': str(ga4_params['item_id']),
-                            'match': str(utag_flattened['product_sku']) == str(ga4_params['item_id'])
-                        },
-                        {
-                            'parameter': 'product_quantity / quantity',
-                            'utag_value': str(utag_flattened['product_quantity']),
-                            'ga4_value': str(ga4_params['quantity']),
-                            'match': utag_flattened['product_quantity'] == ga4_params['quantity']
-                        },
-                        {
-                            'parameter': 'order_currency / currency',
-                            'utag_value': str(utag_flattened['order_currency']),
-                            'ga4_value': str(ga4_params['currency']),
-                            'match': str(utag_flattened['order_currency']) == str(ga4_params['currency'])
-                        },
-                        {
-                            'parameter': 'shipping / ep.shipping',
-                            'utag_value': str(utag_flattened['shipping']),
-                            'ga4_value': str(ga4_params['shipping']),
-                            'match': utag_flattened['shipping'] == ga4_params['shipping']
-                        }
-                    ]
-                    
-                    print(f"\n📊 GA4 vs utag_data Comparison (Hit {call_idx + 1}):")
-                    print("-" * 80)
-                    for row in comparison:
-                        match_symbol = "✅" if row['match'] else "❌"
-                        print(f"{row['parameter']:<30} | utag: {row['utag_value']:<15} | GA4: {row['ga4_value']:<15} | {match_symbol}")
-                    
-                    # Summary
-                    matches = sum(1 for row in comparison if row['match'])
-                    total = len(comparison)
-                    print(f"\n📈 Match Rate: {matches}/{total} ({(matches/total*100):.1f}%)")
-                    
-                    # Export to runtime_data for dashboard
-                    runtime_file = Path("runtime_data/last_run.json")
-                    runtime_file.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Get current timestamp for this test run
-                    test_timestamp = datetime.now()
-                    
-                    export_data = []
-                    for row_idx, row in enumerate(comparison):
-                        export_data.append({
-                            'Date': test_timestamp.strftime("%Y-%m-%d"),
-                            'Time': test_timestamp.strftime("%H:%M"),
-                            'Timestamp': test_timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                            'Hit': call_idx + 1,
-                            'Test Case': row['parameter'],
-                            'Result': 'Pass' if row['match'] else 'Fail',
-                            'Expected': row['utag_value'],
-                            'Actual': row['ga4_value'],
-                            'parameter': row['parameter'],
-                            'utag_value': row['utag_value'],
-                            'ga4_value': row['ga4_value'],
-                            'match': row['match'],
-                            'hit_number': call_idx + 1
-                        })
-                    
-                    with open(runtime_file, 'w') as f:
-                        json.dump(export_data, f, indent=2)
-                    print(f"\n📁 Dashboard data exported to: {runtime_file}")
-                    print(f"⏰ Test executed at: {test_timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-                
-                print("\n" + "="*50)
-                print("📋 Capture Summary:")
-                print(f"   - utag_data captures: {len(captured_data['utag_data'])}")
-                print(f"   - GA4 calls: {len(captured_data['ga4_calls'])}")
-                print(f"   - GA4 purchase events: {len(ga4_purchase_calls)}")
-                print(f"   - Total network requests: {len(captured_data.get('network_calls', []))}")
-                print("="*50)
-                
-            except Exception as e:
-                print(f"⚠️ Error performing validation: {str(e)}")
-                import traceback
-                traceback.print_exc()
-        
         except Exception as e:
-            print(f"⚠️ Error in checkout process: {str(e)}")
+            log.error(f"⚠️ Error performing validation: {str(e)}")
             import traceback
-            traceback.print_exc()
+            log.error(traceback.format_exc())
+    
+    except Exception as e:
+        # Keep the trace of the step where it broke; the engine records the failed job
+        await sync.fail("checkout_process", e)
+        raise
+    finally:
+        sync.print_summary()
+
+    return validation
+
+FLOWS = {
+    'tealium_checkout': tealium_checkout_flow
+}
+
+def export_job_results(job_result, output_dir=Path("validation_results")):
+    """Save one job's captured data and comparison results to Excel."""
+    captured_data = job_result['captured_data']
+    job_id = job_result['job_id']
+    
+    if captured_data.get('blocking'):
+        print_blocking_summary(captured_data['blocking'], job_id)
+    
+    try:
+        output_dir.mkdir(exist_ok=True)
         
-        finally:
-            try:
-                # Get video path before closing the page
-                video_path = None
-                try:
-                    video_path = page.video.path()
-                    print(f"📹 Video recorded at: {video_path}")
-                except Exception as e:
-                    print(f"⚠️ Could not get video path: {str(e)}")
-                
-                # Close page to finalize video
-                page.close()
-                
-                # Rename video with meaningful name
-                if video_path and os.path.exists(video_path):
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    video_dir = Path("videos")
-                    video_dir.mkdir(exist_ok=True)
-                    new_video_name = f"test_run_{timestamp}.webm"
-                    new_video_path = video_dir / new_video_name
-                    
-                    try:
-                        import shutil
-                        shutil.move(video_path, new_video_path)
-                        print(f"✅ Video saved as: {new_video_path}")
-                    except Exception as e:
-                        print(f"⚠️ Could not rename video: {str(e)}")
-                
-                # Prepare output directory and timestamp
-                output_dir = Path("validation_results")
-                output_dir.mkdir(exist_ok=True)
-                
-                # Generate timestamp for file naming (with minutes)
-                file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-                
-                # Save Playwright trace to validation_results with timestamp
-                trace_filename = f"playwright_trace_{file_timestamp}.zip"
-                trace_path = output_dir / trace_filename
-                context.tracing.stop(path=str(trace_path))
-                print(f"✅ Playwright trace saved to: {trace_path.absolute()}")
+        # Generate timestamp for file naming (with minutes)
+        file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        
+        # Save data to Excel with timestamped names
+        if captured_data.get('ga4_calls') or captured_data.get('utag_data'):
+            
+            # Save GA4 calls to Excel
+            if captured_data.get('ga4_calls'):
+                ga4_df = captured_data['ga4_calls'].to_frame()
+                hit_sources = list(captured_data['hit_index'].sources())
+                if len(hit_sources) == len(ga4_df):
+                    ga4_df.insert(ga4_df.columns.get_loc('source') + 1, 'seen_by', hit_sources)
+                ga4_excel_path = output_dir / f"ga4_calls_{file_timestamp}_{job_id}.xlsx"
+                ga4_df.to_excel(ga4_excel_path, index=False)
+                log.info(f"✅ GA4 calls saved to: {ga4_excel_path}")
+            
+            # Save utag data to Excel
+            if captured_data.get('utag_data'):
+                utag_df = pd.json_normalize(list(captured_data['utag_data']))
+                utag_excel_path = output_dir / f"utag_data_{file_timestamp}_{job_id}.xlsx"
+                utag_df.to_excel(utag_excel_path, index=False)
+                log.info(f"✅ utag data saved to: {utag_excel_path}")
+            
+            # Save digitalData / b2t changes to Excel
+            if captured_data.get('data_layer_events'):
+                layer_df = pd.json_normalize(list(captured_data['data_layer_events']))
+                layer_excel_path = output_dir / f"data_layer_events_{file_timestamp}_{job_id}.xlsx"
+                layer_df.to_excel(layer_excel_path, index=False)
+                log.info(f"✅ Data-layer events saved to: {layer_excel_path}")
+            
+            # Save history changes and beacons to Excel
+            if captured_data.get('page_events'):
+                page_df = pd.DataFrame(list(captured_data['page_events']))
+                page_excel_path = output_dir / f"page_events_{file_timestamp}_{job_id}.xlsx"
+                page_df.to_excel(page_excel_path, index=False)
+                log.info(f"✅ History changes and beacons saved to: {page_excel_path}")
+            
+            # Save browser console messages to Excel
+            if captured_data.get('console_messages'):
+                console_df = pd.DataFrame(list(captured_data['console_messages']))
+                console_excel_path = output_dir / f"console_messages_{file_timestamp}_{job_id}.xlsx"
+                console_df.to_excel(console_excel_path, index=False)
+                log.info(f"✅ Console messages saved to: {console_excel_path}")
+            
+            # Save step latencies to Excel
+            if captured_data.get('step_timings'):
+                steps_df = pd.DataFrame(captured_data['step_timings'])
+                steps_excel_path = output_dir / f"step_timings_{file_timestamp}_{job_id}.xlsx"
+                steps_df.to_excel(steps_excel_path, index=False)
+                log.info(f"✅ Step timings saved to: {steps_excel_path}")
+            
+            # Save comparison results to Excel if they exist
+            validation = job_result.get('result') or {}
+            if validation.get('comparisons'):
+                comp_df = pd.DataFrame(validation['comparisons'])
+                comp_excel_path = output_dir / f"ga4_vs_utag_comparison_{file_timestamp}_{job_id}.xlsx"
+                comp_df.to_excel(comp_excel_path, index=False)
+                log.info(f"✅ Comparison results saved to: {comp_excel_path}")
+            
+            if validation.get('matrix'):
+                matrix_df = pd.DataFrame(validation['matrix'])
+                matrix_excel_path = output_dir / f"ga4_vs_utag_matrix_{file_timestamp}_{job_id}.xlsx"
+                matrix_df.to_excel(matrix_excel_path, index=False)
+                log.info(f"✅ Pass/fail matrix saved to: {matrix_excel_path}")
+            
+            if validation.get('unmatched_hits'):
+                unmatched_df = pd.DataFrame(validation['unmatched_hits'])
+                unmatched_excel_path = output_dir / f"unmatched_hits_{file_timestamp}_{job_id}.xlsx"
+                unmatched_df.to_excel(unmatched_excel_path, index=False)
+                log.warning(f"⚠️ Hits without a utag_data snapshot saved to: {unmatched_excel_path}")
+            
+            if validation.get('items'):
+                items_df = pd.DataFrame(validation['items'])
+                items_excel_path = output_dir / f"ga4_items_vs_utag_{file_timestamp}_{job_id}.xlsx"
+                items_df.to_excel(items_excel_path, index=False)
+                log.info(f"✅ Item-level results saved to: {items_excel_path}")
                 
-                # Save data to Excel with timestamped names
-                if captured_data.get('ga4_calls') or captured_data.get('utag_data'):
-                    
-                    # Save GA4 calls to Excel
-                    if captured_data.get('ga4_calls'):
-                        ga4_df = pd.json_normalize(captured_data['ga4_calls'])
-                        ga4_excel_path = output_dir / f"ga4_calls_{file_timestamp}.xlsx"
-                        ga4_df.to_excel(ga4_excel_path, index=False)
-                        print(f"✅ GA4 calls saved to: {ga4_excel_path}")
-                    
-                    # Save utag data to Excel
-                    if captured_data.get('utag_data'):
-                        utag_df = pd.json_normalize(captured_data['utag_data'])
-                        utag_excel_path = output_dir / f"utag_data_{file_timestamp}.xlsx"
-                        utag_df.to_excel(utag_excel_path, index=False)
-                        print(f"✅ utag data saved to: {utag_excel_path}")
-                    
-                    # Save comparison results to Excel if they exist
-                    if 'comparison' in locals():
-                        comp_df = pd.DataFrame(comparison)
-                        comp_excel_path = output_dir / f"ga4_vs_utag_comparison_{file_timestamp}.xlsx"
-                        comp_df.to_excel(comp_excel_path, index=False)
-                        print(f"✅ Comparison results saved to: {comp_excel_path}")
-                        
-            except Exception as e:
-                print(f"⚠️ Error while saving files: {str(e)}")
-            
-            finally:
-                browser.close()
-                print("✅ Browser closed")
+    except Exception as e:
+        log.error(f"⚠️ Error while saving files: {str(e)}")
+
+def export_dashboard_data(job_results):
+    """Write the dashboard rows of every job to runtime_data/last_run.json."""
+    export_data = []
+    for job_result in job_results:
+        validation = job_result.get('result') or {}
+        for row in validation.get('dashboard_rows', []):
+            export_data.append({**row, 'Flow': job_result['job_id']})
+    
+    if not export_data:
+        log.warning("⚠️ No comparison results to export for the dashboard")
+        return
+    
+    runtime_file = Path("runtime_data/last_run.json")
+    runtime_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(runtime_file, 'w') as f:
+        json.dump(export_data, f, indent=2)
+    log.info(f"\n📁 Dashboard data exported to: {runtime_file}")
+
+def prepare_storage_state(exec_profile, url=DEFAULT_URL, account=DEFAULT_ACCOUNT,
+                          profile=DEFAULT_PROFILE, consent=DEFAULT_CONSENT, fresh_setup=False,
+                          har_mode=None):
+    """
+    Return the storage-state snapshot for site/account/profile/consent, running
+    the training + consent setup once if there is no valid snapshot yet.
+    """
+    site = urlsplit(url).netloc
+    if fresh_setup:
+        invalidate_snapshot(site, account, profile, consent)
+    
+    state = load_snapshot(site, account, profile, consent)
+    if state is None:
+        log.info(f"🎓 No valid storage state for {account}/{profile}/{consent} - running setup once")
+        har_options, har_hooks = har_job_options(har_mode, "tealium_setup")
+        run_flows_sync(
+            [make_job(tealium_setup_flow, name="tealium_setup", context_options=har_options,
+                      context_hooks=har_hooks, url=url, account=account, profile=profile, consent=consent)],
+            concurrency=1,
+            launch_options=exec_profile['launch_options'],
+            context_options=context_options_for(exec_profile, CONTEXT_OPTIONS)
+        )
+        state = load_snapshot(site, account, profile, consent)
+    
+    if state is None:
+        log.warning("⚠️ Setup did not produce a storage state, every flow will run its own setup")
+    return state
+
+def run_validation(flow_names=None, repeat=1, concurrency=None, url=DEFAULT_URL,
+                   run_profile=DEFAULT_RUN_PROFILE, use_storage_state=True, fresh_setup=False,
+                   blocked_flows=None, blocking_policy=None, har_mode=None, tag_rules=(),
+                   spill_rows=SPILL_ROWS, trace_policy=None):
+    """
+    Run the selected flows concurrently under an execution profile and export their results.
+    trace_policy overrides the profile's (step_tracing.py).
+    """
+    exec_profile = get_profile(run_profile)
+    apply_profile(exec_profile)
+    log.info(f"🧭 Execution profile: {exec_profile['name']} - {exec_profile['description']}")
+    
+    if har_mode == 'record':
+        # One HAR per flow name; the setup is recorded too so replay works offline
+        if repeat > 1:
+            log.warning("⚠️ HAR record mode records one run per flow, ignoring --repeat")
+        repeat = 1
+        fresh_setup = True
+    
+    started = time.perf_counter()
+    
+    # Training modal + consent once, every flow context starts from the snapshot
+    storage_state = None
+    if use_storage_state:
+        storage_state = prepare_storage_state(exec_profile, url, fresh_setup=fresh_setup, har_mode=har_mode)
+    
+    # Resource blocking is opt-in per flow (some tags fire on image load)
+    blocking_hook = partial(install_resource_blocking, policy=load_policy(blocking_policy))
+    
+    jobs = []
+    for flow_name in flow_names or list(FLOWS):
+        context_options, context_hooks = har_job_options(har_mode, flow_name)
+        if storage_state:
+            context_options['storage_state'] = storage_state
+        if flow_name in (blocked_flows or []):
+            context_hooks.append(blocking_hook)
+        for _ in range(repeat):
+            jobs.append(make_job(
+                FLOWS[flow_name],
+                name=flow_name,
+                context_options=context_options,
+                context_hooks=context_hooks,
+                url=url,
+                from_snapshot=storage_state is not None,
+                pause=exec_profile['pause'],
+                tag_rules=tuple(tag_rules or ())
+            ))
+    
+    job_results = run_flows_sync(
+        jobs,
+        concurrency=concurrency or exec_profile['concurrency'],
+        launch_options=exec_profile['launch_options'],
+        context_options=context_options_for(exec_profile, CONTEXT_OPTIONS),
+        spill_rows=spill_rows,
+        trace_policy=trace_policy or exec_profile['trace_policy']
+    )
+    wall_time = time.perf_counter() - started
+    
+    for job_result in job_results:
+        export_job_results(job_result)
+    export_dashboard_data(job_results)
+    
+    record_profile_timing(exec_profile, wall_time, len(job_results),
+                          sum(1 for r in job_results if r['error']))
+    return job_results
+
+def automate_tealium_add_to_cart_from_home(url):
+    return run_validation(['tealium_checkout'], concurrency=1, url=url)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GA4 vs utag_data validation runner")
+    parser.add_argument("--flow", action="append", choices=sorted(FLOWS),
+                        help="Flow to run (repeatable, default: all flows)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Run each selected flow this many times")
+    parser.add_argument("--profile", default=DEFAULT_RUN_PROFILE, choices=sorted(PROFILES),
+                        help=f"Execution profile (default: {DEFAULT_RUN_PROFILE})")
+    parser.add_argument("--concurrency", type=int,
+                        help="Maximum number of browser contexts open at once (default: from the profile)")
+    parser.add_argument("--url", default=DEFAULT_URL,
+                        help="Start URL of the e-commerce site")
+    parser.add_argument("--no-storage-state", action="store_true",
+                        help="Handle the training modal and consent banner inside every flow")
+    parser.add_argument("--fresh-setup", action="store_true",
+                        help="Discard the saved storage state and run the setup again")
+    parser.add_argument("--block-resources", action="append", choices=sorted(FLOWS), metavar="FLOW",
+                        help="Abort images, media, fonts and denied domains in this flow (repeatable)")
+    parser.add_argument("--block-policy",
+                        help="JSON file overriding the default resource blocking policy")
+    parser.add_argument("--tag-rules", action="append", default=[], metavar="FILE",
+                        help="JSON rule file of extra tag vendors, checked before the defaults (repeatable)")
+    parser.add_argument("--local-site", action="store_true",
+                        help="Run against the bundled local stand-in site and GA4 collector (ignores --url)")
+    parser.add_argument("--har", choices=HAR_MODES,
+                        help="record: save each flow's page traffic to har/; replay: serve pages from it offline")
+    parser.add_argument("--debug", action="store_true",
+                        help="Verbose output: per-hit, per-change and browser console lines")
+    parser.add_argument("--log-file", metavar="FILE",
+                        help="Also append every written log record to FILE as JSON lines")
+    parser.add_argument("--spill-rows", type=int, default=SPILL_ROWS, metavar="N",
+                        help=f"Spill each capture stream to disk every N records (default: {SPILL_ROWS}, 0: never)")
+    parser.add_argument("--trace", metavar="POLICY",
+                        help="Trace chunks to keep: failures, last:N (N steps before a failure), always or off "
+                             "(default: from the profile)")
+    args = parser.parse_args(argv)
+    if args.trace:
+        try:
+            parse_trace_policy(args.trace)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
 
 if __name__ == "__main__":
-    url = "https://ecommerce.tealiumdemo.com/"
-    automate_tealium_add_to_cart_from_home(url)
+    args = parse_args()
+    log.configure(level=DEBUG if args.debug else None, path=args.log_file)
+    
+    local_site = None
+    if args.local_site:
+        local_server, args.url, local_site = start_local_site()
+    
+    run_validation(args.flow, repeat=args.repeat, concurrency=args.concurrency, url=args.url,
+                   run_profile=args.profile, use_storage_state=not args.no_storage_state,
+                   fresh_setup=args.fresh_setup, blocked_flows=args.block_resources,
+                   blocking_policy=args.block_policy, har_mode=args.har, tag_rules=args.tag_rules,
+                   spill_rows=args.spill_rows, trace_policy=args.trace)
+    
+    if local_site:
+        print_collector_stats(local_site)
+        local_server.shutdown()
+    log.print_summary()
     
     # Auto-launch dashboard after test completion
-    print("\n" + "="*80)
-    print("🚀 Test completed! Launching dashboard...")
-    print("="*80 + "\n")
+    log.info("\n" + "="*80)
+    log.info("🚀 Test completed! Launching dashboard...")
+    log.info("="*80 + "\n")
     
     try:
         import webbrowser
@@ -1054,20 +905,21 @@ if __name__ == "__main__":
         )
         
         # Wait for dashboard to start
+        log.flush()
         time.sleep(3)
         
         # Open browser
         webbrowser.open("http://127.0.0.1:8050/")
-        print("✅ Dashboard opened in browser at http://127.0.0.1:8050/")
-        print("Press Ctrl+C to stop the dashboard")
+        log.info("✅ Dashboard opened in browser at http://127.0.0.1:8050/")
+        log.info("Press Ctrl+C to stop the dashboard")
         
         # Keep dashboard running
         dashboard_process.wait()
         
     except KeyboardInterrupt:
-        print("\n⚠️ Dashboard stopped by user")
+        log.warning("\n⚠️ Dashboard stopped by user")
         if 'dashboard_process' in locals():
             dashboard_process.terminate()
     except Exception as e:
-        print(f"⚠️ Could not auto-launch dashboard: {str(e)}")
-        print("You can manually run: python dashboard.py")
+        log.warning(f"⚠️ Could not auto-launch dashboard: {str(e)}")
+        log.info("You can manually run: python dashboard.py")
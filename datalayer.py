@@ -0,0 +1,217 @@
+"""
+Push-based data-layer observers.
+
+An init script, added to the browser context so it runs in every new
+document before any page script, replaces the data-layer globals with
+accessors. Whatever the page assigns to them is wrapped at once, and every
+change is recorded, with the page path and a timestamp, into the in-page
+event buffer (event_buffer.py), which reaches Python in batches:
+
+- utag_data / utag.data: a Proxy marks the object dirty on every set or
+  delete; one microtask later the whole object is diffed against the last
+  reported state and sent as a key-level delta (utag_store.py), so a loop
+  setting fifty keys costs one report.
+- digitalData and b2t: arrays get a push() hook that reports each entry;
+  objects get a Proxy that reports each key set or deleted.
+
+Python no longer has to poll utag.data at fixed points of the flow.
+"""
+
+from datetime import datetime
+
+from log_sink import log
+
+# Globals observed as event arrays (push hook) or objects (key-level Proxy)
+ARRAY_LAYERS = ('digitalData', 'b2t')
+
+OBSERVER_JS = r"""
+(() => {
+  if (window.top !== window || window.__avpObservers || !window.__avpRecord) return;
+  window.__avpObservers = true;
+
+  const report = (payload) => {
+    payload.url = location.pathname;
+    payload.timestamp = Date.now();
+    window.__avpRecord('datalayer', payload);
+  };
+  const clone = (value) => {
+    try { return value === undefined ? null : JSON.parse(JSON.stringify(value)); }
+    catch (e) { return String(value); }
+  };
+
+  // Shallow Proxy calling onChange(key, value, op) after every set/delete
+  const targets = new WeakMap(), proxies = new WeakMap();
+  function observed(target, onChange) {
+    if (!target || typeof target !== 'object') return target;
+    if (targets.has(target)) return target;
+    if (proxies.has(target)) return proxies.get(target);
+    const proxy = new Proxy(target, {
+      set(t, key, value) {
+        const ok = Reflect.set(t, key, value);
+        onChange(String(key), value, 'set');
+        return ok;
+      },
+      deleteProperty(t, key) {
+        const ok = Reflect.deleteProperty(t, key);
+        onChange(String(key), undefined, 'delete');
+        return ok;
+      }
+    });
+    targets.set(proxy, target);
+    proxies.set(target, proxy);
+    return proxy;
+  }
+
+  // Replace owner[name] by an accessor storing wrap(value)
+  function watch(owner, name, wrap) {
+    let current = wrap(owner[name]);
+    try {
+      Object.defineProperty(owner, name, {
+        configurable: true,
+        enumerable: true,
+        get() { return current; },
+        set(value) { current = wrap(value); }
+      });
+    } catch (e) {}
+  }
+
+  // ----- utag.data: key-level deltas against the last reported state -----
+  const KEY = '__avp_utag_prev';
+  let prev = { seq: -1, lineage: null, values: {} };
+  try { prev = JSON.parse(sessionStorage.getItem(KEY)) || prev; } catch (e) {}
+  // sessionStorage is per origin and tab: a document without a lineage of its
+  // own (first of its origin) starts one with a full snapshot
+  let utagTarget = null, scheduled = false, needFull = !prev.lineage, lastFull = false;
+  const newLineage = () => Math.random().toString(36).slice(2) + Date.now().toString(36);
+
+  function reportUtag() {
+    scheduled = false;
+    if (!utagTarget) return;
+    const full = needFull;
+    needFull = false;
+    lastFull = full;
+    const base = full ? {} : prev.values;
+
+    const values = {}, set = {}, removed = [];
+    let fullBytes = 0;
+    for (const key of Object.keys(utagTarget)) {
+      let json;
+      try { json = JSON.stringify(utagTarget[key]); } catch (e) { continue; }
+      if (json === undefined) continue;
+      values[key] = json;
+      fullBytes += key.length + json.length;
+      if (base[key] !== json) set[key] = JSON.parse(json);
+    }
+    for (const key of Object.keys(base)) {
+      if (!(key in values)) removed.push(key);
+    }
+    if (!full && removed.length === 0 && Object.keys(set).length === 0) return;
+
+    const lineage = full ? newLineage() : prev.lineage;
+    const delta = { layer: 'utag.data', lineage, base: prev.seq, seq: prev.seq + 1, full, set, removed, fullBytes };
+    prev = { seq: delta.seq, lineage, values };
+    try { sessionStorage.setItem(KEY, JSON.stringify(prev)); } catch (e) {}
+    report(delta);
+  }
+  function scheduleUtag() {
+    if (!scheduled) {
+      scheduled = true;
+      queueMicrotask(reportUtag);
+    }
+  }
+  // Python refuses a delta on a base it does not hold: resend in full
+  window.__avpOnReply('datalayer', accepted => {
+    if (accepted === false && !lastFull) {
+      needFull = true;
+      scheduleUtag();
+    }
+  });
+  function utagData(value) {
+    if (!value || typeof value !== 'object') return value;
+    const proxy = observed(value, scheduleUtag);
+    utagTarget = targets.get(proxy) || value;
+    scheduleUtag();
+    return proxy;
+  }
+
+  watch(window, 'utag_data', utagData);
+  watch(window, 'utag', (utag) => {
+    if (utag && typeof utag === 'object') watch(utag, 'data', utagData);
+    return utag;
+  });
+
+  // ----- digitalData / b2t: pushed entries or key-level changes -----
+  const hooked = new WeakSet();
+  function arrayLayer(layer) {
+    return (value) => {
+      if (Array.isArray(value)) {
+        if (hooked.has(value)) return value;
+        hooked.add(value);
+        value.forEach((entry, index) => report({ layer, op: 'push', index, value: clone(entry) }));
+        const push = value.push;
+        Object.defineProperty(value, 'push', {
+          configurable: true,
+          writable: true,
+          value: function (...entries) {
+            const start = this.length;
+            const length = push.apply(this, entries);
+            entries.forEach((entry, i) => report({ layer, op: 'push', index: start + i, value: clone(entry) }));
+            return length;
+          }
+        });
+        return value;
+      }
+      if (value && typeof value === 'object') {
+        report({ layer, op: 'replace', value: clone(value) });
+        return observed(value, (key, entry, op) => report({ layer, op, key, value: clone(entry) }));
+      }
+      return value;
+    };
+  }
+  %(array_layers)s.forEach(layer => watch(window, layer, arrayLayer(layer)));
+})();
+"""
+
+def observer_script(array_layers=ARRAY_LAYERS):
+    return OBSERVER_JS % {'array_layers': list(array_layers)}
+
+async def install_datalayer_observers(context, buffer, captured_data, on_utag_change=None):
+    """
+    Observe the data layers of every document `context` opens from now on,
+    through the context's event buffer (install_event_buffer() first).
+    utag.data deltas go to captured_data['utag_data'], digitalData/b2t changes
+    to captured_data['data_layer_events']; on_utag_change(data) is called with
+    the rebuilt utag.data after each accepted delta.
+    """
+    snapshots = captured_data['utag_data']
+    events = captured_data.setdefault('data_layer_events', [])
+
+    def on_report(report, source):
+        if report.get('layer') == 'utag.data':
+            if not snapshots.accepts(report):
+                log.debug(f"🔁 utag.data delta out of sequence on {report['url']} - requesting a full snapshot",
+                          source='datalayer')
+                return False
+            data = snapshots.append_delta(report)
+            log.debug(f"📊 utag_data changed on: {report['url']} "
+                      f"({len(report['set'])} key(s) set, {len(report['removed'])} removed)", source='datalayer')
+            if 'order_total' in report['set']:
+                log.info(f"💰 Purchase data found: Total={data.get('order_total')}, ID={data.get('order_id')}",
+                         source='datalayer')
+            if on_utag_change:
+                on_utag_change(data)
+            return None
+
+        events.append({
+            'layer': report.get('layer'),
+            'op': report.get('op'),
+            'key': report.get('key', report.get('index')),
+            'value': report.get('value'),
+            'url': report.get('url'),
+            'ts_ms': report.get('timestamp'),
+            'timestamp': datetime.fromtimestamp(report.get('timestamp', 0) / 1000).isoformat()
+        })
+        log.debug(f"🧱 {report.get('layer')} {report.get('op')} on {report.get('url')}", source='datalayer')
+
+    buffer.on('datalayer', on_report)
+    await context.add_init_script(observer_script())
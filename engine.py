@@ -0,0 +1,197 @@
+"""
+Async Playwright engine.
+
+Runs many validation flows concurrently inside a single Chromium instance.
+Every job gets its own isolated browser context, page and captured_data
+buffer, so hits from different flows never mix. A semaphore caps how many
+contexts are open at once.
+
+A flow is any coroutine function with the signature:
+
+    async def flow(page, context, captured_data, **kwargs)
+
+Its return value is stored on the job result under 'result'. Context hooks
+(`async def hook(context, captured_data)`) run on the new context before
+the flow starts, e.g. to install routes.
+
+The capture streams of a job spill to append-only segment files under
+<output_dir>/segments/ once spill_rows records are waiting (segments.py),
+so a long journey runs in flat memory and a crash keeps what was spilled.
+
+Each context is traced in per-step chunks (step_tracing.py); the trace
+policy decides which chunks are kept under <output_dir>/traces/, by default
+only those of failing steps.
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from ga4_decoder import GA4Columns
+from hit_index import HitIndex
+from utag_store import UtagSnapshots
+from resource_timing import ResourceEntry
+from segments import SegmentLog, SpillList, SPILL_ROWS, print_spill_summary
+from step_tracing import StepTracer, DEFAULT_TRACE_POLICY
+from log_sink import log, current_job
+
+DEFAULT_CONCURRENCY = 4
+
+def new_captured_data(spill_dir=None, spill_rows=SPILL_ROWS):
+    """
+    Fresh, per-context capture buffer. With a `spill_dir`, the streams spill
+    to segment files there every `spill_rows` records.
+    """
+    segments = {}
+    if spill_dir and spill_rows:
+        segments = {name: SegmentLog(spill_dir, name)
+                    for name in ('utag_data', 'ga4_calls', 'data_layer_events', 'page_events', 'network_calls',
+                                 'console_messages', 'hit_sources')}
+    return {
+        'utag_data': UtagSnapshots(segments.get('utag_data'), spill_rows),
+        'ga4_calls': GA4Columns(spill=segments.get('ga4_calls'), spill_rows=spill_rows),
+        'hit_index': HitIndex(spill=segments.get('hit_sources'), spill_rows=spill_rows),
+        'data_layer_events': SpillList(segments.get('data_layer_events'), spill_rows),
+        'page_events': SpillList(segments.get('page_events'), spill_rows),
+        'network_calls': SpillList(segments.get('network_calls'), spill_rows,
+                                   ResourceEntry.to_dict, ResourceEntry.from_dict),
+        'console_messages': SpillList(segments.get('console_messages'), spill_rows),
+        'step_timings': [],
+        'segments': segments
+    }
+
+def make_job(flow, name=None, context_options=None, context_hooks=None, **kwargs):
+    """Describe one flow execution for run_flows()."""
+    return {
+        'name': name or flow.__name__,
+        'flow': flow,
+        'kwargs': kwargs,
+        'context_options': context_options or {},
+        'context_hooks': context_hooks or []
+    }
+
+async def _run_job(browser, semaphore, job, job_index, context_defaults, output_dir, spill_rows, trace_policy):
+    job_id = f"{job['name']}_{job_index + 1}"
+    # Log records of this task (and the tasks it starts) carry the job id
+    current_job.set(job_id)
+
+    async with semaphore:
+        context_options = {**context_defaults, **job['context_options']}
+        context = await browser.new_context(**context_options)
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{job_id}"
+
+        # Trace for the Playwright UI, cut into per-step chunks by StepSync
+        tracer = StepTracer(context, output_dir / "traces" / run_id, job_id, trace_policy)
+        await tracer.start()
+
+        page = await context.new_page()
+        captured_data = new_captured_data(output_dir / "segments" / run_id, spill_rows)
+        captured_data['tracer'] = tracer
+
+        job_result = {
+            'job_id': job_id,
+            'flow': job['name'],
+            'kwargs': job['kwargs'],
+            'captured_data': captured_data,
+            'result': None,
+            'error': None,
+            'trace_paths': [],
+            'video_path': None
+        }
+
+        log.info(f"🚀 [{job_id}] Starting flow")
+        started = time.perf_counter()
+        try:
+            for hook in job['context_hooks']:
+                await hook(context, captured_data)
+            job_result['result'] = await job['flow'](page, context, captured_data, **job['kwargs'])
+        except Exception as e:
+            job_result['error'] = str(e)
+            log.error(f"⚠️ [{job_id}] Flow failed: {str(e)}")
+            import traceback
+            log.error(traceback.format_exc())
+        finally:
+            job_result['duration'] = time.perf_counter() - started
+            await _finalize_job(page, context, tracer, job_id, job_result)
+            captured_data.pop('tracer', None)
+            print_spill_summary(captured_data['segments'], job_id)
+            if job_result['error']:
+                # Everything the job logged, DEBUG included, as far as the ring still holds it
+                log_path = output_dir / f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job_id}.jsonl"
+                job_result['log_path'] = str(log_path)
+                output_dir.mkdir(exist_ok=True)
+                log.info(f"🧾 [{job_id}] {log.dump(log_path, job=job_id)} log record(s) saved to: {log_path}")
+
+        log.info(f"✅ [{job_id}] Finished in {job_result['duration']:.1f}s")
+        return job_result
+
+async def _finalize_job(page, context, tracer, job_id, job_result):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        # Get video path before closing the page
+        video_path = None
+        if page.video:
+            try:
+                video_path = await page.video.path()
+            except Exception as e:
+                log.warning(f"⚠️ [{job_id}] Could not get video path: {str(e)}")
+
+        # Close page to finalize video
+        await page.close()
+
+        # Rename video with meaningful name
+        if video_path and os.path.exists(video_path):
+            video_dir = Path("videos")
+            video_dir.mkdir(exist_ok=True)
+            new_video_path = video_dir / f"test_run_{timestamp}_{job_id}.webm"
+            try:
+                shutil.move(video_path, new_video_path)
+                job_result['video_path'] = str(new_video_path)
+                log.info(f"✅ [{job_id}] Video saved as: {new_video_path}")
+            except Exception as e:
+                log.warning(f"⚠️ [{job_id}] Could not rename video: {str(e)}")
+
+        # Keep the trace chunks the policy asks for (the last one too if the flow failed)
+        job_result['trace_paths'] = await tracer.finish(failed=job_result['error'] is not None)
+        job_result['tracing'] = tracer.summary()
+        tracer.print_summary()
+
+    except Exception as e:
+        log.error(f"⚠️ [{job_id}] Error while finalizing context: {str(e)}")
+
+    finally:
+        await context.close()
+
+async def run_flows(jobs, concurrency=DEFAULT_CONCURRENCY, launch_options=None,
+                    context_options=None, output_dir="validation_results", spill_rows=SPILL_ROWS,
+                    trace_policy=DEFAULT_TRACE_POLICY):
+    """
+    Run every job concurrently in one browser, at most `concurrency` at a time.
+    Returns one result dict per job, in the order the jobs were given.
+    Capture streams spill to disk every `spill_rows` records (0: never);
+    trace chunks are kept according to `trace_policy` (step_tracing.py).
+    """
+    launch_options = launch_options or {}
+    context_defaults = context_options or {}
+    output_dir = Path(output_dir)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**launch_options)
+        try:
+            return await asyncio.gather(*(
+                _run_job(browser, semaphore, job, i, context_defaults, output_dir, spill_rows, trace_policy)
+                for i, job in enumerate(jobs)
+            ))
+        finally:
+            await browser.close()
+            log.info("✅ Browser closed")
+
+def run_flows_sync(jobs, **kwargs):
+    """Blocking wrapper around run_flows() for scripts and worker processes."""
+    return asyncio.run(run_flows(jobs, **kwargs))
@@ -0,0 +1,185 @@
+"""
+Batched in-page event buffer.
+
+An init script gives every document (iframes included) one ring buffer,
+window.__avpRecord(type, event), that the other injected scripts record into
+instead of calling Python themselves. The buffer is flushed to Python
+through a single binding every FLUSH_MS, as soon as FLUSH_EVENTS events are
+waiting, on visibilitychange to hidden and on pagehide (after which every
+event goes out at once), so an event-heavy SPA page costs one round trip per
+batch instead of one per event. If the ring is full the oldest events are
+dropped and counted.
+
+The buffer itself records history changes (pushState, replaceState,
+popstate, hashchange) and every navigator.sendBeacon() call, whatever the
+vendor; the GA4 ones are also decoded as hits by the interceptor
+(capture.py).
+
+Python dispatches each event to the handler registered for its type. A
+handler may return a reply; the last reply per type is sent back with the
+flush and handed to the page-side listener registered for that type with
+window.__avpOnReply(type, fn).
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from log_sink import log, current_job
+
+BUFFER_BINDING = "__avpFlush"
+FLUSH_MS = 250
+FLUSH_EVENTS = 50
+RING_SIZE = 5000
+
+BUFFER_JS = r"""
+(() => {
+  if (window.__avpRecord) return;
+  const BINDING = '%(binding)s', FLUSH_MS = %(flush_ms)d, FLUSH_EVENTS = %(flush_events)d, RING_SIZE = %(ring_size)d;
+
+  const ring = new Array(RING_SIZE);
+  let head = 0, size = 0, dropped = 0, timer = null, unloading = false;
+  const replyListeners = {};
+
+  function flush(reason) {
+    if (timer !== null) { clearTimeout(timer); timer = null; }
+    if (size === 0 && dropped === 0) return Promise.resolve();
+    const events = new Array(size);
+    for (let i = 0; i < size; i++) {
+      events[i] = ring[(head + i) %% RING_SIZE];
+      ring[(head + i) %% RING_SIZE] = undefined;
+    }
+    const batch = { events, dropped, reason };
+    head = 0; size = 0; dropped = 0;
+    if (typeof window[BINDING] !== 'function') return Promise.resolve();
+    return Promise.resolve(window[BINDING](batch)).then(replies => {
+      for (const type of Object.keys(replies || {})) {
+        (replyListeners[type] || []).forEach(fn => { try { fn(replies[type]); } catch (e) {} });
+      }
+    }, () => {});
+  }
+
+  window.__avpRecord = (type, event) => {
+    event.type = type;
+    event.path = location.pathname;
+    if (event.timestamp === undefined) event.timestamp = Date.now();
+    if (size === RING_SIZE) {
+      head = (head + 1) %% RING_SIZE;
+      size -= 1;
+      dropped += 1;
+    }
+    ring[(head + size) %% RING_SIZE] = event;
+    size += 1;
+    // Once the page is being hidden, whatever is still recorded goes out at once
+    if (unloading) flush('pagehide');
+    else if (size >= FLUSH_EVENTS) flush('size');
+    else if (timer === null) timer = setTimeout(() => flush('timer'), FLUSH_MS);
+  };
+  window.__avpFlushNow = () => flush('request');
+  window.__avpOnReply = (type, fn) => { (replyListeners[type] = replyListeners[type] || []).push(fn); };
+
+  addEventListener('pagehide', () => { unloading = true; flush('pagehide'); });
+  addEventListener('pageshow', () => { unloading = false; });
+  addEventListener('visibilitychange', () => { if (document.visibilityState === 'hidden') flush('hidden'); });
+
+  // ----- History changes (SPA virtual pageviews) -----
+  for (const op of ['pushState', 'replaceState']) {
+    const original = history[op];
+    history[op] = function (...args) {
+      const from = location.href;
+      const result = original.apply(this, args);
+      window.__avpRecord('history', { op, from, to: location.href });
+      return result;
+    };
+  }
+  addEventListener('popstate', () => window.__avpRecord('history', { op: 'popstate', to: location.href }));
+  addEventListener('hashchange', (e) => window.__avpRecord('history', { op: 'hashchange', from: e.oldURL, to: e.newURL }));
+
+  // ----- Beacons -----
+  if (navigator.sendBeacon) {
+    const sendBeacon = navigator.sendBeacon;
+    navigator.sendBeacon = function (url, data) {
+      const queued = sendBeacon.apply(this, arguments);
+      let bytes = 0;
+      if (typeof data === 'string') bytes = data.length;
+      else if (data && data.size !== undefined) bytes = data.size;
+      else if (data && data.byteLength !== undefined) bytes = data.byteLength;
+      window.__avpRecord('beacon', { target: String(url), bytes, queued });
+      return queued;
+    };
+  }
+})();
+"""
+
+def buffer_script():
+    return BUFFER_JS % {'binding': BUFFER_BINDING, 'flush_ms': FLUSH_MS,
+                        'flush_events': FLUSH_EVENTS, 'ring_size': RING_SIZE}
+
+class EventBuffer:
+    """Python end of the in-page buffer: per-type handlers and round-trip counts."""
+
+    def __init__(self, captured_data):
+        self.handlers = {}
+        self.page_events = captured_data.setdefault('page_events', [])
+        self.stats = {'flushes': 0, 'events': 0, 'dropped': 0, 'by_type': Counter(), 'by_reason': Counter()}
+        captured_data['event_buffer'] = self.stats
+        # Bindings are called outside the flow's task: handlers log under this job
+        self.job = current_job.get()
+        self.on('history', self._page_event)
+        self.on('beacon', self._page_event)
+
+    def on(self, event_type, handler):
+        """handler(event, source) is called for every buffered event of `event_type`."""
+        self.handlers[event_type] = handler
+
+    def _page_event(self, event, source):
+        self.page_events.append({
+            **event,
+            'ts_ms': event['timestamp'],
+            'timestamp': datetime.fromtimestamp(event['timestamp'] / 1000).isoformat()
+        })
+
+    def on_flush(self, source, batch):
+        token = current_job.set(self.job)
+        try:
+            return self._dispatch(batch, source)
+        finally:
+            current_job.reset(token)
+
+    def _dispatch(self, batch, source):
+        self.stats['flushes'] += 1
+        self.stats['events'] += len(batch['events'])
+        self.stats['dropped'] += batch.get('dropped', 0)
+        self.stats['by_reason'][batch.get('reason')] += 1
+        if batch.get('dropped'):
+            log.warning(f"⚠️ In-page event buffer overflowed: {batch['dropped']} event(s) dropped")
+
+        replies = {}
+        for event in batch['events']:
+            event_type = event.get('type')
+            self.stats['by_type'][event_type] += 1
+            handler = self.handlers.get(event_type)
+            if handler is None:
+                continue
+            reply = handler(event, source)
+            if reply is not None:
+                replies[event_type] = reply
+        return replies
+
+    async def flush(self, page):
+        """Flush the main frame's buffer now; returns once Python has handled the batch."""
+        await page.evaluate("() => window.__avpFlushNow && window.__avpFlushNow()")
+
+    def print_summary(self):
+        stats = self.stats
+        if not stats['flushes']:
+            return
+        types = ", ".join(f"{t}={n}" for t, n in stats['by_type'].most_common())
+        log.info(f"📦 In-page buffer: {stats['events']} event(s) in {stats['flushes']} flush(es) "
+                 f"({stats['events'] / stats['flushes']:.1f} per round trip; {types}), {stats['dropped']} dropped")
+
+async def install_event_buffer(context, captured_data):
+    """Add the buffer to every document of `context`; returns the EventBuffer to register handlers on."""
+    buffer = EventBuffer(captured_data)
+    await context.expose_binding(BUFFER_BINDING, buffer.on_flush)
+    await context.add_init_script(buffer_script())
+    return buffer
@@ -0,0 +1,302 @@
+"""
+GA4 hit decoder.
+
+gtag sends a single event as query parameters on /g/collect, but batches
+several events into one POST: parameters shared by the batch (v, tid, cid,
+sid, dl, ...) stay in the URL and every line of the body carries one event's
+own parameters (en, _s, ep.*, ...). decode_request() turns either form into
+one flat {name: value} dict per event, body parameters overriding URL ones.
+
+It runs inline in the capture route, so it avoids parse_qs: pairs are split
+by hand and only unquoted when they actually contain an escape.
+
+Decoded hits are stored in a GA4Columns table: one list per parameter,
+typed once when the hit is appended, following the Measurement Protocol
+prefixes (epn./upn. numeric, ep./up. text, _s/_et/sct/seg integers,
+en/cu/tid/cid/sid and prN item strings text). Readers - the validator, the
+Excel export - use the typed columns and never convert per hit.
+
+Long monitoring journeys capture tens of thousands of hits that repeat the
+same tid, cid, sid, dl, page and URL values, so every text value is interned
+per table: one string object is shared by all hits sending it. Capture time
+is kept as epoch milliseconds only (ts_ms); the readable timestamp column is
+derived when the table is exported.
+
+Given a SegmentLog (segments.py), the table keeps only its newest rows in
+memory: every spill_rows hits, the rows are written to the segments as
+{name: value} records and the in-memory columns start over. Readers -
+column(), record(), to_frame() - read the spilled rows back through the
+segments, so row numbers cover the whole journey.
+
+items_frame() decodes the prN item strings ("idSKU~nmName~pr455.00~qt1")
+of many hits at once into one items table, splitting each distinct item
+string only once.
+"""
+
+import re
+from datetime import datetime
+from urllib.parse import unquote_plus
+
+import pandas as pd
+
+from segments import SPILL_ROWS
+
+# Value type per parameter name prefix
+PREFIX_TYPES = (
+    ('epn.', float),
+    ('upn.', float),
+    ('ep.', str),
+    ('up.', str)
+)
+
+# Core parameters that carry integers
+INT_PARAMS = {'_s', '_et', 'sct', 'seg'}
+
+# Text-prefixed parameters the Tealium profiles send with numeric values
+NUMERIC_TEXT_PARAMS = {'ep.value', 'ep.tax', 'ep.shipping'}
+
+# prN item string field codes -> items table columns
+ITEM_FIELDS = {
+    'id': 'item_id',
+    'nm': 'item_name',
+    'af': 'affiliation',
+    'cp': 'coupon',
+    'ds': 'discount',
+    'lp': 'index',
+    'br': 'item_brand',
+    'ca': 'item_category',
+    'c2': 'item_category2',
+    'c3': 'item_category3',
+    'c4': 'item_category4',
+    'c5': 'item_category5',
+    'li': 'item_list_id',
+    'ln': 'item_list_name',
+    'lo': 'location_id',
+    'va': 'item_variant',
+    'pr': 'price',
+    'qt': 'quantity'
+}
+ITEM_NUMERIC_FIELDS = ('discount', 'price', 'quantity')
+ITEM_PARAM = re.compile(r"pr(\d+)$")
+
+# Capture metadata stored next to the parameters, first in every export
+META_COLUMNS = ('url', 'method', 'batch_index', 'batch_size', 'ts_ms', 'page', 'source')
+
+def parse_query(qs):
+    """Query string -> {name: value}; first value wins, blank values dropped (like parse_qs)."""
+    params = {}
+    for pair in qs.split('&'):
+        key, _, value = pair.partition('=')
+        if not value:
+            continue
+        if '%' in key or '+' in key:
+            key = unquote_plus(key)
+        if '%' in value or '+' in value:
+            value = unquote_plus(value)
+        if key not in params:
+            params[key] = value
+    return params
+
+def decode_request(url, post_data=None):
+    """One parameter dict per event in a /g/collect request (GET or batched POST)."""
+    _, _, query = url.partition('?')
+    query = query.partition('#')[0]
+    shared = parse_query(query)
+    if not post_data:
+        return [shared]
+
+    events = []
+    for line in post_data.splitlines():
+        if line:
+            event = shared.copy()
+            event.update(parse_query(line))
+            events.append(event)
+    return events or [shared]
+
+def param_type(name):
+    """Python type a GA4 parameter is stored as."""
+    if name in INT_PARAMS:
+        return int
+    if name in NUMERIC_TEXT_PARAMS:
+        return float
+    for prefix, value_type in PREFIX_TYPES:
+        if name.startswith(prefix):
+            return value_type
+    return str
+
+class GA4Columns:
+    """Decoded GA4 hits stored column-wise, one typed list per parameter."""
+
+    def __init__(self, intern=True, spill=None, spill_rows=SPILL_ROWS):
+        self.columns = {name: [] for name in META_COLUMNS}
+        self.length = 0
+        self.type_errors = 0
+        self._converters = {}
+        # One shared object per distinct text value (None: every hit keeps its own)
+        self._strings = {} if intern else None
+        # Rows before `spilled` are in the `spill` SegmentLog, the columns hold the rest
+        self.spill_log = spill
+        self.spill_rows = spill_rows
+        self.spilled = 0
+
+    def __len__(self):
+        return self.length
+
+    def _converter(self, name):
+        # Resolved once per parameter name, then reused for every hit
+        value_type = param_type(name)
+        converter = self._converters[name] = None if value_type is str else value_type
+        return converter
+
+    def append(self, params, **meta):
+        """Append one hit; returns its row index."""
+        row = self.length - self.spilled
+        columns = self.columns
+        strings = self._strings
+        for name, value in meta.items():
+            if strings is not None and type(value) is str:
+                value = strings.setdefault(value, value)
+            column = columns.setdefault(name, [])
+            if len(column) < row:
+                column.extend([None] * (row - len(column)))
+            column.append(value)
+
+        for name, value in params.items():
+            converter = self._converters.get(name, False)
+            if converter is False:
+                converter = self._converter(name)
+            if converter is not None:
+                try:
+                    value = converter(value)
+                except ValueError:
+                    self.type_errors += 1
+                    value = None
+            elif strings is not None:
+                value = strings.setdefault(value, value)
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = []
+            if len(column) < row:
+                column.extend([None] * (row - len(column)))
+            column.append(value)
+
+        self.length += 1
+        if self.spill_log is not None and self.spill_rows and row + 1 >= self.spill_rows:
+            self.spill()
+        return self.length - 1
+
+    def spill(self):
+        """Write the in-memory rows to the spill segments and start the columns over."""
+        rows = self.length - self.spilled
+        if self.spill_log is None or not rows:
+            return
+        columns = list(self.columns.items())
+        self.spill_log.write(
+            {name: column[i] for name, column in columns if i < len(column) and column[i] is not None}
+            for i in range(rows)
+        )
+        for column in self.columns.values():
+            column.clear()
+        self.spilled = self.length
+        if self._strings is not None:
+            self._strings.clear()
+
+    def _tail(self, name):
+        # In-memory rows of one column, padded to their full count
+        rows = self.length - self.spilled
+        column = self.columns.get(name)
+        if column is None:
+            return [None] * rows
+        if len(column) < rows:
+            column.extend([None] * (rows - len(column)))
+        return column
+
+    def column(self, name):
+        """Full-length list for one parameter (None where a hit lacks it)."""
+        if not self.spilled:
+            return self._tail(name)
+        return [record.get(name) for record in self.spill_log.records()] + self._tail(name)
+
+    def _full_columns(self):
+        # Every column in one pass over the spilled rows
+        if not self.spilled:
+            return {name: self._tail(name) for name in self.columns}
+        full = {name: [] for name in self.columns}
+        for record in self.spill_log.records():
+            for name, column in full.items():
+                column.append(record.get(name))
+        for name, column in full.items():
+            column.extend(self._tail(name))
+        return full
+
+    def rows_where(self, name, value):
+        return [i for i, v in enumerate(self.column(name)) if v == value]
+
+    def record(self, row):
+        """One hit as a {name: value} dict, for display."""
+        if row < self.spilled:
+            record = next(self.spill_log.records(row))
+        else:
+            row -= self.spilled
+            record = {name: column[row] for name, column in self.columns.items()
+                      if row < len(column) and column[row] is not None}
+        if 'ts_ms' in record:
+            record['timestamp'] = datetime.fromtimestamp(record['ts_ms'] / 1000).isoformat()
+        return record
+
+    def to_frame(self):
+        """
+        Columns as a DataFrame; integer parameters use the nullable Int64 dtype
+        and a local-time 'timestamp' column is derived from ts_ms.
+        """
+        frame = pd.DataFrame({
+            name: pd.array(values, dtype='Int64') if self._converters.get(name) is int else values
+            for name, values in self._full_columns().items()
+        })
+        local_zone = datetime.now().astimezone().tzinfo
+        timestamps = pd.to_datetime(pd.to_numeric(frame['ts_ms'], errors='coerce'), unit='ms', utc=True)
+        frame.insert(frame.columns.get_loc('ts_ms'), 'timestamp',
+                     timestamps.dt.tz_convert(local_zone).dt.tz_localize(None))
+        return frame
+
+def decode_item(item):
+    """One prN item string as {column: text value}."""
+    fields = {}
+    for field in item.split('~'):
+        if len(field) > 2:
+            code = field[:2]
+            fields.setdefault(ITEM_FIELDS.get(code, code), field[2:])
+    return fields
+
+def items_frame(ga4_columns, rows=None):
+    """Items of every hit (or of `rows` only) as one table, one line per prN item."""
+    item_params = [name for name in ga4_columns.columns if ITEM_PARAM.match(name)]
+    table_columns = ['hit_row', 'item_number', 'item_id', 'item_name', 'price', 'quantity']
+    if not item_params:
+        return pd.DataFrame(columns=table_columns)
+
+    strings = pd.concat(
+        {int(name[2:]): pd.Series(ga4_columns.column(name), dtype=object) for name in item_params},
+        names=['item_number', 'hit_row']
+    ).dropna()
+    if rows is not None:
+        strings = strings[strings.index.get_level_values('hit_row').isin(rows)]
+    if strings.empty:
+        return pd.DataFrame(columns=table_columns)
+
+    # Hits of one run mostly repeat the same carts, so each distinct item
+    # string is split once and the result broadcast to every hit sending it
+    codes, distinct = pd.factorize(strings.to_numpy())
+    decoded = pd.DataFrame([decode_item(item) for item in distinct])
+    for name in ITEM_NUMERIC_FIELDS:
+        if name in decoded:
+            decoded[name] = pd.to_numeric(decoded[name], errors='coerce')
+    table = decoded.take(codes).reset_index(drop=True)
+    table.insert(0, 'hit_row', strings.index.get_level_values('hit_row'))
+    table.insert(1, 'item_number', strings.index.get_level_values('item_number'))
+
+    for name in table_columns:
+        if name not in table:
+            table[name] = None
+    table = table[table_columns + [c for c in table.columns if c not in table_columns]]
+    return table.sort_values(['hit_row', 'item_number'], ignore_index=True)
@@ -0,0 +1,69 @@
+"""
+HAR record-and-replay.
+
+record: every context records its page traffic to har/<flow>.har.zip.
+replay: pages are served from that HAR with context.route_from_har(), and
+anything not in the HAR is aborted, so runs need no network at all.
+
+Analytics collector requests are never served from the HAR (their query
+strings change on every run). In replay mode they are answered locally with
+an empty 204, behind the page-level capture routes (capture.py), which fall
+back to it, so every hit is still captured exactly as on the live site.
+"""
+
+from pathlib import Path
+
+from log_sink import log
+
+HAR_DIR = Path("har")
+
+HAR_MODES = ['record', 'replay']
+
+# Hit endpoints answered locally during replay
+COLLECTOR_PATTERNS = [
+    "**/g/collect*",
+    "**/j/collect*",
+    "**/b/ss/**",
+    "**/tr?*",
+    "**/i.gif*"
+]
+
+def har_path(name):
+    return HAR_DIR / f"{name}.har.zip"
+
+def har_job_options(har_mode, name):
+    """(context_options, context_hooks) that put a job named `name` in `har_mode`."""
+    if har_mode == 'record':
+        path = har_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # minimal mode keeps only what route_from_har needs
+        return {'record_har_path': str(path), 'record_har_mode': 'minimal'}, []
+
+    if har_mode == 'replay':
+        path = har_path(name)
+        if not path.exists():
+            raise FileNotFoundError(f"No HAR recorded for '{name}' at {path}. Run once with --har record first.")
+
+        async def replay_hook(context, captured_data):
+            await install_har_replay(context, captured_data, path)
+
+        return {}, [replay_hook]
+
+    return {}, []
+
+async def install_har_replay(context, captured_data, path):
+    stats = {'har': str(path), 'collector_hits': 0}
+    captured_data['har_replay'] = stats
+
+    # Everything the HAR knows is served from disk, everything else is aborted
+    await context.route_from_har(str(path), not_found="abort")
+
+    async def answer_collector(route):
+        stats['collector_hits'] += 1
+        await route.fulfill(status=204, body="")
+
+    # Registered after route_from_har, so these take precedence over it
+    for pattern in COLLECTOR_PATTERNS:
+        await context.route(pattern, answer_collector)
+
+    log.info(f"📼 Replaying page traffic from {path} (offline)")
@@ -0,0 +1,104 @@
+"""
+GA4 hit identity index.
+
+The capture paths (route, fetch/XHR/sendBeacon interceptor, resource timing)
+see the same hits in different shapes: the route gets the request as sent,
+the interceptor the URL the page script used and its body, resource timing
+only the URL. Comparing requests would miss most of these duplicates, so
+each decoded hit is keyed on its canonical identity instead:
+
+    (tid, cid, _p page-load id, _s hit sequence, en, page, batch position)
+
+where page is the hit's dl parameter, or the page the capture path saw
+(without its fragment) when it has none. _s and _p are in the URL of a
+batched POST and shared by every event line of its body, so the event's
+position in the batch tells apart two events of one request with the same
+en. A hit without an _s sequence has no reliable identity, so its whole
+parameter set is the key. Insert and lookup are one dict access.
+
+Only sightings from different capture paths are the same hit: a path that
+reports an identity it already reported saw the page send it again, and the
+second hit is stored too.
+
+For every stored hit (by ga4_calls row) the index keeps which sources saw it,
+e.g. "route+sendBeacon". Only the last WINDOW identities and rows are kept
+in memory for matching: the paths report a hit within seconds of each
+other. The labels of older rows are final and go to a SpillList, which
+spills to a segment file like the capture streams, so the index stays
+bounded on long journeys.
+"""
+
+from collections import Counter, OrderedDict
+
+from segments import SpillList, SPILL_ROWS
+
+IDENTITY_PARAMS = ('tid', 'cid', '_p', '_s', 'en')
+WINDOW = 100000
+
+def hit_identity(params, page_url=None, batch_index=0):
+    """Canonical identity of one decoded hit, the `batch_index`-th event of its request."""
+    page = params.get('dl') or (page_url or '').split('#', 1)[0]
+    if params.get('_s') is None:
+        return ('params', page, batch_index, tuple(sorted(params.items())))
+    return tuple(params.get(name) for name in IDENTITY_PARAMS) + (page, batch_index)
+
+class HitIndex:
+    """Identity -> ga4_calls row of recent hits, and the sources that saw every stored hit."""
+
+    def __init__(self, window=WINDOW, spill=None, spill_rows=SPILL_ROWS):
+        self.window = window
+        self.rows = OrderedDict()
+        # Sources label of the last `window` rows; the older ones, by row, in `settled`
+        self.recent = OrderedDict()
+        self.settled = SpillList(spill, spill_rows)
+        self.counts = Counter()
+        self.duplicates = 0
+        self._labels = {}
+
+    def __len__(self):
+        return len(self.settled) + len(self.recent)
+
+    def _label(self, sources):
+        # One shared string per combination of sources
+        label = "+".join(sorted(sources))
+        return self._labels.setdefault(label, label)
+
+    def seen(self, identity, source):
+        """
+        Whether a hit with this identity was already stored by another capture
+        path; if so, `source` is added to the sources that saw it.
+        """
+        row = self.rows.get(identity)
+        # A row that left the window is too old to be another path's sighting
+        current = self.recent.get(row)
+        if current is None or source in current.split("+"):
+            return False
+        self.duplicates += 1
+        label = self._label(current.split("+") + [source])
+        self.counts[current] -= 1
+        self.counts[label] += 1
+        self.recent[row] = label
+        return True
+
+    def add(self, identity, row, source):
+        """Register a newly stored hit; rows are added in order."""
+        for missing in range(len(self), row):
+            self.recent[missing] = None
+        label = self._label([source])
+        self.recent[row] = label
+        self.counts[label] += 1
+        while len(self.recent) > self.window:
+            self.settled.append(self.recent.popitem(last=False)[1])
+        self.rows[identity] = row
+        self.rows.move_to_end(identity)
+        if len(self.rows) > self.window:
+            self.rows.popitem(last=False)
+
+    def sources(self):
+        """Sources label of every stored hit, by ga4_calls row (None: stored without the index)."""
+        yield from self.settled
+        yield from self.recent.values()
+
+    def source_counts(self):
+        """How many hits each combination of sources saw, e.g. {'route+sendBeacon': 5}."""
+        return Counter({label: n for label, n in self.counts.items() if n})
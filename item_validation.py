@@ -0,0 +1,96 @@
+"""
+Item-level purchase validation.
+
+The utag product_* arrays of the order are turned into one expected item
+table, crossed with every GA4 purchase hit, and outer-joined against the
+items decoded from those hits' prN strings (ga4_decoder.items_frame). All
+comparisons are whole-column pandas/NumPy operations, so carts with
+hundreds of lines and runs with thousands of hits cost no Python loop per
+item.
+
+Repeated SKUs are matched in order: the n-th line of a SKU in utag is
+compared with the n-th GA4 item carrying that SKU.
+"""
+
+import numpy as np
+import pandas as pd
+
+from log_sink import log
+
+# utag array -> items table column
+UTAG_ITEM_FIELDS = {
+    'product_sku': 'item_id',
+    'product_name': 'item_name',
+    'product_price': 'price',
+    'product_quantity': 'quantity'
+}
+
+PRICE_TOLERANCE = 0.01
+
+def utag_items_frame(utag):
+    """The order's utag product_* arrays as an items table (one line per array index)."""
+    arrays = {}
+    for utag_name, column in UTAG_ITEM_FIELDS.items():
+        values = utag.get(utag_name)
+        if values is None:
+            values = []
+        elif not isinstance(values, list):
+            values = [values]
+        arrays[column] = pd.Series(values, dtype=object)
+
+    table = pd.DataFrame(arrays)
+    table['item_id'] = table['item_id'].astype(str)
+    for column in ('price', 'quantity'):
+        table[column] = pd.to_numeric(table[column], errors='coerce')
+    table.insert(0, 'item_number', np.arange(1, len(table) + 1))
+    return table
+
+def _with_line(table):
+    table = table.copy()
+    table['item_id'] = table['item_id'].astype(str)
+    table['line'] = table.groupby(['hit_row', 'item_id']).cumcount()
+    return table
+
+def validate_items(ga4_items, utag_items, hit_rows, price_tolerance=PRICE_TOLERANCE):
+    """One row per expected or sent item per purchase hit, with status and match flags."""
+    expected = pd.DataFrame({'hit_row': list(hit_rows)}).merge(utag_items, how='cross')
+    sent = ga4_items[ga4_items['hit_row'].isin(list(hit_rows))]
+
+    merged = _with_line(expected).merge(
+        _with_line(sent)[['hit_row', 'item_id', 'line', 'item_number', 'price', 'quantity']],
+        on=['hit_row', 'item_id', 'line'],
+        how='outer',
+        suffixes=('_utag', '_ga4'),
+        indicator=True
+    )
+
+    both = (merged['_merge'] == 'both').to_numpy()
+    quantity_utag = merged['quantity_utag'].to_numpy(dtype=float)
+    quantity_ga4 = merged['quantity_ga4'].to_numpy(dtype=float)
+    price_utag = merged['price_utag'].to_numpy(dtype=float)
+    price_ga4 = merged['price_ga4'].to_numpy(dtype=float)
+
+    merged['status'] = np.select(
+        [both, (merged['_merge'] == 'left_only').to_numpy()],
+        ['in_both', 'missing_in_ga4'],
+        default='extra_in_ga4'
+    )
+    merged['quantity_match'] = both & np.isclose(quantity_utag, quantity_ga4, atol=0, equal_nan=True)
+    # A price utag does not provide cannot fail the check
+    merged['price_match'] = both & (np.isnan(price_utag) |
+                                    np.isclose(price_utag, price_ga4, atol=price_tolerance, rtol=0))
+    merged['match'] = merged['quantity_match'] & merged['price_match']
+
+    return merged.drop(columns=['_merge', 'line']).sort_values(['hit_row', 'item_number_utag'], ignore_index=True)
+
+def print_item_summary(results):
+    if results.empty:
+        log.warning("⚠️ No items to validate")
+        return
+    statuses = results['status'].value_counts()
+    matched = int(results['match'].sum())
+    log.info(f"\n🧾 Item-level validation: {matched}/{len(results)} item lines match "
+             f"({statuses.get('missing_in_ga4', 0)} missing in GA4, {statuses.get('extra_in_ga4', 0)} extra in GA4)")
+    for row in results[~results['match']].head(10).itertuples():
+        log.warning(f"   ❌ hit row {row.hit_row} item {row.item_id}: {row.status}, "
+                    f"qty utag={row.quantity_utag} GA4={row.quantity_ga4}, price utag={row.price_utag} GA4={row.price_ga4}")
@@ -0,0 +1,466 @@
+"""
+Local stand-in e-commerce site and GA4 collector.
+
+Imitates every page the Tealium checkout flow touches - training modal,
+consent banner, home page, Linen Blazer product page with swatches, cart
+with shipping estimate, onepage checkout and success page - using the same
+selectors as the live site. Each page sets utag_data and loads a stub
+/utag.js that fires GA4 hits at the local /g/collect endpoint.
+
+No outside services are needed, so the capture and validation pipeline can
+be load-tested at hundreds of concurrent sessions and engine speed can be
+measured on its own:
+
+    python local_site.py --port 8765
+    python core.py --profile ci --local-site --repeat 200 --concurrency 50
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from log_sink import log
+
+PRODUCT = {
+    'sku': 'lnb-570',
+    'name': 'Linen Blazer',
+    'price': '455.00',
+    'url': '/linen-blazer-570.html'
+}
+
+CURRENCY = 'USD'
+
+# Stub of utag.js: exposes utag.data / utag.link / utag.view and maps
+# Tealium events to GA4 hits sent to the local collector
+UTAG_JS = r"""
+(function () {
+  var data = window.utag_data || {};
+  var seq = 0;
+
+  function cookie(name) {
+    var m = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return m ? decodeURIComponent(m[1]) : null;
+  }
+  function clientId() {
+    var cid = cookie('_ga_stub');
+    if (!cid) {
+      cid = Math.floor(Math.random() * 1e9) + '.' + Math.floor(Date.now() / 1000);
+      document.cookie = '_ga_stub=' + cid + '; path=/';
+    }
+    return cid;
+  }
+  var sid = cookie('_ga_stub_sid');
+  if (!sid) {
+    sid = String(Math.floor(Date.now() / 1000));
+    document.cookie = '_ga_stub_sid=' + sid + '; path=/';
+  }
+  function first(v) { return Array.isArray(v) ? v[0] : v; }
+
+  // Like gtag: events queued in the same tick go out together. A single
+  // event is sent as query parameters, several as one POST whose body has
+  // one line of event parameters per event.
+  var queue = [];
+  function flush() {
+    if (!queue.length) return;
+    var shared = new URLSearchParams({
+      v: '2', tid: 'G-LOCALSTUB', cid: clientId(), sid: sid, dl: location.href, dt: document.title
+    });
+    if (queue.length === 1) {
+      queue[0].forEach(function (value, key) { shared.set(key, value); });
+      navigator.sendBeacon('/g/collect?' + shared.toString());
+    } else {
+      navigator.sendBeacon('/g/collect?' + shared.toString(),
+        queue.map(function (q) { return q.toString(); }).join('\n'));
+    }
+    queue = [];
+  }
+  addEventListener('pagehide', flush);
+
+  function send(en, params) {
+    var q = new URLSearchParams({ en: en, _s: String(++seq) });
+    Object.keys(params || {}).forEach(function (k) {
+      if (params[k] !== undefined && params[k] !== null) q.set(k, params[k]);
+    });
+    if (!queue.length) setTimeout(flush, 0);
+    queue.push(q);
+  }
+
+  // GA4 item strings: pr1=idSKU~nmName~pr455.00~qt1, one per product
+  function items(d, params) {
+    (d.product_sku || []).forEach(function (sku, i) {
+      params['pr' + (i + 1)] = ['id' + sku, 'nm' + ((d.product_name || [])[i] || ''),
+        'pr' + ((d.product_price || [])[i] || ''), 'qt' + ((d.product_quantity || [])[i] || '')].join('~');
+    });
+    return params;
+  }
+
+  function track(d) {
+    if (d.tealium_event === 'cart_add') {
+      send('add_to_cart', {
+        'ep.item_id': first(d.product_sku),
+        'epn.value': first(d.product_price),
+        cu: d.order_currency || 'USD'
+      });
+    } else if (d.tealium_event === 'purchase') {
+      send('purchase', items(d, {
+        'ep.transaction_id': d.order_id,
+        'ep.value': d.order_total,
+        'ep.tax': d.order_tax,
+        'ep.shipping': d.shipping,
+        'ep.item_id': first(d.product_sku),
+        // Mirrors the exam profile's tag config, which sends quantity as item_name
+        'ep.item_name': first(d.product_quantity),
+        cu: d.order_currency
+      }));
+    }
+  }
+
+  window.utag = {
+    data: data,
+    link: function (d) { track(d); },
+    view: function (d) { send('page_view'); track(d); }
+  };
+  window.utag.view(data);
+})();
+"""
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script>var utag_data = {utag_data};</script>
+<script src="/utag.js" async></script>
+<style>
+  .hidden {{ display: none; }}
+  #__tealiumGDPRecModal {{ position: fixed; inset: 0; background: rgba(0,0,0,.5); }}
+  #__tealiumGDPRecModal .consent {{ background: #fff; margin: 10% auto; width: 320px; padding: 16px; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+CONSENT_BANNER = """
+<div id="__tealiumGDPRecModal">
+  <div class="consent">
+    <label><input type="radio" name="consent" value="optin"> Opt in</label>
+    <label><input type="radio" name="consent" value="optout"> Opt out</label>
+    <button id="consent_prompt_submit" onclick="
+      var v = document.querySelector('input[name=consent]:checked');
+      document.cookie = 'CONSENTMGR=consent:' + (v && v.value === 'optin') + '; path=/; max-age=31536000';
+      document.getElementById('__tealiumGDPRecModal').remove();">Submit</button>
+  </div>
+</div>
+"""
+
+TRAINING_BODY = """
+<div class="modal-content">
+  <h2>Tealium Education Configuration</h2>
+  <input id="tu-form-account" value="">
+  <input id="tu-form-profile" value="">
+  <select id="tu-form-env"><option value="prod" selected>prod</option></select>
+  <button id="add_cookies" onclick="
+    document.cookie = 'utag_env_account=' + document.getElementById('tu-form-account').value + '; path=/';
+    document.cookie = 'utag_env_profile=' + document.getElementById('tu-form-profile').value + '; path=/';">Save changes</button>
+</div>
+"""
+
+HOME_BODY = """
+{consent}
+<h1>Local Store</h1>
+<ul class="products-grid">
+  <li><a href="{url}">{name}</a></li>
+</ul>
+"""
+
+PRODUCT_BODY = """
+<h1>{name}</h1>
+<ul id="configurable_swatch_color">
+  <li><a id="swatch22" href="javascript:void(0)" onclick="this.classList.add('selected')">White</a></li>
+</ul>
+<ul id="configurable_swatch_size">
+  <li><a id="swatch81" href="javascript:void(0)" onclick="this.classList.add('selected')">XS</a></li>
+</ul>
+<div class="add-to-cart-buttons">
+  <button type="button" class="button btn-cart" onclick="
+    utag.link({{tealium_event: 'cart_add', product_sku: ['{sku}'], product_price: ['{price}'],
+               product_quantity: ['1'], order_currency: '{currency}'}});
+    location.href = '/checkout/cart/add?sku={sku}&qty=1';">Add to Cart</button>
+</div>
+"""
+
+CART_BODY = """
+<h1>Shopping Cart</h1>
+<table id="shopping-cart-table"><tr><td>{sku}</td><td>{qty}</td><td>{price}</td></tr></table>
+<form id="shipping-zip-form" action="/checkout/cart/estimatePost" method="get">
+  <select id="country" name="country_id" onchange="
+    document.getElementById('region').style.display = this.value === 'IN' ? 'block' : 'none';">
+    <option value="US">United States</option>
+    <option value="IN">India</option>
+  </select>
+  <input id="region" name="region" class="hidden">
+  <input id="postcode" name="estimate_postcode">
+  <button type="button" onclick="coShippingMethodForm.submit()">Estimate</button>
+</form>
+<script>var coShippingMethodForm = document.getElementById('shipping-zip-form');</script>
+{rates}
+<button type="button" class="button btn-proceed-checkout" onclick="location.href='/checkout/onepage/'">Proceed to Checkout</button>
+"""
+
+CART_RATES = """
+<form id="co-shipping-method-form" action="/checkout/cart/estimateUpdatePost" method="get">
+  <input type="radio" name="estimate_method" id="s_method_freeshipping_freeshipping" value="freeshipping_freeshipping">
+  <label for="s_method_freeshipping_freeshipping">Free Shipping $0.00</label>
+  <button type="submit" name="do" value="Update Total">Update Total</button>
+</form>
+"""
+
+CHECKOUT_BODY = """
+<h1>Checkout</h1>
+<script>
+  function showStep(id) {{ document.getElementById(id).classList.remove('hidden'); }}
+  var review = {{ save: function () {{ location.href = '/checkout/onepage/saveOrder'; }} }};
+</script>
+<section id="checkout-step-login">
+  <input type="radio" id="login:guest" name="checkout_method" value="guest">
+  <button type="button" id="onepage-guest-register-button" onclick="showStep('checkout-step-billing')">Continue</button>
+</section>
+<section id="checkout-step-billing" class="hidden">
+  <input id="billing:firstname"><input id="billing:lastname"><input id="billing:email">
+  <input id="billing:street1"><input id="billing:city"><input id="billing:postcode">
+  <input id="billing:telephone">
+  <select id="billing:country_id"><option value="US">United States</option><option value="IN">India</option></select>
+  <input id="billing:region">
+  <div id="billing-buttons-container"><button type="button" class="button" onclick="showStep('checkout-step-shipping')">Continue</button></div>
+</section>
+<section id="checkout-step-shipping" class="hidden">
+  <input type="checkbox" id="shipping:same_as_billing">
+  <div id="shipping-buttons-container"><button type="button" class="button" onclick="showStep('checkout-step-shipping_method')">Continue</button></div>
+</section>
+<section id="checkout-step-shipping_method" class="hidden">
+  <input type="radio" name="shipping_method" id="s_method_freeshipping" value="freeshipping_freeshipping">
+  <div id="shipping-method-buttons-container"><button type="button" class="button" onclick="showStep('checkout-step-payment')">Continue</button></div>
+</section>
+<section id="checkout-step-payment" class="hidden">
+  <div id="payment-buttons-container"><button type="button" class="button" onclick="showStep('checkout-step-review')">Continue</button></div>
+</section>
+<section id="checkout-step-review" class="hidden">
+  <button type="button" class="button btn-checkout" onclick="review.save();">Place Order</button>
+</section>
+"""
+
+SUCCESS_BODY = """
+<h1>Your order has been received.</h1>
+<p>Your order # is: <span class="order-id">{order_id}</span>.</p>
+"""
+
+class LocalSite:
+    """Shared state of the stand-in site: order counter and collector stats."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_order = 100000001
+        self.hits = 0
+        self.hits_by_event = {}
+        self.collector_bytes = 0
+
+    def new_order_id(self):
+        with self.lock:
+            order_id = str(self.next_order)
+            self.next_order += 1
+        return order_id
+
+    def record_hits(self, query, body):
+        # One event in the query string, or one per line of a batched POST body
+        lines = [line for line in body.split("\n") if line] if body else [""]
+        shared = parse_qs(query)
+        with self.lock:
+            self.collector_bytes += len(query) + len(body)
+            for line in lines:
+                event_params = parse_qs(line)
+                en = (event_params.get('en') or shared.get('en') or ['(none)'])[0]
+                self.hits += 1
+                self.hits_by_event[en] = self.hits_by_event.get(en, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'hits_by_event': dict(self.hits_by_event),
+                'collector_bytes': self.collector_bytes,
+                'orders': self.next_order - 100000001
+            }
+
+def _make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        # ----- helpers -----
+
+        def cookies(self):
+            jar = SimpleCookie(self.headers.get('Cookie', ''))
+            return {k: unquote(m.value) for k, m in jar.items()}
+
+        def send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            for name, value in (headers or []):
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def redirect(self, location, headers=None):
+            self.send(302, headers=[("Location", location)] + (headers or []))
+
+        def page(self, title, body, utag_data):
+            self.send(200, PAGE.format(title=title, body=body, utag_data=json.dumps(utag_data)))
+
+        def cart(self):
+            sku, _, qty = self.cookies().get('avp_cart', '').partition(':')
+            return (sku, qty) if sku else (None, None)
+
+        def base_utag(self, page_type):
+            return {'page_type': page_type, 'site_region': 'en_us', 'site_currency': CURRENCY}
+
+        # ----- routes -----
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_POST(self):
+            parts = urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length).decode("utf-8", "replace") if length else ""
+            if parts.path == "/g/collect":
+                site.record_hits(parts.query, body)
+                self.send(204)
+            else:
+                self.send(404, "Not found")
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            path, query = parts.path, parse_qs(parts.query)
+
+            if path == "/g/collect":
+                site.record_hits(parts.query, "")
+                self.send(204)
+
+            elif path == "/collector/stats":
+                self.send(200, json.dumps(site.stats()), "application/json")
+
+            elif path == "/utag.js":
+                self.send(200, UTAG_JS, "application/javascript")
+
+            elif path == "/training":
+                self.page("Tealium Training", TRAINING_BODY, self.base_utag('training'))
+
+            elif path == "/":
+                consent = "" if 'CONSENTMGR' in self.cookies() else CONSENT_BANNER
+                body = HOME_BODY.format(consent=consent, url=PRODUCT['url'], name=PRODUCT['name'])
+                self.page("Home", body, self.base_utag('home'))
+
+            elif path == PRODUCT['url']:
+                utag_data = {**self.base_utag('product'), 'product_sku': [PRODUCT['sku']],
+                             'product_name': [PRODUCT['name']], 'product_price': [PRODUCT['price']]}
+                self.page(PRODUCT['name'], PRODUCT_BODY.format(currency=CURRENCY, **PRODUCT), utag_data)
+
+            elif path == "/checkout/cart/add":
+                sku = query.get('sku', [PRODUCT['sku']])[0]
+                qty = query.get('qty', ['1'])[0]
+                self.redirect("/checkout/cart/", [("Set-Cookie", f"avp_cart={quote(sku + ':' + qty)}; Path=/")])
+
+            elif path == "/checkout/cart/estimatePost":
+                self.redirect("/checkout/cart/?estimated=1")
+
+            elif path == "/checkout/cart/estimateUpdatePost":
+                self.redirect("/checkout/cart/")
+
+            elif path == "/checkout/cart/":
+                sku, qty = self.cart()
+                utag_data = {**self.base_utag('cart'), 'product_sku': [sku] if sku else [],
+                             'product_quantity': [qty] if qty else []}
+                rates = CART_RATES if 'estimated' in query else ""
+                body = CART_BODY.format(sku=sku or "", qty=qty or "", price=PRODUCT['price'], rates=rates)
+                self.page("Shopping Cart", body, utag_data)
+
+            elif path == "/checkout/onepage/":
+                self.page("Checkout", CHECKOUT_BODY.format(), self.base_utag('checkout'))
+
+            elif path == "/checkout/onepage/saveOrder":
+                sku, qty = self.cart()
+                order = f"{site.new_order_id()}:{sku or PRODUCT['sku']}:{qty or '1'}"
+                self.redirect("/checkout/onepage/success/", [
+                    ("Set-Cookie", f"avp_last_order={quote(order)}; Path=/"),
+                    ("Set-Cookie", "avp_cart=; Path=/; Max-Age=0")
+                ])
+
+            elif path == "/checkout/onepage/success/":
+                order_id, sku, qty = (self.cookies().get('avp_last_order', '::').split(':') + ['', ''])[:3]
+                total = f"{float(PRODUCT['price']) * int(qty or 1):.2f}"
+                utag_data = {
+                    **self.base_utag('checkout_success'),
+                    'tealium_event': 'purchase',
+                    'order_id': order_id,
+                    'order_total': total,
+                    'order_subtotal': total,
+                    'order_tax': '0.00',
+                    'order_currency': CURRENCY,
+                    'shipping': '0.00',
+                    'product_sku': [sku],
+                    'product_quantity': [qty],
+                    'product_name': [PRODUCT['name']],
+                    'product_price': [PRODUCT['price']]
+                }
+                self.page("Order Success", SUCCESS_BODY.format(order_id=order_id), utag_data)
+
+            else:
+                self.send(404, "Not found")
+
+    return Handler
+
+def start_local_site(port=0, host="127.0.0.1"):
+    """Start the site in a daemon thread; returns (server, base_url, site)."""
+    site = LocalSite()
+    server = ThreadingHTTPServer((host, port), _make_handler(site))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/"
+    log.info(f"🏪 Local stand-in site running at {base_url}")
+    return server, base_url, site
+
+def print_collector_stats(site):
+    stats = site.stats()
+    log.info("\n📮 Local GA4 collector:")
+    log.info(f"   Hits received : {stats['hits']} ({stats['collector_bytes'] / 1024:.1f} KB)")
+    log.info(f"   Orders placed : {stats['orders']}")
+    for en, count in sorted(stats['hits_by_event'].items()):
+        log.info(f"   {en:<14}: {count}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in e-commerce site and GA4 collector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server, base_url, site = start_local_site(args.port, args.host)
+    log.info("Press Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print_collector_stats(site)
+        server.shutdown()
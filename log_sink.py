@@ -0,0 +1,222 @@
+"""
+Structured, rate-limited log sink.
+
+Runtime modules log through the shared `log` sink instead of print():
+
+    log.info("✅ Cart loaded", source='flow')
+    log.debug(f"🎯 GA4 hit {url}", source='capture')
+
+Every call becomes a record {ts_ms, level, source, job, message} kept in a
+bounded ring buffer (RING_SIZE records, whatever the level), so the recent
+history of a failed job can be dumped even when it was not printed. Records
+at or above the sink's level are queued for a background writer thread that
+prints them and, with a log file, appends them as JSON lines; logging never
+waits for the terminal. A full queue drops records (counted) rather than
+blocking the caller.
+
+Chatty sources are rate limited per source with a token bucket
+(RATE_LIMITS: messages per second, burst); what a source logs beyond its
+rate is kept in the ring but not written, and the count is reported when it
+writes again. The job a record belongs to comes from the `current_job`
+context variable, which the engine sets for each flow (Playwright callbacks
+run outside the flow's task, so the event buffer and console recorder set
+it themselves).
+
+The default level is INFO; core.py --debug switches on DEBUG output
+(per-hit, per-change and browser console lines).
+"""
+
+import atexit
+import contextvars
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+RING_SIZE = 10000
+QUEUE_SIZE = 10000
+
+# source: (messages per second, burst)
+RATE_LIMITS = {
+    'console': (10, 50),
+    'capture': (20, 100),
+    'datalayer': (20, 100),
+    'resource_timing': (20, 100)
+}
+
+current_job = contextvars.ContextVar('current_job', default=None)
+
+class LogSink:
+    """Ring buffer of log records plus a background writer for the ones that pass level and rate limits."""
+
+    def __init__(self, level=INFO, rate_limits=None, stream=None):
+        self.level = level
+        self.rate_limits = dict(RATE_LIMITS if rate_limits is None else rate_limits)
+        self.stream = stream
+        self.path = None
+        self.ring = deque(maxlen=RING_SIZE)
+        self.stats = {'written': 0, 'dropped': 0, 'suppressed': Counter()}
+        self._buckets = {}
+        self._pending_suppressed = Counter()
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def configure(self, level=None, path=None, rate_limits=None):
+        """Change the output level, add a JSONL log file, or replace the rate limits."""
+        if level is not None:
+            self.level = level
+        if path is not None:
+            self.path = str(path)
+        if rate_limits is not None:
+            self.rate_limits = dict(rate_limits)
+            self._buckets.clear()
+
+    def _allow(self, source, now):
+        limit = self.rate_limits.get(source)
+        if limit is None:
+            return True
+        rate, burst = limit
+        tokens, last = self._buckets.get(source, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        allowed = tokens >= 1
+        self._buckets[source] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    def log(self, level, message, source='flow', **fields):
+        """Record one message; returns the record."""
+        record = {'ts_ms': time.time() * 1000, 'level': level, 'source': source,
+                  'job': current_job.get(), 'message': message, **fields}
+        self.ring.append(record)
+        if level < self.level:
+            return record
+        if not self._allow(source, time.monotonic()):
+            self.stats['suppressed'][source] += 1
+            self._pending_suppressed[source] += 1
+            return record
+        if self._pending_suppressed[source]:
+            record['suppressed'] = self._pending_suppressed.pop(source)
+        self._start_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats['dropped'] += 1
+        return record
+
+    def debug(self, message, source='flow', **fields):
+        return self.log(DEBUG, message, source, **fields)
+
+    def info(self, message, source='flow', **fields):
+        return self.log(INFO, message, source, **fields)
+
+    def warning(self, message, source='flow', **fields):
+        return self.log(WARNING, message, source, **fields)
+
+    def error(self, message, source='flow', **fields):
+        return self.log(ERROR, message, source, **fields)
+
+    def _start_writer(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="log-sink", daemon=True)
+                    self._writer.start()
+
+    def _format(self, record):
+        message = record['message']
+        if record.get('suppressed'):
+            message = (f"🔇 {record['source']}: {record['suppressed']} message(s) over the rate limit "
+                       f"were not shown\n{message}")
+        if self.level <= DEBUG:
+            clock = datetime.fromtimestamp(record['ts_ms'] / 1000).strftime("%H:%M:%S.%f")[:-3]
+            job = f" [{record['job']}]" if record['job'] else ""
+            message = f"{clock} {LEVEL_NAMES.get(record['level'], record['level']):<7} {record['source']}{job}: {message}"
+        return message
+
+    def _write_loop(self):
+        log_file = None
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    break
+                stream = self.stream or sys.stdout
+                stream.write(self._format(record) + "\n")
+                stream.flush()
+                if self.path:
+                    if log_file is None or log_file.name != self.path:
+                        log_file = open(self.path, "a", encoding="utf-8")
+                    log_file.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+                    log_file.flush()
+                self.stats['written'] += 1
+            finally:
+                self._queue.task_done()
+        if log_file is not None:
+            log_file.close()
+
+    def flush(self):
+        """Wait until every queued record has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def recent(self, job=None, source=None, limit=None):
+        """Records still in the ring, oldest first, optionally of one job or source."""
+        records = [r for r in self.ring
+                   if (job is None or r['job'] == job) and (source is None or r['source'] == source)]
+        return records[-limit:] if limit else records
+
+    def dump(self, path, job=None):
+        """Write the ring's records (of `job` only, if given) to `path` as JSON lines."""
+        records = self.recent(job=job)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        return len(records)
+
+    def print_summary(self):
+        suppressed = self.stats['suppressed']
+        if not suppressed and not self.stats['dropped']:
+            return
+        sources = ", ".join(f"{source}={n}" for source, n in suppressed.most_common())
+        self.info(f"🔇 Log sink: {sum(suppressed.values())} message(s) rate limited ({sources or 'none'}), "
+                  f"{self.stats['dropped']} dropped on a full queue")
+
+def console_recorder(captured_data, page):
+    """
+    page.on("console") handler recording each browser console message, with
+    its timestamp and page, in captured_data['console_messages'] (to be
+    correlated with hits by ts_ms); the message is logged at DEBUG level
+    (WARNING for console errors).
+    """
+    messages = captured_data.setdefault('console_messages', [])
+    job = current_job.get()
+
+    def handle_console_msg(msg):
+        ts_ms = time.time() * 1000
+        location = msg.location or {}
+        messages.append({
+            'ts_ms': ts_ms,
+            'type': msg.type,
+            'text': msg.text,
+            'page': page.url,
+            'source_url': location.get('url'),
+            'line': location.get('lineNumber')
+        })
+        level = WARNING if msg.type == 'error' else DEBUG
+        log.log(level, f"🖥️ Console [{msg.type}]: {msg.text}", source='console', job=job)
+    return handle_console_msg
+
+log = LogSink()
+atexit.register(log.close)
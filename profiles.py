@@ -0,0 +1,110 @@
+"""
+Execution profiles.
+
+A profile bundles everything that changes between an interactive debugging
+session and an unattended run: browser launch options, the Playwright
+Inspector, the blocking page.pause() after setup, video recording, which
+trace chunks are kept (step_tracing.py) and the default concurrency. Select one with `--profile` on core.py or
+sharded_runner.py.
+
+Wall time of every run is appended to runtime_data/profile_timings.json so
+the profiles can be compared against each other.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from log_sink import log
+
+PROFILES = {
+    # Headed, slowed down, with the Inspector and a pause after setup
+    'debug': {
+        'description': "Headed browser, Playwright Inspector, slow_mo and page.pause()",
+        'launch_options': {'headless': False, 'slow_mo': 1000},
+        'inspector': True,
+        'pause': True,
+        'record_video': True,
+        'trace_policy': 'always',
+        'concurrency': 1
+    },
+    # Unattended: headless, full speed, nothing waits for a human
+    'ci': {
+        'description': "Headless, no slow_mo, no Inspector, no pause",
+        'launch_options': {'headless': True, 'slow_mo': 0},
+        'inspector': False,
+        'pause': False,
+        'record_video': True,
+        'trace_policy': 'last:3',
+        'concurrency': 4
+    },
+    # Long-running monitoring: like ci, without video and with more contexts
+    'soak': {
+        'description': "Headless, no video, high concurrency for long monitoring runs",
+        'launch_options': {'headless': True, 'slow_mo': 0},
+        'inspector': False,
+        'pause': False,
+        'record_video': False,
+        'trace_policy': 'failures',
+        'concurrency': 8
+    }
+}
+
+DEFAULT_PROFILE = 'debug'
+
+TIMINGS_FILE = Path("runtime_data/profile_timings.json")
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown execution profile '{name}'. Available: {', '.join(sorted(PROFILES))}")
+    return {'name': name, **PROFILES[name]}
+
+def apply_profile(profile):
+    """Switch the Playwright Inspector on or off for this process."""
+    if profile['inspector']:
+        os.environ["PWDEBUG"] = "1"
+    else:
+        os.environ.pop("PWDEBUG", None)
+
+def context_options_for(profile, base_options):
+    """Base context options adjusted for the profile (e.g. video off)."""
+    options = dict(base_options)
+    if not profile['record_video']:
+        options.pop('record_video_dir', None)
+        options.pop('record_video_size', None)
+    return options
+
+def record_profile_timing(profile, wall_time, jobs, failed_jobs=0):
+    """Append this run's wall time and compare it with the other profiles."""
+    timings = []
+    if TIMINGS_FILE.exists():
+        try:
+            with open(TIMINGS_FILE, "r", encoding="utf-8") as f:
+                timings = json.load(f)
+        except Exception as e:
+            log.warning(f"⚠️ Could not read {TIMINGS_FILE}: {str(e)}")
+
+    timings.append({
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'profile': profile['name'],
+        'wall_time': round(wall_time, 3),
+        'jobs': jobs,
+        'failed_jobs': failed_jobs,
+        'seconds_per_job': round(wall_time / jobs, 3) if jobs else None
+    })
+
+    TIMINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(TIMINGS_FILE, 'w') as f:
+        json.dump(timings, f, indent=2)
+
+    log.info("\n⏱️ Wall time per profile (latest run of each):")
+    latest = {}
+    for entry in timings:
+        latest[entry['profile']] = entry
+    for name, entry in sorted(latest.items()):
+        marker = "  <- this run" if name == profile['name'] else ""
+        log.info(f"   {name:<8}: {entry['wall_time']:>8.1f}s total, "
+                 f"{entry['seconds_per_job'] or 0:>7.1f}s/job over {entry['jobs']} job(s){marker}")
+
+    return timings
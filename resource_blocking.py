@@ -0,0 +1,125 @@
+"""
+Route-level resource blocking.
+
+Installs one context.route() handler that aborts images, media, fonts and
+requests to a deny-list of unrelated third-party domains. Tag-management
+and analytics domains are always allowed, whatever their resource type,
+so pixels and beacons still fire.
+
+Blocking is opt-in per flow (`--block-resources FLOW` on core.py) because
+some tags only fire once an image has loaded.
+
+Aborted requests never download anything, so the bytes saved are estimated
+from typical transfer sizes per resource type (override with
+'estimated_bytes' in the policy).
+"""
+
+import json
+from collections import Counter
+from urllib.parse import urlsplit
+
+from log_sink import log
+
+DEFAULT_POLICY = {
+    'resource_types': ['image', 'media', 'font'],
+    'deny_domains': [
+        'fonts.googleapis.com',
+        'fonts.gstatic.com',
+        'youtube.com',
+        'ytimg.com',
+        'vimeo.com',
+        'hotjar.com',
+        'livechatinc.com',
+        'zopim.com'
+    ],
+    # Never blocked, even for image/media/font requests
+    'allow_domains': [
+        'tealiumiq.com',
+        'tiqcdn.com',
+        'tealium.com',
+        'google-analytics.com',
+        'analytics.google.com',
+        'googletagmanager.com',
+        'doubleclick.net',
+        'adservice.google.com',
+        'omtrdc.net',
+        '2o7.net',
+        'facebook.com',
+        'bat.bing.com',
+        'pinterest.com',
+        'snapchat.com',
+        'tiktok.com'
+    ],
+    'estimated_bytes': {
+        'image': 45000,
+        'media': 500000,
+        'font': 35000,
+        'script': 30000,
+        'stylesheet': 15000,
+        'other': 5000
+    }
+}
+
+def load_policy(path=None):
+    """DEFAULT_POLICY, with keys overridden from a JSON file if given."""
+    policy = json.loads(json.dumps(DEFAULT_POLICY))
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(policy.get(key), dict):
+                policy[key].update(value)
+            else:
+                policy[key] = value
+    return policy
+
+def _matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+async def install_resource_blocking(context, captured_data, policy=None):
+    """Context hook for engine jobs: abort blocked resources, record what was saved."""
+    policy = policy or DEFAULT_POLICY
+    blocked_types = set(policy['resource_types'])
+    deny_domains = tuple(policy['deny_domains'])
+    allow_domains = tuple(policy['allow_domains'])
+    estimated_bytes = policy['estimated_bytes']
+
+    stats = {
+        'allowed_requests': 0,
+        'blocked_requests': 0,
+        'estimated_bytes_saved': 0,
+        'by_type': Counter(),
+        'by_domain': Counter()
+    }
+    captured_data['blocking'] = stats
+
+    async def handle_route(route):
+        request = route.request
+        host = urlsplit(request.url).hostname or ""
+
+        if not _matches(host, allow_domains):
+            resource_type = request.resource_type
+            if resource_type in blocked_types or _matches(host, deny_domains):
+                stats['blocked_requests'] += 1
+                stats['by_type'][resource_type] += 1
+                stats['by_domain'][host] += 1
+                stats['estimated_bytes_saved'] += estimated_bytes.get(resource_type, estimated_bytes['other'])
+                await route.abort("blockedbyclient")
+                return
+
+        stats['allowed_requests'] += 1
+        # Let any other route (capture, HAR replay) handle the request
+        await route.fallback()
+
+    await context.route("**/*", handle_route)
+    log.info(f"🚫 Resource blocking enabled: {', '.join(sorted(blocked_types))} + {len(deny_domains)} denied domains")
+
+def print_blocking_summary(stats, job_id=""):
+    total = stats['blocked_requests'] + stats['allowed_requests']
+    prefix = f"[{job_id}] " if job_id else ""
+    log.info(f"\n🚫 {prefix}Resource blocking saved {stats['blocked_requests']}/{total} requests, "
+             f"~{stats['estimated_bytes_saved'] / 1024 / 1024:.1f} MB (estimated)")
+    for resource_type, count in stats['by_type'].most_common():
+        log.info(f"   {resource_type:<12}: {count}")
+    for host, count in stats['by_domain'].most_common(5):
+        log.info(f"   {host:<40}: {count}")
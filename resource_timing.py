@@ -0,0 +1,128 @@
+"""
+Incremental resource-timing harvest.
+
+A context init script installs one PerformanceObserver per document at
+document start. It raises the resource-timing buffer (the browser default of
+250 entries silently drops the rest on heavy pages) and clears it whenever
+it fills, since every entry has already been streamed. Each new entry is
+recorded into the in-page event buffer (event_buffer.py), so Python
+receives it exactly once, for every page of the journey, instead of
+re-reading the whole timeline with getEntriesByType().
+
+Python handles each entry in one pass: query parameters, vendor category
+(tag_classifier.py) and, for GA4 hits whose parameters are in the URL, the
+hit itself (stored through capture.store_ga4_request, so a hit the other
+capture paths already stored is not stored again). A malformed entry is
+skipped on its own, without losing the rest of its flushed batch.
+
+A long journey streams hundreds of thousands of entries, so each is kept as a
+ResourceEntry (__slots__, no per-entry dict) whose URL, initiator and page
+strings are interned, so the assets every page reloads are stored once;
+entries without a query string have params None rather than an empty dict.
+"""
+
+import sys
+
+import pandas as pd
+
+from ga4_decoder import parse_query
+from capture import store_ga4_request
+from tag_classifier import load_classifier
+from log_sink import log
+
+RESOURCE_BUFFER_SIZE = 10000
+
+RESOURCE_OBSERVER_JS = r"""
+(() => {
+  if (window.__avpResourceObserver || !window.__avpRecord || typeof PerformanceObserver === 'undefined') return;
+  window.__avpResourceObserver = true;
+
+  try { performance.setResourceTimingBufferSize(%(buffer_size)d); } catch (e) {}
+  // Entries are streamed as they arrive, so a full buffer can simply be emptied
+  performance.addEventListener && performance.addEventListener('resourcetimingbufferfull', () => performance.clearResourceTimings());
+
+  const origin = performance.timeOrigin;
+  new PerformanceObserver((list) => {
+    for (const e of list.getEntries()) {
+      window.__avpRecord('resource', {
+        name: e.name,
+        initiator: e.initiatorType,
+        duration: e.duration,
+        size: e.transferSize || 0,
+        start_ms: origin + e.startTime,
+        page: location.href
+      });
+    }
+  }).observe({ type: 'resource', buffered: true });
+})();
+"""
+
+class ResourceEntry:
+    """One resource-timing entry of the journey."""
+
+    __slots__ = ('name', 'type', 'duration', 'size', 'category', 'params', 'start_ms', 'page')
+
+    def __init__(self, name, type, duration, size, category, params, start_ms, page):
+        self.name = name
+        self.type = type
+        self.duration = duration
+        self.size = size
+        self.category = category
+        self.params = params
+        self.start_ms = start_ms
+        self.page = page
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, fields):
+        return cls(**fields)
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def resource_frame(entries):
+    """Resource entries as a DataFrame, one column per field."""
+    return pd.DataFrame([[getattr(entry, field) for field in ResourceEntry.__slots__] for entry in entries],
+                        columns=list(ResourceEntry.__slots__))
+
+async def install_resource_observer(context, buffer, captured_data, on_ga4_hit=None, classifier=None):
+    """
+    Stream every resource-timing entry of `context` into
+    captured_data['network_calls'] as ResourceEntry records
+    (install_event_buffer() first), each categorized by `classifier` (default rules unless given).
+    """
+    network_calls = captured_data.setdefault('network_calls', [])
+    classify = (classifier or load_classifier()).classify
+
+    def handle_resource(event, source):
+        try:
+            url = event['name']
+            params = parse_query(url.split('?', 1)[1]) if '?' in url else None
+            category = classify(url)
+            # The full page URL, as GA4 hits record it
+            page_url = event.get('page')
+            network_calls.append(ResourceEntry(
+                _intern(url),
+                _intern(event.get('initiator')),
+                round(event.get('duration') or 0, 2),
+                event.get('size', 0),
+                category,
+                params,
+                event.get('start_ms'),
+                _intern(page_url)
+            ))
+        except Exception as e:
+            log.debug(f"⚠️ Skipped malformed resource-timing entry: {str(e)}", source='resource_timing')
+            return
+        # POST bodies are not in resource timing: only hits carried in the URL are complete
+        if category == 'GA4' and params and 'en' in params:
+            try:
+                store_ga4_request(captured_data, url, None, 'GET', 'performance', page_url,
+                                  event.get('start_ms'), on_ga4_hit)
+            except Exception as e:
+                log.error(f"⚠️ Error decoding GA4 resource entry: {str(e)}", source='resource_timing')
+
+    buffer.on('resource', handle_resource)
+    await context.add_init_script(RESOURCE_OBSERVER_JS % {'buffer_size': RESOURCE_BUFFER_SIZE})
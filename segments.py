@@ -0,0 +1,165 @@
+"""
+Append-only capture segments.
+
+A long journey cannot keep everything it captures in memory. Each capture
+stream keeps only its newest records in memory; once spill_rows of them are
+waiting they are written, one compact JSON line each, to the stream's
+current segment file and dropped from memory. Segments are rotated at
+SEGMENT_BYTES and never rewritten, so whatever was spilled survives a crash
+of the run.
+
+Readers memory-map the segments. Iterating a stream reads the spilled
+records back in order and then the in-memory tail; a sparse offset index
+(one entry every INDEX_EVERY records) gives random access without keeping
+one offset per record in memory.
+"""
+
+import json
+import mmap
+import os
+from array import array
+from itertools import islice
+from pathlib import Path
+
+from log_sink import log
+
+SPILL_ROWS = 20000
+SEGMENT_BYTES = 64 * 2**20
+INDEX_EVERY = 64
+
+class SegmentLog:
+    """The spilled records of one capture stream, in append-only JSONL segment files."""
+
+    def __init__(self, directory, name, segment_bytes=SEGMENT_BYTES):
+        self.directory = Path(directory)
+        self.name = name
+        self.segment_bytes = segment_bytes
+        self.paths = []
+        self.count = 0
+        self.bytes = 0
+        self._segment_size = 0
+        # Segment number and byte offset of every INDEX_EVERY-th record
+        self._index_segment = array('I')
+        self._index_offset = array('Q')
+
+    def __len__(self):
+        return self.count
+
+    def write(self, records):
+        """Append JSON-serializable `records` to the segments."""
+        f = None
+        try:
+            for record in records:
+                line = (json.dumps(record, separators=(',', ':'), default=str) + "\n").encode("utf-8")
+                if not self.paths or (self._segment_size and self._segment_size + len(line) > self.segment_bytes):
+                    if f is not None:
+                        f.close()
+                        f = None
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    self.paths.append(self.directory / f"{self.name}_{len(self.paths):05d}.jsonl")
+                    self._segment_size = 0
+                if f is None:
+                    f = open(self.paths[-1], "ab")
+                if self.count % INDEX_EVERY == 0:
+                    self._index_segment.append(len(self.paths) - 1)
+                    self._index_offset.append(self._segment_size)
+                f.write(line)
+                self._segment_size += len(line)
+                self.bytes += len(line)
+                self.count += 1
+        finally:
+            if f is not None:
+                f.close()
+
+    @staticmethod
+    def _lines(path, offset):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                segment.seek(offset)
+                yield from iter(segment.readline, b"")
+
+    def records(self, start=0):
+        """Spilled records from number `start` on, in order."""
+        if start >= self.count:
+            return
+        slot = start // INDEX_EVERY
+        first, offset = self._index_segment[slot], self._index_offset[slot]
+        skip = start - slot * INDEX_EVERY
+        for number in range(first, len(self.paths)):
+            for line in self._lines(self.paths[number], offset if number == first else 0):
+                if skip:
+                    skip -= 1
+                    continue
+                yield json.loads(line)
+
+class SpillList:
+    """
+    Append-only, list-like sequence whose older records are spilled to a
+    SegmentLog (kept entirely in memory when `log` is None). encode/decode
+    convert records to and from their JSON form.
+    """
+
+    def __init__(self, log=None, spill_rows=SPILL_ROWS, encode=None, decode=None):
+        self.log = log
+        self.spill_rows = spill_rows
+        self.encode = encode
+        self.decode = decode
+        self.tail = []
+
+    @property
+    def spilled(self):
+        return self.log.count if self.log is not None else 0
+
+    def __len__(self):
+        return self.spilled + len(self.tail)
+
+    def append(self, record):
+        self.tail.append(record)
+        if self.log is not None and self.spill_rows and len(self.tail) >= self.spill_rows:
+            self.spill()
+
+    def spill(self):
+        """Write the in-memory tail to the segments."""
+        if self.log is None or not self.tail:
+            return
+        self.log.write(map(self.encode, self.tail) if self.encode else self.tail)
+        self.tail = []
+
+    def iter_from(self, start=0):
+        spilled = self.spilled
+        if start < spilled:
+            decode = self.decode
+            for record in self.log.records(start):
+                yield decode(record) if decode else record
+            start = spilled
+        yield from self.tail[start - spilled:]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return list(self)[i]
+            return list(islice(self.iter_from(start), max(0, stop - start)))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        spilled = self.spilled
+        if i >= spilled:
+            return self.tail[i - spilled]
+        return next(self.iter_from(i))
+
+def print_spill_summary(logs, job_id):
+    """One line per run listing what each stream spilled to disk, if anything."""
+    spilled = {name: segment_log for name, segment_log in logs.items() if segment_log.count}
+    if not spilled:
+        return
+    streams = ", ".join(f"{name}={segment_log.count}" for name, segment_log in spilled.items())
+    total = sum(segment_log.bytes for segment_log in spilled.values())
+    directory = next(iter(spilled.values())).directory
+    log.info(f"💾 [{job_id}] Spilled to segments ({streams}; {total / 2**20:.1f} MiB): {directory}")
@@ -0,0 +1,252 @@
+"""
+Process-pool sharded runner.
+
+Expands the flow x Tealium profile x viewport matrix into cells, shards the
+cells across worker processes and runs each shard with the async engine in
+the worker's own browser. Worker results are merged into one run and
+exported exactly like a single core.py run, plus a per-worker throughput
+report.
+
+Usage:
+    python sharded_runner.py --profile ci --workers 16 --concurrency 2 \
+        --tealium-profile exam253 --viewport 1366x768 --viewport 390x844
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import core
+from engine import make_job, run_flows_sync
+from segments import SPILL_ROWS
+from step_tracing import parse_trace_policy
+from profiles import PROFILES, get_profile, apply_profile, context_options_for, record_profile_timing
+from state_cache import load_snapshot
+from resource_blocking import load_policy, install_resource_blocking
+from har_mode import har_job_options
+from local_site import start_local_site, print_collector_stats
+from log_sink import log
+
+def parse_viewport(value):
+    """'1366x768' -> {'width': 1366, 'height': 768}"""
+    width, height = value.lower().split("x")
+    return {'width': int(width), 'height': int(height)}
+
+def build_matrix(flow_names, profiles, viewports):
+    """Every flow x profile x viewport combination, as plain picklable dicts."""
+    return [
+        {'flow': flow_name, 'profile': profile, 'viewport': viewport}
+        for flow_name in flow_names
+        for profile in profiles
+        for viewport in viewports
+    ]
+
+def shard_matrix(cells, workers):
+    """Round-robin the cells over at most `workers` shards."""
+    shard_count = max(1, min(workers, len(cells)))
+    shards = [[] for _ in range(shard_count)]
+    for i, cell in enumerate(cells):
+        shards[i % shard_count].append(cell)
+    return shards
+
+def _cell_name(cell):
+    viewport = cell['viewport']
+    return f"{cell['flow']}_{cell['profile']}_{viewport['width']}x{viewport['height']}"
+
+def run_shard(worker_index, cells, concurrency, url, run_profile, blocked_flows=None, blocking_policy=None,
+              har_replay=False, tag_rules=(), spill_rows=SPILL_ROWS, trace_policy=None):
+    """Worker entry point: run one shard in this process's own browser."""
+    exec_profile = get_profile(run_profile)
+    apply_profile(exec_profile)
+    blocking_hook = partial(install_resource_blocking, policy=load_policy(blocking_policy))
+
+    jobs = []
+    for cell in cells:
+        # HARs are recorded per flow by core.py --har record, whatever the viewport
+        context_options, context_hooks = har_job_options('replay' if har_replay else None, cell['flow'])
+        context_options.update({
+            'viewport': cell['viewport'],
+            'record_video_size': cell['viewport']
+        })
+        if cell['flow'] in (blocked_flows or []):
+            context_hooks.append(blocking_hook)
+        # Snapshots are prepared by the parent process, one per Tealium profile
+        storage_state = load_snapshot(urlsplit(url).netloc, core.DEFAULT_ACCOUNT, cell['profile'],
+                                      core.DEFAULT_CONSENT)
+        if storage_state:
+            context_options['storage_state'] = storage_state
+        jobs.append(make_job(
+            core.FLOWS[cell['flow']],
+            name=_cell_name(cell),
+            context_options=context_options,
+            context_hooks=context_hooks,
+            url=url,
+            profile=cell['profile'],
+            from_snapshot=storage_state is not None,
+            pause=exec_profile['pause'],
+            tag_rules=tuple(tag_rules or ())
+        ))
+
+    started = time.perf_counter()
+    job_results = run_flows_sync(
+        jobs,
+        concurrency=concurrency,
+        launch_options=exec_profile['launch_options'],
+        context_options=context_options_for(exec_profile, core.CONTEXT_OPTIONS),
+        spill_rows=spill_rows,
+        trace_policy=trace_policy or exec_profile['trace_policy']
+    )
+    duration = time.perf_counter() - started
+
+    # Job ids are only unique within a worker, make them unique across the run
+    for job_result in job_results:
+        job_result['job_id'] = f"w{worker_index}_{job_result['job_id']}"
+        job_result['worker'] = worker_index
+
+    hits = sum(len(r['captured_data']['ga4_calls']) for r in job_results)
+    return {
+        'worker': worker_index,
+        'pid': os.getpid(),
+        'jobs': len(job_results),
+        'failed_jobs': sum(1 for r in job_results if r['error']),
+        'ga4_hits': hits,
+        'duration': duration,
+        'jobs_per_minute': len(job_results) / duration * 60 if duration else 0.0,
+        'hits_per_second': hits / duration if duration else 0.0,
+        'job_results': job_results
+    }
+
+def print_throughput(worker_reports, wall_time):
+    log.info("\n" + "="*80)
+    log.info("⚙️ Per-worker throughput")
+    log.info("="*80)
+    log.info(f"{'worker':<8}{'pid':<10}{'jobs':<8}{'failed':<8}{'hits':<8}{'time (s)':<12}{'jobs/min':<12}{'hits/s':<10}")
+    for report in worker_reports:
+        log.info(f"{report['worker']:<8}{report['pid']:<10}{report['jobs']:<8}{report['failed_jobs']:<8}"
+                 f"{report['ga4_hits']:<8}{report['duration']:<12.1f}{report['jobs_per_minute']:<12.2f}"
+                 f"{report['hits_per_second']:<10.2f}")
+
+    total_jobs = sum(r['jobs'] for r in worker_reports)
+    log.info("-"*80)
+    log.info(f"Total: {total_jobs} jobs on {len(worker_reports)} workers in {wall_time:.1f}s "
+             f"({total_jobs / wall_time * 60 if wall_time else 0:.2f} jobs/min)")
+    log.info("="*80)
+
+def run_sharded(flow_names=None, profiles=None, viewports=None, workers=None,
+                concurrency=1, url=core.DEFAULT_URL, run_profile='ci', blocked_flows=None,
+                blocking_policy=None, har_replay=False, tag_rules=(), spill_rows=SPILL_ROWS, trace_policy=None):
+    """
+    Run the full matrix across a process pool and merge the results.
+    trace_policy overrides the profile's (step_tracing.py).
+    """
+    exec_profile = get_profile(run_profile)
+    flow_names = flow_names or list(core.FLOWS)
+    profiles = profiles or [core.DEFAULT_PROFILE]
+    viewports = viewports or [core.CONTEXT_OPTIONS['viewport']]
+    workers = workers or os.cpu_count() or 1
+
+    cells = build_matrix(flow_names, profiles, viewports)
+    shards = shard_matrix(cells, workers)
+    log.info(f"🧩 {len(cells)} matrix cells sharded across {len(shards)} worker processes")
+
+    started = time.perf_counter()
+    for profile in profiles:
+        core.prepare_storage_state(exec_profile, url, profile=profile,
+                                   har_mode='replay' if har_replay else None)
+
+    # Spawn keeps every worker's Playwright driver independent of the parent
+    with ProcessPoolExecutor(max_workers=len(shards),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(run_shard, i, shard, concurrency, url, run_profile, blocked_flows, blocking_policy,
+                        har_replay, tag_rules=tag_rules, spill_rows=spill_rows, trace_policy=trace_policy)
+            for i, shard in enumerate(shards)
+        ]
+        worker_reports = [future.result() for future in futures]
+    wall_time = time.perf_counter() - started
+
+    # Merge every worker's results into one run
+    job_results = [r for report in worker_reports for r in report.pop('job_results')]
+    for job_result in job_results:
+        core.export_job_results(job_result)
+    core.export_dashboard_data(job_results)
+
+    print_throughput(worker_reports, wall_time)
+    record_profile_timing(exec_profile, wall_time, len(job_results),
+                          sum(1 for r in job_results if r['error']))
+
+    report_file = Path("runtime_data/shard_report.json")
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'profile': run_profile,
+            'wall_time': wall_time,
+            'cells': len(cells),
+            'workers': worker_reports
+        }, f, indent=2)
+    log.info(f"📁 Throughput report exported to: {report_file}")
+
+    return job_results, worker_reports
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded multi-process validation runner")
+    parser.add_argument("--flow", action="append", choices=sorted(core.FLOWS),
+                        help="Flow to run (repeatable, default: all flows)")
+    parser.add_argument("--profile", default='ci', choices=sorted(PROFILES),
+                        help="Execution profile (default: ci)")
+    parser.add_argument("--tealium-profile", action="append",
+                        help=f"Tealium profile (repeatable, default: {core.DEFAULT_PROFILE})")
+    parser.add_argument("--viewport", action="append", type=parse_viewport,
+                        help="Viewport as WIDTHxHEIGHT (repeatable, default: 1366x768)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Browser contexts open at once inside each worker")
+    parser.add_argument("--url", default=core.DEFAULT_URL,
+                        help="Start URL of the e-commerce site")
+    parser.add_argument("--block-resources", action="append", choices=sorted(core.FLOWS), metavar="FLOW",
+                        help="Abort images, media, fonts and denied domains in this flow (repeatable)")
+    parser.add_argument("--block-policy",
+                        help="JSON file overriding the default resource blocking policy")
+    parser.add_argument("--tag-rules", action="append", default=[], metavar="FILE",
+                        help="JSON rule file of extra tag vendors, checked before the defaults (repeatable)")
+    parser.add_argument("--local-site", action="store_true",
+                        help="Run against the bundled local stand-in site and GA4 collector (ignores --url)")
+    parser.add_argument("--har-replay", action="store_true",
+                        help="Serve pages from the HARs recorded by core.py --har record (offline)")
+    parser.add_argument("--spill-rows", type=int, default=SPILL_ROWS, metavar="N",
+                        help=f"Spill each capture stream to disk every N records (default: {SPILL_ROWS}, 0: never)")
+    parser.add_argument("--trace", metavar="POLICY",
+                        help="Trace chunks to keep: failures, last:N (N steps before a failure), always or off "
+                             "(default: from the profile)")
+    args = parser.parse_args(argv)
+    if args.trace:
+        try:
+            parse_trace_policy(args.trace)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Served from this process, shared by every worker
+    local_site = None
+    if args.local_site:
+        local_server, args.url, local_site = start_local_site()
+
+    run_sharded(args.flow, args.tealium_profile, args.viewport, args.workers, args.concurrency,
+                args.url, args.profile, args.block_resources, args.block_policy, args.har_replay,
+                tag_rules=args.tag_rules, spill_rows=args.spill_rows, trace_policy=args.trace)
+
+    if local_site:
+        print_collector_stats(local_site)
+        local_server.shutdown()
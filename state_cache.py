@@ -0,0 +1,98 @@
+"""
+Persisted storage-state snapshots.
+
+After the Tealium training modal and the consent banner have been handled
+once, the context storage_state (cookies + localStorage) is saved keyed by
+site, Tealium account, profile and consent choice. Later contexts start from that
+snapshot and skip both steps.
+
+A snapshot is ignored (and deleted) when one of the cookies the setup
+writes (the training account/profile cookies and CONSENTMGR) has expired,
+when it is older than MAX_AGE_HOURS, or when the site / account / profile /
+consent it was taken for no longer matches the file it is stored in. The
+other cookies (analytics, third parties) are short-lived and are left to
+the browser to drop or renew.
+"""
+
+import json
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+from log_sink import log
+
+STATE_DIR = Path("runtime_data/storage_state")
+MAX_AGE_HOURS = 12
+# Name prefixes of the cookies the training modal and the consent banner write
+SETUP_COOKIES = ('utag_env', 'CONSENTMGR')
+
+def _setup_cookies(state):
+    return [c for c in state.get('cookies', []) if c.get('name', '').startswith(SETUP_COOKIES)]
+
+def snapshot_path(site, account, profile, consent):
+    key = "_".join(re.sub(r"[^A-Za-z0-9.-]", "-", part) for part in (site, account, profile, consent))
+    return STATE_DIR / f"{key}.json"
+
+async def save_snapshot(context, site, account, profile, consent):
+    """Save the context's storage_state for this site/account/profile/consent."""
+    state = await context.storage_state()
+    expiries = [c['expires'] for c in _setup_cookies(state) if c.get('expires', -1) > 0]
+
+    path = snapshot_path(site, account, profile, consent)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'site': site,
+            'account': account,
+            'profile': profile,
+            'consent': consent,
+            'saved_at': time.time(),
+            'saved_at_readable': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'expires': min(expiries) if expiries else None,
+            'state': state
+        }, f, indent=2)
+    log.info(f"💾 Storage state saved to: {path}")
+    return state
+
+def _invalid_reason(snapshot, site, account, profile, consent):
+    stored_key = (snapshot.get('site'), snapshot.get('account'), snapshot.get('profile'), snapshot.get('consent'))
+    if stored_key != (site, account, profile, consent):
+        return "site/account/profile/consent changed"
+
+    now = time.time()
+    if now - snapshot.get('saved_at', 0) > MAX_AGE_HOURS * 3600:
+        return f"older than {MAX_AGE_HOURS}h"
+
+    for cookie in _setup_cookies(snapshot['state']):
+        expires = cookie.get('expires', -1)
+        if 0 < expires <= now:
+            return f"cookie {cookie['name']} expired"
+
+    return None
+
+def load_snapshot(site, account, profile, consent):
+    """Return a still-valid storage_state dict, or None (stale snapshots are deleted)."""
+    path = snapshot_path(site, account, profile, consent)
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except Exception as e:
+        log.warning(f"⚠️ Could not read storage state {path}: {str(e)}")
+        return None
+
+    reason = _invalid_reason(snapshot, site, account, profile, consent)
+    if reason:
+        log.info(f"♻️ Storage state {path.name} invalidated: {reason}")
+        invalidate_snapshot(site, account, profile, consent)
+        return None
+
+    log.info(f"✅ Using storage state from {snapshot['saved_at_readable']}: {path}")
+    return snapshot['state']
+
+def invalidate_snapshot(site, account, profile, consent):
+    # Sharded workers may invalidate the same snapshot at once
+    snapshot_path(site, account, profile, consent).unlink(missing_ok=True)
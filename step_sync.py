@@ -0,0 +1,224 @@
+"""
+Event-driven step synchronization.
+
+Each flow step states the condition it waits for (a GA4 hit, a utag.data
+key, a URL, a selector, a navigation) and returns as soon as that condition
+is met, within a hard deadline. Every wait is recorded in
+captured_data['step_timings'] together with the fixed sleep it replaced, so
+the time the old wait_for_timeout() calls wasted can be measured.
+
+GA4 hits and observed utag.data changes are pushed to Python, so waits on
+them resolve from the push itself instead of asking the page.
+
+Steps are also the boundaries of the job's trace chunks: with a StepTracer
+in captured_data['tracer'] (step_tracing.py), every recorded wait ends the
+current chunk, flagged as failing when the wait timed out.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import TimeoutError
+
+from log_sink import log
+
+DEFAULT_DEADLINE_MS = 10000
+
+class StepSync:
+    def __init__(self, page, captured_data, default_deadline_ms=DEFAULT_DEADLINE_MS):
+        self.page = page
+        self.captured_data = captured_data
+        self.default_deadline_ms = default_deadline_ms
+        self.timings = captured_data.setdefault('step_timings', [])
+        self.tracer = captured_data.get('tracer')
+        self._hit_waiters = []
+        self._utag_waiters = []
+
+    # ----- GA4 hits -----
+
+    def mark(self):
+        """Position in the GA4 hit list; pass as `since` to only match newer hits."""
+        return len(self.captured_data['ga4_calls'])
+
+    def notify_hit(self, hit):
+        """Called by the capture layer with {'row', 'params'} for every GA4 hit it stores."""
+        self._notify(self._hit_waiters, hit)
+
+    async def wait_for_ga4_event(self, event_name, since=0, step=None, replaced_ms=0,
+                                 deadline_ms=None, required=False):
+        """Wait for a GA4 hit with en=event_name captured at or after `since`."""
+        async def condition(deadline_ms):
+            if event_name in self.captured_data['ga4_calls'].column('en')[since:]:
+                return
+            await self._wait_for_push(self._hit_waiters, lambda hit: hit['params'].get('en') == event_name,
+                                      deadline_ms, f"GA4 hit en={event_name} not seen within {deadline_ms} ms")
+
+        return await self._timed(step or f"ga4:{event_name}", f"GA4 hit with en={event_name} seen",
+                                 condition, replaced_ms, deadline_ms, required)
+
+    # ----- Pushed data-layer state -----
+
+    def notify_utag(self, data):
+        """Called by the data-layer observers with the rebuilt utag.data after every accepted delta."""
+        self._notify(self._utag_waiters, data)
+
+    async def wait_for_utag_key(self, key, step=None, replaced_ms=0, deadline_ms=None, required=False):
+        """Wait until the observed utag.data has a non-empty `key`, without asking the page."""
+        description = f"observed utag.data has {key}"
+
+        async def condition(deadline_ms):
+            if self.captured_data['utag_data'].latest.get(key):
+                return
+            await self._wait_for_push(self._utag_waiters, lambda data: bool(data.get(key)),
+                                      deadline_ms, f"utag.data key {key} not observed within {deadline_ms} ms")
+
+        return await self._timed(step or description, description, condition,
+                                 replaced_ms, deadline_ms, required)
+
+    # ----- Page conditions -----
+
+    async def wait_for_utag(self, key=None, step=None, replaced_ms=0, deadline_ms=None, required=False):
+        """Wait until utag.data exists (and has a non-empty `key`, if given)."""
+        if key:
+            expression = f"() => window.utag && window.utag.data && !!window.utag.data[{key!r}]"
+            description = f"utag.data has {key}"
+        else:
+            expression = "() => window.utag && window.utag.data && Object.keys(window.utag.data).length > 0"
+            description = "utag.data populated"
+
+        async def condition(deadline_ms):
+            await self.page.wait_for_function(expression, timeout=deadline_ms)
+
+        return await self._timed(step or description, description, condition,
+                                 replaced_ms, deadline_ms, required)
+
+    async def wait_for_function(self, expression, description, step=None, replaced_ms=0,
+                                deadline_ms=None, required=False):
+        async def condition(deadline_ms):
+            await self.page.wait_for_function(expression, timeout=deadline_ms)
+
+        return await self._timed(step or description, description, condition,
+                                 replaced_ms, deadline_ms, required)
+
+    async def wait_for_url(self, pattern, step=None, replaced_ms=0, deadline_ms=None, required=False):
+        async def condition(deadline_ms):
+            await self.page.wait_for_url(pattern, timeout=deadline_ms)
+
+        return await self._timed(step or f"url:{pattern}", f"URL matches {pattern}", condition,
+                                 replaced_ms, deadline_ms, required)
+
+    async def wait_for_selector(self, selector, state="visible", step=None, replaced_ms=0,
+                                deadline_ms=None, required=False):
+        async def condition(deadline_ms):
+            await self.page.wait_for_selector(selector, state=state, timeout=deadline_ms)
+
+        return await self._timed(step or f"selector:{selector}", f"{selector} is {state}", condition,
+                                 replaced_ms, deadline_ms, required)
+
+    async def wait_for_load_state(self, state="load", step=None, replaced_ms=0,
+                                  deadline_ms=None, required=False):
+        async def condition(deadline_ms):
+            await self.page.wait_for_load_state(state, timeout=deadline_ms)
+
+        return await self._timed(step or f"load:{state}", f"load state {state}", condition,
+                                 replaced_ms, deadline_ms, required)
+
+    @asynccontextmanager
+    async def navigation(self, step, replaced_ms=0, deadline_ms=None, required=False):
+        """Wrap an action that submits a form or follows a link; waits for the new document."""
+        deadline_ms = deadline_ms or self.default_deadline_ms
+        started = time.perf_counter()
+        error = None
+        try:
+            async with self.page.expect_navigation(wait_until="domcontentloaded", timeout=deadline_ms):
+                yield
+        except TimeoutError as e:
+            error = e
+        self._record(step, "navigation committed", started, replaced_ms, deadline_ms, error)
+        await self._trace(step, error is not None)
+        if error and required:
+            raise error
+
+    # ----- Bookkeeping -----
+
+    def _notify(self, waiters, value):
+        for waiter in list(waiters):
+            predicate, future = waiter
+            if not future.done() and predicate(value):
+                future.set_result(value)
+                waiters.remove(waiter)
+
+    async def _wait_for_push(self, waiters, predicate, deadline_ms, timeout_message):
+        future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, future)
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, deadline_ms / 1000)
+        except asyncio.TimeoutError:
+            raise TimeoutError(timeout_message)
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+    async def _timed(self, step, description, condition, replaced_ms, deadline_ms, required):
+        deadline_ms = deadline_ms or self.default_deadline_ms
+        started = time.perf_counter()
+        error = None
+        try:
+            await condition(deadline_ms)
+        except TimeoutError as e:
+            error = e
+        self._record(step, description, started, replaced_ms, deadline_ms, error)
+        await self._trace(step, error is not None)
+        if error and required:
+            raise error
+        return error is None
+
+    async def fail(self, step, error):
+        """Mark a step that failed with an exception, so its trace chunk is kept."""
+        log.warning(f"⚠️ Step '{step}' failed: {error}")
+        await self._trace(step, True)
+
+    async def _trace(self, step, failed):
+        if self.tracer is not None:
+            try:
+                await self.tracer.step_done(step, failed)
+            except Exception as e:
+                log.warning(f"⚠️ Could not cut the trace chunk of step '{step}': {str(e)}")
+
+    def _record(self, step, description, started, replaced_ms, deadline_ms, error):
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.timings.append({
+            'step': step,
+            'condition': description,
+            'latency_ms': round(latency_ms, 1),
+            'deadline_ms': deadline_ms,
+            'replaced_sleep_ms': replaced_ms,
+            'saved_ms': round(replaced_ms - latency_ms, 1),
+            'timed_out': error is not None,
+            'page': self.page.url
+        })
+        if error:
+            log.warning(f"⚠️ Step '{step}' timed out after {deadline_ms} ms waiting for: {description}")
+
+    def summary(self):
+        waited = sum(t['latency_ms'] for t in self.timings)
+        replaced = sum(t['replaced_sleep_ms'] for t in self.timings)
+        timed_out = sum(1 for t in self.timings if t['timed_out'])
+        return {
+            'steps': len(self.timings),
+            'waited_ms': round(waited, 1),
+            'replaced_sleep_ms': replaced,
+            'saved_ms': round(replaced - waited, 1),
+            'timed_out': timed_out
+        }
+
+    def print_summary(self):
+        log.info("\n⏱️ Step synchronization latency:")
+        for t in self.timings:
+            status = "⌛ timeout" if t['timed_out'] else "✅"
+            log.info(f"   {t['step']:<28} {t['latency_ms']:>8.0f} ms (old sleep {t['replaced_sleep_ms']:>5} ms) {status}")
+        s = self.summary()
+        log.info(f"   Waited {s['waited_ms'] / 1000:.1f}s instead of {s['replaced_sleep_ms'] / 1000:.1f}s "
+                 f"of fixed sleeps ({s['saved_ms'] / 1000:.1f}s saved, {s['timed_out']} timeouts)")
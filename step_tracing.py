@@ -0,0 +1,139 @@
+"""
+Per-step Playwright trace chunks with a retention policy.
+
+Tracing is started once per context (screenshots, DOM snapshots, sources)
+and cut into one chunk per flow step with tracing.start_chunk() /
+stop_chunk(): every StepSync wait ends the chunk holding that wait and the
+actions since the previous one, and the actions after the last wait end up
+in a final 'end' chunk. The policy decides which chunks reach the disk:
+
+- 'failures': only the chunk of a step that timed out or failed is written;
+  the others are stopped without a path, which Playwright discards without
+  exporting anything
+- 'last:N': every chunk is spooled to disk, but only the N chunks before a
+  failing step are kept with it; the rest are deleted as the window moves
+  (and all of them when the job passes)
+- 'always': every chunk is kept, one zip per step
+- 'off': no tracing
+
+Each kept chunk opens on its own in the Trace Viewer
+(`playwright show-trace <chunk>.zip`). bench_tracing.py measures the
+per-action cost and disk use of each policy against the old single
+always-on trace.
+"""
+
+import os
+import re
+import time
+from collections import deque
+from pathlib import Path
+
+from log_sink import log
+
+TRACE_POLICIES = ('failures', 'last:N', 'always', 'off')
+DEFAULT_TRACE_POLICY = 'failures'
+
+def parse_trace_policy(policy):
+    """'failures', 'always', 'off' or 'last:N' -> (mode, N)."""
+    policy = (policy or DEFAULT_TRACE_POLICY).strip().lower()
+    if policy in ('failures', 'always', 'off'):
+        return policy, 0
+    mode, _, count = policy.partition(':')
+    if mode == 'last' and count.isdigit() and int(count) > 0:
+        return 'last', int(count)
+    raise ValueError(f"Unknown trace policy '{policy}'. Available: {', '.join(TRACE_POLICIES)}")
+
+def _chunk_name(number, step):
+    return f"{number:03d}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', step)[:60]}.zip"
+
+class StepTracer:
+    """Runs the tracing of one context as per-step chunks and keeps the ones the policy asks for."""
+
+    def __init__(self, context, directory, job_id, policy=DEFAULT_TRACE_POLICY):
+        self.tracing = context.tracing
+        self.directory = Path(directory)
+        self.job_id = job_id
+        self.policy = policy or DEFAULT_TRACE_POLICY
+        self.mode, self.last = parse_trace_policy(self.policy)
+        self.kept = []
+        self.stats = {'chunks': 0, 'written': 0, 'bytes_written': 0, 'bytes_kept': 0,
+                      'failed_steps': 0, 'export_ms': 0.0}
+        self._window = deque()
+        self._open = False
+
+    async def start(self):
+        if self.mode == 'off':
+            return
+        await self.tracing.start(screenshots=True, snapshots=True, sources=True)
+        await self._start_chunk()
+
+    async def _start_chunk(self):
+        await self.tracing.start_chunk(title=f"{self.job_id} step {self.stats['chunks'] + 1}")
+        self._open = True
+
+    async def step_done(self, step, failed=False):
+        """End the chunk of `step` (its wait and the actions before it) and start the next one."""
+        if not self._open:
+            return
+        await self._end_chunk(step, failed)
+        await self._start_chunk()
+
+    async def finish(self, failed=False):
+        """
+        End the last chunk (kept if `failed`, i.e. the job failed) and stop
+        tracing. Returns the paths of the kept chunks.
+        """
+        if self._open:
+            await self._end_chunk('end', failed)
+            await self.tracing.stop()
+        # A passing job leaves nothing of the spooled window behind
+        for path in self._window:
+            path.unlink(missing_ok=True)
+        self._window.clear()
+        return [str(path) for path in self.kept]
+
+    async def _end_chunk(self, step, failed):
+        self._open = False
+        self.stats['chunks'] += 1
+        if failed:
+            self.stats['failed_steps'] += 1
+        path = None
+        if failed or self.mode in ('always', 'last'):
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / _chunk_name(self.stats['chunks'], step)
+
+        started = time.perf_counter()
+        await self.tracing.stop_chunk(path=str(path) if path else None)
+        self.stats['export_ms'] += (time.perf_counter() - started) * 1000
+        if path is None:
+            return
+
+        size = os.path.getsize(path)
+        self.stats['written'] += 1
+        self.stats['bytes_written'] += size
+        if self.mode == 'last' and not failed:
+            self._window.append(path)
+            if len(self._window) > self.last:
+                self._window.popleft().unlink(missing_ok=True)
+            return
+        # The window before a failing step is kept with it
+        for kept in (*self._window, path):
+            self.kept.append(kept)
+            self.stats['bytes_kept'] += os.path.getsize(kept)
+        self._window.clear()
+
+    def summary(self):
+        return {'policy': self.policy, 'kept': len(self.kept), **self.stats,
+                'export_ms': round(self.stats['export_ms'], 1)}
+
+    def print_summary(self):
+        if self.mode == 'off':
+            return
+        s = self.stats
+        line = (f"🎞️ [{self.job_id}] Trace ({self.policy}): kept {len(self.kept)} of {s['chunks']} step chunk(s), "
+                f"{s['bytes_kept'] / 2**20:.1f} MiB")
+        if s['bytes_written'] != s['bytes_kept']:
+            line += f" ({s['bytes_written'] / 2**20:.1f} MiB written)"
+        log.info(f"{line}, {s['export_ms']:.0f} ms exporting chunks")
+        if self.kept:
+            log.info(f"   Open with: playwright show-trace {self.kept[0]}")
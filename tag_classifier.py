@@ -0,0 +1,140 @@
+"""
+Compiled multi-vendor tag classifier.
+
+A rule set is an ordered list of rules; the first rule that matches a URL
+gives its category ("Other" when none does). A rule matches when every
+condition it has holds:
+
+    {"category": "Facebook Pixel", "host": "facebook.com", "path": "/tr"}
+
+- host: the request host or one of its parent domains (str or list);
+- path: a prefix of the URL path (str or list);
+- contains: a substring of the URL after the host (str or list).
+
+Rules are compiled once into a host-suffix index, so a URL is only checked
+against the few rules of its own host's domains, plus the host-less rules,
+which share one compiled regex that rejects non-matching URLs in a single
+scan. Host lookups are cached, since a journey requests the same hosts over
+and over.
+
+Extra rule sets (e.g. the airline's own vendors) are JSON files
+{"rules": [...]} loaded with load_rules(); their rules take precedence over
+DEFAULT_RULES, which {"defaults": false} drops altogether.
+"""
+
+import json
+import re
+from functools import lru_cache
+
+OTHER = "Other"
+
+DEFAULT_RULES = [
+    {'category': 'GA4', 'contains': '/g/collect'},
+    {'category': 'Floodlight', 'host': 'doubleclick.net'},
+    {'category': 'Google Ads', 'host': 'adservice.google.com'},
+    {'category': 'Adobe Analytics', 'host': ['omtrdc.net', '2o7.net']},
+    {'category': 'Tealium', 'host': ['tealiumiq.com', 'tealium.com']},
+    {'category': 'GTM', 'host': 'googletagmanager.com'},
+    {'category': 'GTM', 'contains': 'gtm.js'},
+    {'category': 'Facebook Pixel', 'host': 'facebook.com', 'path': '/tr'},
+    {'category': 'Bing Ads', 'host': 'bat.bing.com'},
+    {'category': 'Pinterest', 'host': 'pinterest.com', 'path': '/v3/'},
+    {'category': 'Snapchat', 'host': 'snapchat.com', 'path': '/p'},
+    {'category': 'TikTok', 'host': 'tiktok.com', 'path': '/i/'}
+]
+
+RULE_KEYS = ('category', 'host', 'path', 'contains')
+
+def _as_tuple(value):
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+def load_rules(paths=()):
+    """DEFAULT_RULES with the rules of each JSON file in `paths` placed before them."""
+    rules, use_defaults = [], True
+    for path in paths or ():
+        with open(path, "r", encoding="utf-8") as f:
+            rule_set = json.load(f)
+        for rule in rule_set.get('rules', []):
+            unknown = [key for key in rule if key not in RULE_KEYS]
+            if 'category' not in rule or unknown or not any(key in rule for key in RULE_KEYS[1:]):
+                raise ValueError(f"{path}: bad rule {rule} (needs category and host/path/contains)")
+        rules.extend(rule_set.get('rules', []))
+        use_defaults = use_defaults and rule_set.get('defaults', True)
+    return rules + (DEFAULT_RULES if use_defaults else [])
+
+# scheme, userinfo and port are skipped; group 1 is the host
+URL_HOST = re.compile(r"(?:[A-Za-z][A-Za-z0-9+.-]*://|//)?(?:[^/?#@]*@)?([^/?#:]*)(?::\d*)?")
+
+HOST_CACHE_SIZE = 4096
+
+class TagClassifier:
+    """A rule set compiled into a host-suffix index plus one regex for host-less rules."""
+
+    def __init__(self, rules=None):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.rules = []
+        self.by_host = {}
+        hostless = []
+        for index, rule in enumerate(rules):
+            compiled = (index, rule['category'], _as_tuple(rule.get('path')), _as_tuple(rule.get('contains')))
+            self.rules.append(compiled)
+            hosts = _as_tuple(rule.get('host'))
+            for host in hosts:
+                self.by_host.setdefault(host.lower().lstrip("."), []).append(compiled)
+            if not hosts:
+                hostless.append(compiled)
+        self.hostless = hostless
+        patterns = [re.escape(text) for _, _, _, contains in hostless for text in contains]
+        # A host-less rule with only a path condition can match any URL
+        self.hostless_screen = (re.compile("|".join(patterns))
+                                if patterns and all(contains for _, _, _, contains in hostless) else None)
+        self._host_cache = {}
+
+    def _rules_for_host(self, host):
+        """Rules whose host condition `host` satisfies, in rule order (cached per host)."""
+        rules = self._host_cache.get(host)
+        if rules is None:
+            found = []
+            labels = host.lower().split(".")
+            for i in range(len(labels)):
+                found.extend(self.by_host.get(".".join(labels[i:]), ()))
+            if len(self._host_cache) >= HOST_CACHE_SIZE:
+                self._host_cache.clear()
+            rules = self._host_cache[host] = tuple(sorted(found))
+        return rules
+
+    @staticmethod
+    def _matches(rule, rest):
+        _, _, paths, contains = rule
+        if paths and not rest.startswith(paths):
+            return False
+        return not contains or any(text in rest for text in contains)
+
+    def classify(self, url):
+        m = URL_HOST.match(url)
+        rest = url[m.end():]
+        best = None
+        for rule in self._rules_for_host(m.group(1)):
+            if self._matches(rule, rest):
+                best = rule
+                break
+        if self.hostless and (self.hostless_screen is None or self.hostless_screen.search(rest)):
+            for rule in self.hostless:
+                if best is not None and rule[0] > best[0]:
+                    break
+                if self._matches(rule, rest):
+                    best = rule
+                    break
+        return best[1] if best is not None else OTHER
+
+    def classify_many(self, urls):
+        """Categories of `urls`, in one pass."""
+        classify = self.classify
+        return [classify(url) for url in urls]
+
+@lru_cache(maxsize=None)
+def load_classifier(paths=()):
+    """The classifier for DEFAULT_RULES plus the rule files in `paths`, compiled once per process."""
+    return TagClassifier(load_rules(paths))
@@ -0,0 +1,125 @@
+"""
+Delta-encoded utag_data snapshots.
+
+Successive utag.data snapshots are nearly identical, so the page-side
+observer (datalayer.py) keeps the last reported snapshot as per-key JSON
+strings in sessionStorage, which survives same-origin navigations, and
+reports only the keys that were set, changed or removed. UtagSnapshots
+stores those deltas and rebuilds any full snapshot on demand, from the
+nearest keyframe (a full copy kept every KEYFRAME_INTERVAL deltas).
+
+Each delta names the snapshot it is relative to by its lineage and
+sequence number (`lineage`, `base`). A lineage is a random token the page
+draws whenever it sends a full snapshot; it is kept next to the sequence
+number in sessionStorage, which is separate per origin and per tab. A delta
+whose (lineage, base) is not the snapshot Python last stored is refused (a
+lost report, or a journey going back to an origin it left, whose sequence
+number may well match the one the other origin counted up to), and the page
+answers with a full snapshot instead, so a rebuilt snapshot is never built
+on the wrong base. The first document of an origin has no lineage yet and
+always starts with a full snapshot.
+
+Deltas, keyframes included, are kept in a SpillList (segments.py), so on a
+long journey the older ones are spilled to disk and read back on demand.
+Each stored delta carries its snapshot's URL and timestamp, and keyframes
+are found from the row number, so nothing else grows with the journey.
+"""
+
+import json
+
+from segments import SpillList, SPILL_ROWS
+from log_sink import log
+
+KEYFRAME_INTERVAL = 32
+
+class UtagSnapshots:
+    """utag_data snapshots stored as deltas; indexing rebuilds {'url', 'timestamp', 'data'}."""
+
+    def __init__(self, spill=None, spill_rows=SPILL_ROWS):
+        # {'url', 'timestamp', 'set', 'removed', 'full'}; keyframe rows also
+        # carry the full data under 'keyframe'
+        self.deltas = SpillList(spill, spill_rows)
+        self.latest = {}
+        self.seq = -1
+        self.lineage = None
+        self.delta_bytes = 0
+        self.full_bytes = 0
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.deltas)
+        if not 0 <= i < len(self.deltas):
+            raise IndexError("snapshot index out of range")
+        delta = self.deltas[i]
+        return {'url': delta['url'], 'timestamp': delta['timestamp'], 'data': self.data(i)}
+
+    def __iter__(self):
+        # One pass over the deltas instead of a rebuild per snapshot
+        data = {}
+        for delta in self.deltas:
+            if 'keyframe' in delta:
+                data = dict(delta['keyframe'])
+            else:
+                for key in delta['removed']:
+                    data.pop(key, None)
+                data.update(delta['set'])
+            yield {'url': delta['url'], 'timestamp': delta['timestamp'], 'data': dict(data)}
+
+    def timeline(self):
+        """(timestamps, urls) of every snapshot, in one pass and without rebuilding any."""
+        timestamps, urls = [], []
+        for delta in self.deltas:
+            timestamps.append(delta['timestamp'])
+            urls.append(delta['url'])
+        return timestamps, urls
+
+    def accepts(self, delta):
+        """Whether `delta` applies on top of the last stored snapshot."""
+        return delta['full'] or (delta.get('lineage') == self.lineage and delta['base'] == self.seq)
+
+    def append_delta(self, delta):
+        """Store one accepted browser delta; returns the rebuilt snapshot data."""
+        i = len(self.deltas)
+        if delta['full']:
+            self.latest = {}
+        for key in delta['removed']:
+            self.latest.pop(key, None)
+        self.latest.update(delta['set'])
+
+        stored = {'set': delta['set'], 'removed': delta['removed'], 'full': delta['full']}
+        self.delta_bytes += len(json.dumps(stored, separators=(',', ':')))
+        stored['url'] = delta['url']
+        stored['timestamp'] = delta['timestamp']
+        if delta['full'] or i % KEYFRAME_INTERVAL == 0:
+            # Shallow copy: values are never mutated, so keyframes share them
+            stored['keyframe'] = dict(self.latest)
+        self.deltas.append(stored)
+
+        self.seq = delta['seq']
+        self.lineage = delta.get('lineage')
+        self.full_bytes += delta.get('fullBytes', 0)
+        return self.latest
+
+    def data(self, i):
+        """Full utag_data of snapshot i, rebuilt from the nearest keyframe."""
+        if i == len(self.deltas) - 1:
+            return dict(self.latest)
+        # Every KEYFRAME_INTERVAL-th row and every full snapshot is a keyframe
+        deltas = self.deltas[i - i % KEYFRAME_INTERVAL:i + 1]
+        start = max(n for n, delta in enumerate(deltas) if 'keyframe' in delta)
+        data = dict(deltas[start]['keyframe'])
+        for delta in deltas[start + 1:]:
+            for key in delta['removed']:
+                data.pop(key, None)
+            data.update(delta['set'])
+        return data
+
+    def print_summary(self):
+        if not self.deltas:
+            return
+        ratio = self.full_bytes / self.delta_bytes if self.delta_bytes else 0
+        log.info(f"📦 utag_data: {len(self.deltas)} snapshot(s), {self.delta_bytes / 1024:.1f} KB sent as deltas "
+                 f"vs {self.full_bytes / 1024:.1f} KB as full clones ({ratio:.1f}x less)")
@@ -0,0 +1,177 @@
+"""
+Declarative utag -> GA4 mapping specs.
+
+A spec file (specs/<flow>.json) lists, per GA4 event, the field pairs to
+compare:
+
+    {"parameter": "order_total / value", "utag": "order_total", "ga4": "ep.value",
+     "type": "number", "tolerance": 0.01, "required": true, "default": 0}
+
+`utag` is a utag_data key, optionally indexed into an array
+("product_sku[0]"); `type` is "number" or "string"; `tolerance` applies to
+numbers. A `default` stands in for a value missing on either side. Without
+one, a required pair fails when either side is missing, and an optional pair
+passes when GA4 did not send it.
+
+A spec is compiled once per process into per-event arrays. evaluate() then
+checks every hit of an event against every pair in whole-column operations
+and returns a hits x pairs pass/fail matrix, so adding parameters adds
+columns, not a Python loop per hit.
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from log_sink import log
+
+SPEC_DIR = Path("specs")
+SPEC_TYPES = ('number', 'string')
+
+UTAG_PATH = re.compile(r"^([^\[\]]+)(?:\[(\d+)\])?$")
+
+def spec_path(flow_name):
+    return SPEC_DIR / f"{flow_name}.json"
+
+def load_spec(path):
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    for event, pairs in spec.get('events', {}).items():
+        for pair in pairs:
+            missing = [key for key in ('parameter', 'utag', 'ga4') if key not in pair]
+            if missing:
+                raise ValueError(f"{path}: {event} pair {pair} is missing {', '.join(missing)}")
+            if pair.get('type', 'string') not in SPEC_TYPES:
+                raise ValueError(f"{path}: {event} pair '{pair['parameter']}' has unknown type '{pair['type']}'")
+            if not UTAG_PATH.match(pair['utag']):
+                raise ValueError(f"{path}: {event} pair '{pair['parameter']}' has a bad utag path '{pair['utag']}'")
+    return spec
+
+@lru_cache(maxsize=None)
+def compiled_spec(path):
+    """The spec at `path`, loaded and compiled once per process."""
+    spec = load_spec(path)
+    return {event: CompiledEvent(event, pairs) for event, pairs in spec.get('events', {}).items()}
+
+def _utag_value(snapshot, key, index):
+    value = snapshot.get(key)
+    if index is not None:
+        if isinstance(value, list):
+            value = value[index] if index < len(value) else None
+        elif index > 0:
+            value = None
+    if value == "" or isinstance(value, (list, dict)):
+        return None
+    return value
+
+class CompiledEvent:
+    """One event's pairs as parallel arrays, ready to apply to many hits at once."""
+
+    def __init__(self, event, pairs):
+        self.event = event
+        self.parameters = np.array([pair['parameter'] for pair in pairs], dtype=object)
+        self.ga4_columns = [pair['ga4'] for pair in pairs]
+        self.utag_paths = []
+        for pair in pairs:
+            key, index = UTAG_PATH.match(pair['utag']).groups()
+            self.utag_paths.append((key, int(index) if index is not None else None))
+        self.required = np.array([bool(pair.get('required', True)) for pair in pairs])
+        self.tolerance = np.array([float(pair.get('tolerance', 0)) for pair in pairs])
+        self.defaults = [pair.get('default') for pair in pairs]
+        self.numeric = np.array([pair.get('type', 'string') == 'number' for pair in pairs])
+        self.number_pairs = np.flatnonzero(self.numeric)
+        self.string_pairs = np.flatnonzero(~self.numeric)
+
+    def _typed(self, block):
+        """hits x pairs object block -> (float block, text block, missing mask), defaults applied."""
+        missing = block.isna().to_numpy()
+        for j, default in enumerate(self.defaults):
+            if default is not None:
+                block.iloc[missing[:, j], j] = default
+        missing = block.isna().to_numpy()
+
+        numbers = np.full(block.shape, np.nan)
+        for j in self.number_pairs:
+            numbers[:, j] = pd.to_numeric(block.iloc[:, j], errors='coerce').to_numpy(dtype=float)
+        texts = np.full(block.shape, None, dtype=object)
+        for j in self.string_pairs:
+            texts[:, j] = np.where(missing[:, j], None, block.iloc[:, j].astype(str).to_numpy())
+        # A number that does not parse counts as missing
+        missing = missing | (self.numeric & np.isnan(numbers))
+        return numbers, texts, missing
+
+    def evaluate(self, hits, snapshot_data, snapshot_rows=None):
+        """Pass/fail matrix of `hits` (one row per hit) against utag_data snapshots.
+
+        snapshot_data(row) returns the utag_data dict of snapshot `row`, and
+        snapshot_rows gives, per hit, the snapshot it is compared with (by
+        default snapshot 0). Only the snapshots actually referenced are read.
+        Returns (matrix, expected, actual) as hits x pairs DataFrames.
+        """
+        n_hits = len(hits)
+        if snapshot_rows is None:
+            snapshot_rows = np.zeros(n_hits, dtype=int)
+
+        # utag values are extracted once per distinct snapshot, then broadcast
+        distinct, positions = np.unique(np.asarray(snapshot_rows, dtype=int), return_inverse=True)
+        expected_block = pd.DataFrame(
+            [[_utag_value(snapshot, key, index) for key, index in self.utag_paths]
+             for snapshot in map(snapshot_data, distinct)],
+            columns=range(len(self.utag_paths)),
+            dtype=object
+        ).take(positions).reset_index(drop=True)
+        actual_block = hits.reindex(columns=self.ga4_columns).astype(object).reset_index(drop=True)
+        actual_block.columns = range(len(self.ga4_columns))
+
+        expected_numbers, expected_texts, expected_missing = self._typed(expected_block)
+        actual_numbers, actual_texts, actual_missing = self._typed(actual_block)
+
+        with np.errstate(invalid='ignore'):
+            number_match = np.abs(expected_numbers - actual_numbers) <= self.tolerance
+        text_match = expected_texts == actual_texts
+        match = np.where(self.numeric, number_match, text_match)
+        match &= ~expected_missing & ~actual_missing
+        # Optional pairs GA4 did not send are not failures
+        match |= ~self.required & actual_missing
+
+        columns = list(self.parameters)
+        index = hits.index
+        matrix = pd.DataFrame(match, index=index, columns=columns)
+        expected = pd.DataFrame(np.where(self.numeric, expected_numbers, expected_texts),
+                                index=index, columns=columns).where(~expected_missing, None)
+        actual = pd.DataFrame(np.where(self.numeric, actual_numbers, actual_texts),
+                              index=index, columns=columns).where(~actual_missing, None)
+        return matrix, expected, actual
+
+def comparison_rows(matrix, expected, actual, hit_numbers=None):
+    """The matrix in long form: one row per hit and pair (hit_number counts from 1 unless given)."""
+    n_hits, n_pairs = matrix.shape
+    if hit_numbers is None:
+        hit_numbers = np.arange(1, n_hits + 1)
+    rows = pd.DataFrame({
+        'parameter': np.tile(matrix.columns.to_numpy(dtype=object), n_hits),
+        'utag_value': expected.to_numpy(dtype=object).ravel(),
+        'ga4_value': actual.to_numpy(dtype=object).ravel(),
+        'match': matrix.to_numpy().ravel(),
+        'hit_number': np.repeat(np.asarray(hit_numbers), n_pairs)
+    })
+    for column in ('utag_value', 'ga4_value'):
+        rows[column] = rows[column].astype(str).where(rows[column].notna(), "N/A")
+    return rows
+
+def print_matrix(event, matrix, limit=20):
+    n_hits, n_pairs = matrix.shape
+    passed = int(matrix.to_numpy().sum())
+    log.info(f"\n📊 GA4 vs utag_data pass/fail matrix - {event} ({n_hits} hit(s) x {n_pairs} parameter(s)):")
+    log.info("-" * 80)
+    log.info(matrix.head(limit).replace({True: "✅", False: "❌"}).T.to_string())
+    if n_hits > limit:
+        log.info(f"   ... {n_hits - limit} more hit(s)")
+    log.info(f"\n📈 Match Rate: {passed}/{matrix.size} ({passed / matrix.size * 100:.1f}%)")
+    for parameter, rate in matrix.mean().items():
+        if rate < 1:
+            log.warning(f"   ❌ {parameter:<30} passes on {rate * 100:.0f}% of hits")